@@ -0,0 +1,48 @@
+"""
+Measure the blocks written per second, which is dominated by the per-block cost of
+hashing and framing for small chunks.
+
+Usage:
+    python benchmarks/block_framing.py --size-kb 256 --chunk-sizes 1 64 1024
+"""
+
+from argparse import ArgumentParser
+from io import BytesIO
+from os import urandom
+from time import perf_counter
+
+from pycar.car import CARv1Writer
+from pycar.file_types import BinaryFile
+
+
+def run(data: bytes, chunk_size: int, unixfs: bool) -> float:
+    begin = perf_counter()
+    with CARv1Writer(
+        BinaryFile(BytesIO(data), chunkSize=chunk_size, metadata={"name": "in"}),
+        BytesIO(),
+        unixfs=unixfs,
+    ) as car:
+        car.get_car()
+    return perf_counter() - begin
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--size-kb", type=int, default=256)
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[1, 64, 1024])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    data = urandom(args.size_kb * 1024)
+    for unixfs in (False, True):
+        for chunk_size in args.chunk_sizes:
+            elapsed = min(run(data, chunk_size, unixfs) for _ in range(args.repeat))
+            blocks = -(-len(data) // chunk_size)
+            print(
+                f"unixfs={unixfs!s:>5} chunk={chunk_size:>7}: "
+                f"{blocks / elapsed:>10.0f} blocks/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Compare prepending the CARv1 header against writing into a reserved header slot.
+
+Usage:
+    python benchmarks/header_strategies.py --size-mb 256 --chunk-size 262144
+"""
+
+from argparse import ArgumentParser
+from os import path, urandom
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from pycar.car import CARv1Writer
+from pycar.file_types import BinaryFile
+
+
+def run(source: str, target: str, chunk_size: int, reserve_header: bool) -> float:
+    start = perf_counter()
+    with open(source, "rb") as f:
+        with CARv1Writer(
+            BinaryFile(bufferedReader=f, chunkSize=chunk_size, metadata={"name": "in"}),
+            target,
+            unixfs=True,
+            reserve_header=reserve_header,
+        ) as car:
+            car.get_car()
+    return perf_counter() - start
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--chunk-size", type=int, default=262144)
+    parser.add_argument("--dir", default=None, help="Directory for the inputs.")
+    args = parser.parse_args()
+
+    with TemporaryDirectory(dir=args.dir) as tmp:
+        source = path.join(tmp, "input.bin")
+        with open(source, "wb") as f:
+            for _ in range(args.size_mb):
+                f.write(urandom(1 << 20))
+
+        results = {}
+        for reserve_header in (False, True):
+            target = path.join(tmp, f"reserve-{reserve_header}.car")
+            results[reserve_header] = run(
+                source, target, args.chunk_size, reserve_header
+            )
+
+        with (
+            open(path.join(tmp, "reserve-False.car"), "rb") as a,
+            open(path.join(tmp, "reserve-True.car"), "rb") as b,
+        ):
+            identical = a.read() == b.read()
+
+    for reserve_header, elapsed in results.items():
+        label = "reserved slot" if reserve_header else "prepend"
+        print(f"{label:>14}: {elapsed:.3f}s ({args.size_mb / elapsed:.1f} MB/s)")
+    print(f"{'identical':>14}: {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Measure the time to import pycar entry points in fresh interpreters, and which
+heavy dependencies each one loads, so that import cost stays paid on first use.
+
+Usage:
+    python benchmarks/import_time.py --repeat 10
+    python benchmarks/import_time.py --json
+"""
+
+from argparse import ArgumentParser
+from json import dumps
+from os import environ, pathsep
+import subprocess
+import sys
+
+# Statements timed in a fresh interpreter each.
+TARGETS = [
+    "import pycar",
+    "import pycar.cli",
+    "from pycar.file_types import BinaryFile",
+    "from pycar.file_types import CDCFile",
+    "from pycar.car import CARv1Reader",
+    "from pycar.car import CARv1Writer",
+    "from pycar.car import folder_to_dag",
+]
+HEAVY = ["numpy", "multiformats", "google.protobuf", "dag_cbor"]
+
+_PROBE = """
+import sys
+from time import perf_counter
+start = perf_counter()
+{statement}
+elapsed = perf_counter() - start
+print(elapsed, *[name for name in {heavy!r} if name in sys.modules])
+"""
+
+
+def measure(statement: str) -> tuple:
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(statement=statement, heavy=HEAVY)],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**environ, "PYTHONPATH": pathsep.join(sys.path)},
+    )
+    elapsed, *loaded = result.stdout.split()
+    return float(elapsed), loaded
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print JSON.")
+    args = parser.parse_args()
+
+    results = []
+    for statement in TARGETS:
+        runs = [measure(statement) for _ in range(args.repeat)]
+        results.append(
+            {
+                "statement": statement,
+                "ms": min(elapsed for elapsed, _ in runs) * 1000,
+                "loads": runs[0][1],
+            }
+        )
+    if args.json:
+        print(dumps(results, indent=2))
+        return
+    for result in results:
+        print(
+            f"{result['statement']:<42} {result['ms']:7.1f} ms  "
+            f"{', '.join(result['loads']) or '-'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Measure how hashing and encoding chunks on an executor scales with the number of
+workers.
+
+Usage:
+    python benchmarks/parallel_hashing.py --size-mb 256 --workers 1 2 4 8
+"""
+
+from argparse import ArgumentParser
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from os import path, urandom
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Optional
+
+from pycar.car import CARv1Writer
+from pycar.file_types import BinaryFile
+
+
+def run(
+    source: str, target: str, chunk_size: int, executor: Optional[Executor]
+) -> float:
+    start = perf_counter()
+    with open(source, "rb") as f:
+        with CARv1Writer(
+            BinaryFile(bufferedReader=f, chunkSize=chunk_size, metadata={"name": "in"}),
+            target,
+            unixfs=True,
+            reserve_header=True,
+            executor=executor,
+        ) as car:
+            car.get_car()
+    return perf_counter() - start
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--chunk-size", type=int, default=262144)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--threads", action="store_true", help="Use a thread pool.")
+    parser.add_argument("--dir", default=None, help="Directory for the inputs.")
+    args = parser.parse_args()
+
+    pool = ThreadPoolExecutor if args.threads else ProcessPoolExecutor
+    with TemporaryDirectory(dir=args.dir) as tmp:
+        source = path.join(tmp, "input.bin")
+        with open(source, "wb") as f:
+            for _ in range(args.size_mb):
+                f.write(urandom(1 << 20))
+        target = path.join(tmp, "out.car")
+
+        serial = run(source, target, args.chunk_size, None)
+        print(f"{'serial':>10}: {serial:.3f}s ({args.size_mb / serial:.1f} MB/s)")
+        for workers in args.workers:
+            with pool(max_workers=workers) as executor:
+                elapsed = run(source, target, args.chunk_size, executor)
+            print(
+                f"{workers:>3} workers: {elapsed:.3f}s "
+                f"({args.size_mb / elapsed:.1f} MB/s, x{serial / elapsed:.2f})"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Run the ingestion benchmarks on synthetic inputs and write the results as JSON, so
+that regressions can be tracked across commits.
+
+Files are written with `CARv1Writer.get_car` and folders with `folder_to_dag`, for
+every combination of chunk size and `max_children`. Each run happens in a fresh
+process, which reports its wall time, throughput, peak RSS and the syscalls and
+bytes counted by /proc/self/io, where available.
+
+Inputs:
+    large_file   A single file of random data.
+    duplicated   A single file repeating one random chunk, written with dedup.
+    small_files  A flat folder of many small random files.
+    deep_tree    A chain of nested folders holding a few small files each.
+
+Usage:
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --inputs large_file --chunk-sizes 65536 262144
+"""
+
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from json import dump
+from multiprocessing import get_context
+from os import makedirs, path, walk
+from platform import platform, python_version
+from random import Random
+from resource import RUSAGE_SELF, getrusage
+from sys import stderr, stdout
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Any, Dict, List, Optional
+
+from pycar.car import CARv1Writer, folder_to_dag
+from pycar.car.sections import iter_sections, read_varint
+from pycar.file_types import BinaryFile
+
+INPUTS = ("large_file", "duplicated", "small_files", "deep_tree")
+
+
+def read_proc_io() -> Optional[Dict[str, int]]:
+    """
+    Read the I/O counters of this process, or None where /proc is unavailable.
+    """
+    try:
+        with open("/proc/self/io") as f:
+            return {
+                key: int(value)
+                for key, value in (line.split(":") for line in f if ":" in line)
+            }
+    except OSError:
+        return None
+
+
+def count_blocks(car_path: str) -> int:
+    with open(car_path, "rb") as f:
+        f.seek(read_varint(f), 1)  # type: ignore
+        return sum(1 for _ in iter_sections(f))
+
+
+def generate(name: str, root: str, args) -> str:
+    """
+    Generate an input, deterministically for a given seed, and return its path.
+    """
+    rng = Random(args.seed)
+    target = path.join(root, name)
+    if name == "large_file":
+        with open(target, "wb") as f:
+            for _ in range(args.large_mb):
+                f.write(rng.randbytes(1 << 20))
+    elif name == "duplicated":
+        block = rng.randbytes(max(args.chunk_sizes))
+        with open(target, "wb") as f:
+            for _ in range((args.large_mb << 20) // len(block)):
+                f.write(block)
+    elif name == "small_files":
+        makedirs(target)
+        for i in range(args.files):
+            with open(path.join(target, f"{i:06}.bin"), "wb") as f:
+                f.write(rng.randbytes(args.file_kb * 1024))
+    else:
+        folder = target
+        for depth in range(args.depth):
+            folder = path.join(folder, f"level{depth}")
+            makedirs(folder)
+            for i in range(args.files_per_level):
+                with open(path.join(folder, f"{i}.bin"), "wb") as f:
+                    f.write(rng.randbytes(args.file_kb * 1024))
+    return target
+
+
+def input_size(source: str) -> int:
+    if path.isfile(source):
+        return path.getsize(source)
+    return sum(
+        path.getsize(path.join(folder, name))
+        for folder, _, names in walk(source)
+        for name in names
+    )
+
+
+def run(source: str, target: str, chunk_size: int, max_children: int, dedup: bool):
+    """
+    Write a single archive and measure it, in a process of its own.
+    """
+    io_before = read_proc_io()
+    begin = perf_counter()
+    if path.isfile(source):
+        with open(source, "rb") as f:
+            with CARv1Writer(
+                BinaryFile(f, chunkSize=chunk_size, metadata={"name": "input"}),
+                target,
+                unixfs=True,
+                max_children=max_children,
+                reserve_header=True,
+                dedup=dedup,
+            ) as car:
+                car.get_car()
+    else:
+        with CARv1Writer(
+            None,
+            target,
+            unixfs=True,
+            max_children=max_children,
+            reserve_header=True,
+            dedup=dedup,
+        ) as car:
+            folder_to_dag(car, source, chunk_size=chunk_size)
+    elapsed = perf_counter() - begin
+    io_after = read_proc_io()
+    result: Dict[str, Any] = {
+        "seconds": elapsed,
+        "peak_rss_kib": getrusage(RUSAGE_SELF).ru_maxrss,
+        "io": None,
+    }
+    if io_before is not None and io_after is not None:
+        result["io"] = {key: io_after[key] - io_before[key] for key in io_after}
+    return result
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--inputs", nargs="+", choices=INPUTS, default=list(INPUTS))
+    parser.add_argument(
+        "--chunk-sizes", type=int, nargs="+", default=[65536, 262144, 1048576]
+    )
+    parser.add_argument("--max-children", type=int, nargs="+", default=[174, 1024])
+    parser.add_argument("--large-mb", type=int, default=64)
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--file-kb", type=int, default=4)
+    parser.add_argument("--depth", type=int, default=64)
+    parser.add_argument("--files-per-level", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dir", default=None, help="Directory for the inputs.")
+    parser.add_argument("--output", default=None, help="Defaults to stdout.")
+    args = parser.parse_args()
+
+    # A fresh process per run, so that peak RSS is not carried over between runs.
+    context = get_context("spawn")
+    results: List[dict] = []
+    with TemporaryDirectory(dir=args.dir) as tmp:
+        for name in args.inputs:
+            source = generate(name, tmp, args)
+            size = input_size(source)
+            for chunk_size in args.chunk_sizes:
+                for max_children in args.max_children:
+                    target = path.join(tmp, f"{name}.car")
+                    with context.Pool(1, maxtasksperchild=1) as pool:
+                        runs = [
+                            pool.apply(
+                                run,
+                                (
+                                    source,
+                                    target,
+                                    chunk_size,
+                                    max_children,
+                                    name == "duplicated",
+                                ),
+                            )
+                            for _ in range(args.repeat)
+                        ]
+                    best = min(runs, key=lambda r: r["seconds"])
+                    blocks = count_blocks(target)
+                    results.append(
+                        {
+                            "input": name,
+                            "chunk_size": chunk_size,
+                            "max_children": max_children,
+                            "input_bytes": size,
+                            "car_bytes": path.getsize(target),
+                            "blocks": blocks,
+                            "mb_per_s": size / best["seconds"] / 1e6,
+                            "blocks_per_s": blocks / best["seconds"],
+                            **best,
+                        }
+                    )
+                    print(
+                        f"{name:>11} chunk={chunk_size:>7} "
+                        f"max_children={max_children:>4}: "
+                        f"{results[-1]['mb_per_s']:8.1f} MB/s",
+                        file=stdout if args.output else stderr,
+                    )
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": python_version(),
+        "platform": platform(),
+        "parameters": vars(args),
+        "results": results,
+    }
+    if args.output is None:
+        dump(report, stdout, indent=2)
+        stdout.write("\n")
+    else:
+        with open(args.output, "w") as f:
+            dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compare the balanced and trickle layouts, measuring the write time, and the blocks
+fetched and time spent on read-back before the first byte of the file is known.
+A simulated fetch latency stands in for fetching blocks over the network.
+
+Usage:
+    python benchmarks/trickle_layout.py --size-mb 64 --chunk-size 16384 --latency-ms 5
+"""
+
+from argparse import ArgumentParser
+from os import path, urandom
+from tempfile import TemporaryDirectory
+from time import perf_counter, sleep
+
+from pycar.car import CARv1Reader, CARv1Writer
+from pycar.car.sections import RAW, get_cid_codec
+from pycar.file_types import BinaryFile
+from pycar.protobufs import PBNode  # type: ignore
+
+
+def write(source: str, target: str, layout: str, chunk_size: int, max_children: int):
+    begin = perf_counter()
+    with open(source, "rb") as f:
+        with CARv1Writer(
+            BinaryFile(bufferedReader=f, chunkSize=chunk_size, metadata={"name": "in"}),
+            target,
+            max_children=max_children,
+            reserve_header=True,
+            layout=layout,
+        ) as car:
+            car.get_car()
+    return perf_counter() - begin
+
+
+def time_to_first_byte(target: str, latency: float):
+    with CARv1Reader(target, index=True) as reader:
+        begin = perf_counter()
+        cid, fetched = bytes(reader.roots[0]), 0
+        while True:
+            sleep(latency)
+            data = reader.get(cid)
+            fetched += 1
+            if get_cid_codec(cid) == RAW:
+                return fetched, perf_counter() - begin
+            cid = PBNode.FromString(data).Links[0].Hash
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--chunk-size", type=int, default=16384)
+    parser.add_argument("--max-children", type=int, default=174)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--dir", default=None, help="Directory for the inputs.")
+    args = parser.parse_args()
+
+    with TemporaryDirectory(dir=args.dir) as tmp:
+        source = path.join(tmp, "input.bin")
+        with open(source, "wb") as f:
+            for _ in range(args.size_mb):
+                f.write(urandom(1 << 20))
+        for layout in ("balanced", "trickle"):
+            target = path.join(tmp, f"{layout}.car")
+            elapsed = write(source, target, layout, args.chunk_size, args.max_children)
+            fetched, first_byte = time_to_first_byte(target, args.latency_ms / 1000)
+            print(
+                f"{layout:>8}: write {elapsed:.3f}s, first byte after {fetched} "
+                f"blocks in {first_byte * 1000:.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,7 @@
-import pycar.abstract
-import pycar.car
-import pycar.file_types
-import pycar.protobufs
-import pycar.utils
+from pycar._lazy import attach
 
-
-__all__ = [
-    "abstract",
-    "car",
-    "file_types",
-    "protobufs",
-    "utils",
-]
-
-_ = pycar.utils
+# The subpackages are imported on first access, so that importing pycar, such as
+# for its command line, does not import protobuf, multiformats and dag-cbor.
+__getattr__, __dir__, __all__ = attach(
+    __name__, submodules=["abstract", "car", "file_types", "protobufs", "utils"]
+)
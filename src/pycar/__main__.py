@@ -0,0 +1,3 @@
+from pycar.cli import main
+
+raise SystemExit(main())
@@ -0,0 +1,48 @@
+from collections.abc import Callable, Iterable
+from importlib import import_module
+
+# This module does not import typing, which takes longer to import than pycar
+# itself, so that `import pycar` does not either. The subpackages it serves import
+# typing for their TYPE_CHECKING imports once they are accessed.
+
+
+def attach(
+    package: str,
+    submodules: Iterable[str] = (),
+    exports: dict[str, str] | None = None,
+) -> tuple[Callable[[str], object], Callable[[], list[str]], list[str]]:
+    """
+    Get the PEP 562 `__getattr__` and `__dir__` of a package whose submodules and
+    names are imported on first access rather than with the package.
+
+    Args:
+        package (str): The name of the package, `__name__`.
+        submodules (Iterable[str], optional): The submodules to import on access.
+            Defaults to none.
+        exports (dict[str, str] | None, optional): The names to import on
+            access, mapped to the relative name of the module defining them.
+            Defaults to None, exporting no names.
+
+    Returns:
+        tuple[Callable[[str], object], Callable[[], list[str]], list[str]]: The
+            `__getattr__`, `__dir__` and `__all__` of the package.
+    """
+    submodules = set(submodules)
+    exports = exports or {}
+    names = sorted([*submodules, *exports])
+
+    def __getattr__(name: str) -> object:
+        if name in submodules:
+            return import_module(f".{name}", package)
+        module = exports.get(name)
+        if module is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(import_module(module, package), name)
+        # Later lookups find the name in the package without calling __getattr__.
+        setattr(import_module(package), name, value)
+        return value
+
+    def __dir__() -> list[str]:
+        return sorted({*vars(import_module(package)), *names})
+
+    return (__getattr__, __dir__, names)
@@ -1,4 +1,38 @@
-from .compressed_archive import CARv1Writer
-from .utils import folder_to_dag
+from typing import TYPE_CHECKING
+from pycar._lazy import attach
 
-__all__ = ["CARv1Writer", "folder_to_dag"]
+if TYPE_CHECKING:
+    from .compressed_archive import CARv1Writer as CARv1Writer
+    from .reader import CARv1Reader as CARv1Reader
+    from .utils import folder_to_dag as folder_to_dag
+    from .export import dag_to_folder as dag_to_folder
+    from .cache import FileCache as FileCache
+    from .async_archive import (
+        AsyncCARv1Writer as AsyncCARv1Writer,
+        async_folder_to_dag as async_folder_to_dag,
+    )
+    from .metrics import WriterMetrics as WriterMetrics
+    from .verify import (
+        VerifyReport as VerifyReport,
+        verify_archive as verify_archive,
+        verify_car as verify_car,
+    )
+    from .split import SplitCARv1Writer as SplitCARv1Writer
+
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    exports={
+        "CARv1Writer": ".compressed_archive",
+        "CARv1Reader": ".reader",
+        "folder_to_dag": ".utils",
+        "dag_to_folder": ".export",
+        "FileCache": ".cache",
+        "AsyncCARv1Writer": ".async_archive",
+        "async_folder_to_dag": ".async_archive",
+        "WriterMetrics": ".metrics",
+        "verify_car": ".verify",
+        "verify_archive": ".verify",
+        "VerifyReport": ".verify",
+        "SplitCARv1Writer": ".split",
+    },
+)
@@ -0,0 +1,333 @@
+from asyncio import Future, get_running_loop
+from concurrent.futures import Executor
+from contextlib import AbstractAsyncContextManager
+from functools import partial
+from inspect import isawaitable
+from multiformats import CID  # type: ignore
+from os import path
+from time import perf_counter
+from types import TracebackType
+from typing import (
+    Any,
+    Awaitable,
+    BinaryIO,
+    Callable,
+    Deque,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
+from collections import deque
+from .compressed_archive import CARv1Writer, _FileDAG, _encode_raw_node
+from .sections import decode_cid
+from .utils import _build_folder, _walk_folder
+
+
+class _Buffer:
+    """
+    An in-memory, non-seekable binary stream the blocking writer writes to, and
+    the event loop empties into the async sink.
+
+    Attributes:
+        data (bytearray): The data written and not taken yet.
+    """
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data: Union[bytes, memoryview]) -> int:
+        self.data += data
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def seekable(self) -> bool:
+        return False
+
+    def take(self) -> bytes:
+        """
+        Take the data written so far, emptying the buffer.
+        """
+        data, self.data = bytes(self.data), bytearray()
+        return data
+
+
+class AsyncCARv1Writer(AbstractAsyncContextManager):
+    """
+    Async context manager for writing a CARv1 archive from an async byte stream to
+    an async sink without blocking the event loop.
+
+    The stream is read and the sink written on the event loop. Only the hashing
+    and encoding of chunks is offloaded to `executor`, with up to `max_in_flight`
+    chunks pending, so an archive holds no thread while it waits for the stream
+    or the sink, and many archives can be written concurrently in one event loop.
+    Blocks are written to a `CARv1Writer` over an in-memory buffer, which is
+    written to the sink once it holds `buffer_size` bytes. Unless the roots are
+    known up front, the writer spools the blocks, in memory up to `spool_size`
+    bytes and on disk beyond that, until the header is written.
+
+    Attributes:
+        stream (Optional[Any]): The async byte stream of the file, if any.
+        sink (Union[Callable, Any]): The async sink the archive is written to.
+        chunk_size (int): The size of each chunk of the file.
+        metadata (Optional[dict]): Metadata associated with the file.
+        executor (Optional[Executor]): The executor chunks are hashed and encoded
+            on, or None for the default executor of the event loop.
+        max_in_flight (int): The maximum number of chunks pending on the executor.
+        buffer_size (int): The number of bytes buffered before writing to the sink.
+        car_writer (CARv1Writer): The writer of the blocks.
+    """
+
+    def __init__(
+        self,
+        stream: Optional[Any],
+        sink: Union[Callable, Any],
+        chunk_size: int = 262144,
+        metadata: Optional[dict] = None,
+        executor: Optional[Executor] = None,
+        max_in_flight: int = 64,
+        buffer_size: int = 1024 * 1024,
+        **kwargs,
+    ):
+        """
+        Initializes an AsyncCARv1Writer object.
+
+        Args:
+            stream (Optional[Any]): The async byte stream of the file, with an
+                awaitable `read(n)`, or None to write a folder.
+            sink (Union[Callable, Any]): The async callable, or object with a
+                `write` method that may be a coroutine, such as an aiofiles file,
+                and an optional `drain` coroutine, such as an
+                `asyncio.StreamWriter`, the archive is written to.
+            chunk_size (int, optional): The size of each chunk of the file.
+                Defaults to 262144.
+            metadata (Optional[dict], optional): Metadata associated with the file.
+                Defaults to None.
+            executor (Optional[Executor], optional): The executor to hash and
+                encode chunks on. Defaults to None, using the default executor of
+                the event loop.
+            max_in_flight (int, optional): The maximum number of chunks pending on
+                the executor. Defaults to 64.
+            buffer_size (int, optional): The number of bytes buffered before writing
+                to the sink. Defaults to 1 MiB.
+            **kwargs: The arguments of the `CARv1Writer`, such as `unixfs`, `roots`
+                or `carv2`. The sink is not seekable, so `reserve_header` is not
+                supported.
+        """
+        self.stream = stream
+        self.sink = sink
+        self.chunk_size = chunk_size
+        self.metadata = metadata
+        self.executor = executor
+        self.max_in_flight = max_in_flight
+        self.buffer_size = buffer_size
+        self._buffer = _Buffer()
+        # The writer may write the header up front, which stays in the buffer
+        # until the first blocks are written.
+        self.car_writer = CARv1Writer(None, cast(BinaryIO, self._buffer), **kwargs)
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+        /,
+    ) -> None:
+        """
+        Exit the context manager, writing what is left of the archive to the sink.
+
+        Args:
+            exc_type (Optional[Type[BaseException]]): The type of the exception, if any.
+            exc_value (Optional[BaseException]): The exception value, if any.
+            traceback (Optional[TracebackType]): The traceback, if any.
+        """
+        self.car_writer.__exit__(exc_type, exc_value, traceback)
+        if exc_type is None:
+            await self._drain(force=True)
+
+    async def _write(self, data: bytes) -> None:
+        """
+        Write data to the sink.
+        """
+        if not hasattr(self.sink, "write"):
+            await self.sink(data)
+            return
+        result = self.sink.write(data)
+        if isawaitable(result):
+            await result
+        drain = getattr(self.sink, "drain", None)
+        if drain is not None:
+            await drain()
+
+    async def _drain(self, force: bool = False) -> None:
+        """
+        Write the buffer to the sink once it holds `buffer_size` bytes, or with
+        `force` as soon as it holds any.
+        """
+        buffered = len(self._buffer.data)
+        if buffered >= self.buffer_size or (force and buffered):
+            await self._write(self._buffer.take())
+
+    async def _read_chunk(
+        self, read: Callable[[int], Awaitable[bytes]], chunk_size: int
+    ) -> bytes:
+        """
+        Read a chunk, awaiting reads until it is full or the stream ended, so that
+        chunks do not depend on how the stream is split.
+        """
+        data = b""
+        while len(data) < chunk_size:
+            part = await read(chunk_size - len(data))
+            if not part:
+                break
+            data += part
+        return data
+
+    async def _write_file(
+        self, read: Callable[[int], Awaitable[bytes]], chunk_size: int
+    ) -> Tuple[int, bytes]:
+        """
+        Read, encode and write the chunks of a file, then the nodes of its DAG.
+
+        Args:
+            read (Callable[[int], Awaitable[bytes]]): The async function reading up
+                to a number of bytes of the file.
+            chunk_size (int): The size of each chunk of the file.
+
+        Returns:
+            Tuple[int, bytes]: The size of a link to the root node of the file and
+                its binary CID.
+        """
+        car_writer = self.car_writer
+        dag = _FileDAG(car_writer)
+        metrics = car_writer.metrics
+        loop = get_running_loop()
+        pending: Deque[Future] = deque()
+        file_size = 0
+
+        async def write_next() -> None:
+            start = perf_counter()
+            cid, block = await pending.popleft()
+            if metrics is not None:
+                # Waiting for the executor is recorded as hashing.
+                metrics.observe("hash", perf_counter() - start)
+            dag.add_chunk(car_writer._write_raw_node(cid, block), cid)
+            await self._drain()
+
+        while True:
+            start = perf_counter()
+            chunk = await self._read_chunk(read, chunk_size)
+            if metrics is not None:
+                metrics.observe("read", perf_counter() - start, len(chunk))
+            if not chunk:
+                break
+            file_size += len(chunk)
+            if len(pending) >= self.max_in_flight:
+                await write_next()
+            pending.append(
+                loop.run_in_executor(
+                    self.executor, _encode_raw_node, chunk, car_writer._wrap_leaves
+                )
+            )
+        while pending:
+            await write_next()
+        node = car_writer._finish_file_node(dag.finish(), file_size)
+        await self._drain()
+        return node
+
+    async def _write_header(self, roots: List[CID]) -> None:
+        """
+        Write the header, streaming the spooled blocks after it, to the sink.
+        """
+        car_writer = self.car_writer
+        start = perf_counter()
+        if car_writer._spool is None:
+            car_writer._write_header(roots)
+        else:
+            header = car_writer._get_final_header(roots)
+            for data in car_writer._iter_spooled_archive(header):
+                await self._write(data)
+        await self._drain(force=True)
+        if car_writer.metrics is not None:
+            car_writer.metrics.observe("header", perf_counter() - start)
+
+    async def get_car(self) -> Optional[CID]:
+        """
+        Generate the archive of the file.
+
+        Returns:
+            Optional[CID]: The CID of the root node, or None without a stream.
+        """
+        if self.stream is None:
+            return None
+        _, cid = await self._write_file(self.stream.read, self.chunk_size)
+        root = decode_cid(cid)
+        await self._write_header([root])
+        return root
+
+
+async def async_folder_to_dag(
+    car_writer: AsyncCARv1Writer,
+    folder_path: str,
+    chunk_size: int = 262144,
+    shard_threshold: Optional[int] = 262144,
+    write_header: bool = True,
+) -> CID:
+    """
+    Build the DAG of a folder and write it to the archive of an AsyncCARv1Writer.
+
+    The files are read one chunk at a time on the default executor of the event
+    loop and encoded on the executor of the writer, and the directory nodes are
+    written on the event loop.
+
+    Args:
+        car_writer (AsyncCARv1Writer): The writer to write the DAG with.
+        folder_path (str): The path of the folder.
+        chunk_size (int, optional): The size of each chunk of a file. Defaults to
+            262144.
+        shard_threshold (Optional[int], optional): The size of the links of a
+            directory above which it is sharded, as with `folder_to_dag`.
+            Defaults to 256 KiB.
+        write_header (bool, optional): Flag indicating whether to write the header
+            with the folder as the only root. Defaults to True.
+
+    Returns:
+        CID: The CID of the root folder node.
+
+    Raises:
+        FileNotFoundError: If the folder does not exist.
+    """
+    if not path.isdir(folder_path):
+        raise FileNotFoundError(f"Folder '{folder_path}' not found.")
+    loop = get_running_loop()
+
+    async def build_file(file_path: str) -> Tuple[int, bytes]:
+        bytestream = await loop.run_in_executor(None, open, file_path, "rb")
+        try:
+            return await car_writer._write_file(
+                partial(loop.run_in_executor, None, bytestream.read), chunk_size
+            )
+        finally:
+            bytestream.close()
+
+    builder = _build_folder(
+        car_writer.car_writer,
+        _walk_folder(folder_path),
+        chunk_size,
+        shard_threshold,
+        None,
+    )
+    try:
+        file_path, _, _ = next(builder)
+        while True:
+            file_path, _, _ = builder.send(await build_file(file_path))
+    except StopIteration as stop:
+        cid = stop.value
+    await car_writer._drain()
+    if write_header:
+        await car_writer._write_header([cid])
+    return cid
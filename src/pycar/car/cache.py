@@ -0,0 +1,195 @@
+from contextlib import AbstractContextManager
+from os import path, stat
+from sqlite3 import connect
+from types import TracebackType
+from typing import Dict, List, NamedTuple, Optional, Tuple, Type
+from .reader import CARv1Reader
+
+
+class CachedFile(NamedTuple):
+    """
+    The blocks of a file in a previous archive.
+
+    Attributes:
+        car (str): The path of the archive.
+        offset (int): The offset of the first section of the file, relative to the
+            first section of the archive.
+        length (int): The number of bytes of the sections of the file.
+        size (int): The size of a link to the file.
+        cid (bytes): The binary CID of the root node of the file.
+    """
+
+    car: str
+    offset: int
+    length: int
+    size: int
+    cid: bytes
+
+
+class FileCache(AbstractContextManager):
+    """
+    Context manager for a persistent cache of the DAGs of files, so that files
+    unchanged since a previous run are not read and hashed again.
+
+    Files are keyed by path, size, modification time and the parameters of their
+    DAG, and map to the span of sections of their blocks in the archive they were
+    last written to. A cached file is copied from that archive, which must still
+    exist unchanged. Entries are committed when the cache is closed, after the
+    archive is, so the cache should enclose the writer.
+
+    Attributes:
+        cache_path (str): The path of the SQLite database of the cache.
+    """
+
+    def __init__(self, cache_path: str):
+        """
+        Initializes a FileCache object.
+
+        Args:
+            cache_path (str): The path of the SQLite database of the cache. It is
+                created if it does not exist.
+        """
+        self.cache_path = cache_path
+        self._db = connect(cache_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS files (path TEXT, size INTEGER, "
+            "mtime_ns INTEGER, params TEXT, car TEXT, car_size INTEGER, "
+            "car_mtime_ns INTEGER, offset INTEGER, length INTEGER, link_size INTEGER, "
+            "cid BLOB, PRIMARY KEY (path, size, mtime_ns, params)) WITHOUT ROWID"
+        )
+        self._pending: List[
+            Tuple[Tuple[str, int, int, str], str, int, int, int, bytes]
+        ] = []
+        self._readers: Dict[str, CARv1Reader] = {}
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+        /,
+    ) -> None:
+        """
+        Exit the context manager, committing the entries added unless an exception
+        was raised, and close the cache.
+
+        Args:
+            exc_type (Optional[Type[BaseException]]): The type of the exception, if any.
+            exc_value (Optional[BaseException]): The exception value, if any.
+            traceback (Optional[TracebackType]): The traceback, if any.
+        """
+        if exc_type is not None:
+            self._pending.clear()
+        self.close()
+
+    @staticmethod
+    def key(file_path: str, params: str) -> Tuple[str, int, int, str]:
+        """
+        Get the key of a file, from its absolute path, size and modification time
+        and the parameters of its DAG.
+
+        Args:
+            file_path (str): The path of the file.
+            params (str): The parameters of the DAG of the file.
+
+        Returns:
+            Tuple[str, int, int, str]: The key.
+        """
+        file_stat = stat(file_path)
+        return (
+            path.abspath(file_path),
+            file_stat.st_size,
+            file_stat.st_mtime_ns,
+            params,
+        )
+
+    def get(self, key: Tuple[str, int, int, str]) -> Optional[CachedFile]:
+        """
+        Look a file up, checking that the archive it was written to is unchanged.
+
+        Args:
+            key (Tuple[str, int, int, str]): The key of the file.
+
+        Returns:
+            Optional[CachedFile]: The blocks of the file, or None if it is not
+                cached or its archive changed.
+        """
+        row = self._db.execute(
+            "SELECT car, car_size, car_mtime_ns, offset, length, link_size, cid "
+            "FROM files WHERE path = ? AND size = ? AND mtime_ns = ? AND params = ?",
+            key,
+        ).fetchone()
+        if row is None:
+            return None
+        car, car_size, car_mtime_ns, offset, length, size, cid = row
+        try:
+            car_stat = stat(car)
+        except OSError:
+            return None
+        if (car_stat.st_size, car_stat.st_mtime_ns) != (car_size, car_mtime_ns):
+            return None
+        return CachedFile(car, offset, length, size, cid)
+
+    def put(
+        self,
+        key: Tuple[str, int, int, str],
+        car: str,
+        offset: int,
+        length: int,
+        size: int,
+        cid: bytes,
+    ) -> None:
+        """
+        Add a file, to be committed when the cache is closed.
+
+        Args:
+            key (Tuple[str, int, int, str]): The key of the file, taken before it
+                was read.
+            car (str): The path of the archive the file was written to.
+            offset (int): The offset of the first section of the file, relative to
+                the first section of the archive.
+            length (int): The number of bytes of the sections of the file.
+            size (int): The size of a link to the file.
+            cid (bytes): The binary CID of the root node of the file.
+        """
+        self._pending.append((key, path.abspath(car), offset, length, size, cid))
+
+    def copy(self, cached: CachedFile, car_writer) -> None:
+        """
+        Copy the blocks of a cached file to an archive.
+
+        Args:
+            cached (CachedFile): The blocks of the file.
+            car_writer (CARv1Writer): The writer of the archive.
+        """
+        reader = self._readers.get(cached.car)
+        if reader is None:
+            reader = self._readers[cached.car] = CARv1Reader(cached.car)
+        reader.bufferedReader.seek(reader.data_offset + cached.offset)
+        car_writer._write_sections(reader.bufferedReader, cached.length)
+
+    def close(self) -> None:
+        """
+        Commit the entries added, with the size and modification time of their
+        archives, and close the cache.
+        """
+        for reader in self._readers.values():
+            reader.bufferedReader.close()
+        self._readers.clear()
+        car_stats: Dict[str, Tuple[int, int]] = {}
+        rows = []
+        for key, car, offset, length, size, cid in self._pending:
+            if car not in car_stats:
+                try:
+                    car_stat = stat(car)
+                except OSError:
+                    continue
+                car_stats[car] = (car_stat.st_size, car_stat.st_mtime_ns)
+            rows.append((*key, car, *car_stats[car], offset, length, size, cid))
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        self._pending.clear()
+        self._db.close()
@@ -1,13 +1,91 @@
 from pycar.abstract import File
-from pycar.protobufs import PBNode, PBLink, Data  # type: ignore
+from pycar.protobufs import Data  # type: ignore
 from contextlib import AbstractContextManager
-from multiformats import CID, multihash, varint  # type: ignore
-from typing import BinaryIO, Optional, Type, Tuple, Generator
+from multiformats import CID, varint  # type: ignore
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Type,
+    Tuple,
+    Generator,
+    Union,
+    cast,
+)
 from types import TracebackType
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
 import dag_cbor  # type: ignore
-from pycar.utils import prepend_data_to_file
-from itertools import islice
-from math import log, ceil
+from pycar.utils import (
+    CIDSet,
+    CallableWriter,
+    VectoredWriter,
+    prepend_data_to_file,
+)
+import os
+from tempfile import SpooledTemporaryFile
+from hashlib import sha256
+from time import perf_counter
+from .dag_pb import PBNodeBuilder
+from .metrics import WriterMetrics
+from .sections import (
+    DAG_PB,
+    RAW,
+    decode_cid,
+    get_cid_prefix,
+    get_section_prefix,
+    read_section,
+)
+from .index import (
+    CARV2_DATA_OFFSET,
+    encode_carv2_header,
+    encode_multihash_index_sorted,
+)
+
+
+# The bytes preceding the digest in the CIDs of each codec, so that CIDs are
+# assembled from a sha2-256 digest without building CID objects.
+_CID_PREFIXES = {"raw": get_cid_prefix(RAW), "dag-pb": get_cid_prefix(DAG_PB)}
+
+
+def _encode_raw_node(
+    raw_data: Union[bytes, memoryview], unixfs: bool
+) -> Tuple[bytes, Union[bytes, memoryview]]:
+    """
+    Encode and hash a chunk of the input file.
+
+    This is a module level function so that it can be sent to a process pool. Raw
+    chunks are hashed and returned as they are, so memoryviews are not copied.
+
+    Args:
+        raw_data (Union[bytes, memoryview]): The chunk to encode.
+        unixfs (bool): Flag indicating whether to wrap the chunk in a UnixFS node.
+
+    Returns:
+        Tuple[bytes, Union[bytes, memoryview]]: The binary CID and block data.
+    """
+    if not unixfs:
+        return (_CID_PREFIXES["raw"] + sha256(raw_data).digest(), raw_data)
+    pbnode = PBNodeBuilder(dtype=Data.DataType.Raw)
+    pbnode.data = raw_data
+    pbnode.blocksizes.append(len(raw_data))
+    block = pbnode.encode()
+    return (_CID_PREFIXES["dag-pb"] + sha256(block).digest(), block)
+
+
+# Number of bytes of sections copied at once from another stream.
+_COPY_SIZE = 1024 * 1024
+_LAYOUTS = ("balanced", "trickle")
+_PROFILES = (None, "kubo")
+_KUBO_MAX_CHILDREN = 174
+# Number of subtrees of each depth linked from a trickle node.
+_TRICKLE_DEPTH_REPEAT = 4
 
 
 class CARv1Writer(AbstractContextManager):
@@ -16,37 +94,205 @@ class CARv1Writer(AbstractContextManager):
 
     Args:
         file (BinaryFile): The binary file object to write to.
-        name (str): The name of the CARv1 file to create.
+        name (Union[str, BinaryIO, Callable[[bytes], object]]): The name of the
+            CARv1 file to create, or a writable binary stream or callable to stream
+            the archive to.
         unixfs (bool): Flag indicating whether to use UnixFS format.
+        reserve_header (bool): Flag indicating whether to reserve the header slot
+            up front and write the archive in a single pass.
+        roots (Optional[List[CID]]): The roots of the archive, if known up front.
+        executor (Optional[Executor]): The executor to hash and encode chunks on.
+        dedup (Union[bool, CIDSet]): Flag indicating whether to skip blocks that
+            were already written, or the set tracking the written blocks.
+        carv2 (bool): Flag indicating whether to wrap the archive in a CARv2 file
+            with a MultihashIndexSorted index.
+        layout (str): The layout of the DAG of a file, "balanced" or "trickle".
+        profile (Optional[str]): The import profile to match, such as "kubo".
+        metrics (Optional[WriterMetrics]): The metrics to record the stages in.
+        write_header (bool): Flag indicating whether to write a header, or only the
+            sections of the blocks.
 
     Attributes:
         file (BinaryFile): The binary file object being written to.
-        name (str): The name of the CARv1 file being created.
-        bufferedWriter (BinaryIO): The buffered writer for the CARv1 file.
+        name (Union[str, BinaryIO, Callable[[bytes], object]]): The name of the
+            CARv1 file being created, or the stream or callable it is streamed to.
+        sink (BinaryIO): The stream the archive ends up in.
+        bufferedWriter (BinaryIO): The buffered writer blocks are written to. This is
+            the sink itself, or a spool while the root is not known yet.
         unixfs (bool): Flag indicating whether to use UnixFS format.
+        reserve_header (bool): Flag indicating whether the header slot was reserved.
+        roots (Optional[List[CID]]): The roots written up front, if any.
+        executor (Optional[Executor]): The executor chunks are hashed and encoded on.
+        max_in_flight (int): The maximum number of chunks pending on the executor.
+        emitted (Optional[CIDSet]): The binary CIDs of the blocks written so far, if
+            duplicate blocks are skipped.
+        offset (int): The number of bytes of sections written so far, which is the
+            offset of the next section relative to the first one.
+        index (Optional[Dict[bytes, int]]): The offset of the section of every block
+            by binary CID, relative to the first section, if writing a CARv2 file.
+        layout (str): The layout of the DAG of a file.
+        profile (Optional[str]): The import profile matched, if any.
+        metrics (Optional[WriterMetrics]): The metrics the stages are recorded in.
+        write_header (bool): Flag indicating whether a header is written.
     """
 
     def __init__(
         self,
         file: Optional[File],
-        name: str,
+        name: Union[str, BinaryIO, Callable[[bytes], object]],
         unixfs: bool = False,
         max_children: int = 1024,
+        reserve_header: bool = False,
+        roots: Optional[List[CID]] = None,
+        spool_size: int = 64 * 1024 * 1024,
+        executor: Optional[Executor] = None,
+        max_in_flight: int = 64,
+        dedup: Union[bool, CIDSet] = False,
+        carv2: bool = False,
+        layout: str = "balanced",
+        profile: Optional[str] = None,
+        metrics: Optional[WriterMetrics] = None,
+        write_header: bool = True,
     ):
         """
         Initializes a CARv1Writer object.
 
+        The header is written in one of four ways:
+
+        - With `roots`, it is written before any block and blocks are streamed
+          straight to the sink.
+        - With `reserve_header`, a placeholder is written and filled in place once
+          the root is known. The sink must be seekable.
+        - With the name of a file, it is prepended to the finished file.
+        - Otherwise, blocks are spooled, in memory up to `spool_size` bytes and on
+          disk beyond that, and streamed to the sink after the header.
+
+        With `carv2`, the CARv2 pragma and header are reserved in front of the CARv1
+        header of a seekable sink, which then always gets a reserved header slot
+        unless the roots are known, and are filled in once the index is appended.
+        Other sinks are always spooled.
+
         Args:
             file (BinaryFile): The binary file object to write to.
-            name (str): The name of the CARv1 file to create.
+            name (Union[str, BinaryIO, Callable[[bytes], object]]): The name of the
+                CARv1 file to create, or a writable binary stream or callable to
+                stream the archive to. Streams are flushed but left open.
             unixfs (bool, optional): Flag indicating whether to use UnixFS format. Defaults to False.
             max_children (int, optional): Maximum number of children per node. Defaults to 1024.
+            reserve_header (bool, optional): Flag indicating whether to write a
+                fixed-width placeholder for the header before any block, and fill it
+                in place once the root is known, instead of prepending the header
+                to the finished archive. Defaults to False.
+            roots (Optional[List[CID]], optional): The roots of the archive, if known
+                up front. Defaults to None.
+            spool_size (int, optional): Maximum number of bytes spooled in memory
+                before spilling to disk. Defaults to 64 MiB.
+            executor (Optional[Executor], optional): The executor to hash and encode
+                chunks on. A ProcessPoolExecutor also parallelizes the protobuf
+                encoding of UnixFS leaves, a ThreadPoolExecutor only the hashing of
+                chunks of 2 KiB and more. Defaults to None, hashing and encoding
+                chunks one at a time.
+            max_in_flight (int, optional): The maximum number of chunks pending on
+                the executor. Defaults to 64.
+            dedup (Union[bool, CIDSet], optional): Flag indicating whether to skip
+                blocks that were already written. Pass a CIDSet to bound the memory
+                used to track them. Defaults to False.
+            carv2 (bool, optional): Flag indicating whether to wrap the archive in a
+                CARv2 file, with a MultihashIndexSorted index of the offsets of the
+                blocks appended after it. Defaults to False.
+            layout (str, optional): The layout of the DAG of a file. "balanced"
+                fills every layer before adding the next one, "trickle" links the
+                first chunks from the root and adds deeper subtrees as the file
+                grows, so that readers can stream it after fetching a few blocks.
+                Defaults to "balanced".
+            profile (Optional[str], optional): The import profile to match. "kubo"
+                produces the same CIDs as `ipfs add --cid-version=1`: raw leaves,
+                at most 174 children per node, unnamed links with cumulative sizes,
+                the UnixFS file sizes of the children, and canonical dag-pb nodes.
+                Files must be chunked in 256 KiB chunks to match its default
+                chunker. It overrides `unixfs` and `max_children`. Defaults to None.
+            metrics (Optional[WriterMetrics], optional): The metrics to record the
+                time, bytes and blocks of each stage in. Defaults to None.
+            write_header (bool, optional): Flag indicating whether to write a
+                header. Without it, only the sections of the blocks are written,
+                straight to the sink, such as to build a file into a spool that is
+                copied into another archive. Defaults to True.
+
+        Raises:
+            ValueError: If `reserve_header` is set for a sink that is not seekable,
+                if the layout or profile is unknown, or if `reserve_header`,
+                `roots` or `carv2` is set without `write_header`.
         """
+        if layout not in _LAYOUTS:
+            raise ValueError(f"Unknown layout {layout!r}.")
+        if profile not in _PROFILES:
+            raise ValueError(f"Unknown profile {profile!r}.")
+        if profile == "kubo":
+            unixfs, max_children = True, _KUBO_MAX_CHILDREN
+        if not write_header and (reserve_header or roots is not None or carv2):
+            raise ValueError(
+                "reserve_header, roots and carv2 need write_header to be set."
+            )
         self.file = file
         self.name = name
-        self.bufferedWriter: BinaryIO = open(name, "wb")
         self.unixfs = unixfs
         self.max_children = max_children
+        self.reserve_header = reserve_header
+        self.roots = roots
+        self.executor = executor
+        self.max_in_flight = max_in_flight
+        self.emitted: Optional[CIDSet] = None
+        self._owns_emitted = False
+        if isinstance(dedup, CIDSet):
+            self.emitted = dedup
+        elif dedup:
+            self.emitted = CIDSet()
+            self._owns_emitted = True
+        self.carv2 = carv2
+        self.layout = layout
+        self.profile = profile
+        self.metrics = metrics
+        self.write_header = write_header
+        # The roots added with add_file and add_folder, in order.
+        self._added_roots: List[CID] = []
+        # Leaves are wrapped in UnixFS nodes unless the profile uses raw leaves.
+        self._wrap_leaves = unixfs and profile is None
+        self.offset = 0
+        self.index: Optional[Dict[bytes, int]] = {} if carv2 else None
+        self._header_slot: Optional[int] = None
+        self._header_offset = 0
+        self._carv2_offset: Optional[int] = None
+        self._spool: Optional[SpooledTemporaryFile] = None
+
+        self.sink: BinaryIO
+        if isinstance(name, str):
+            self.sink = self._open_file(name)
+        elif hasattr(name, "write"):
+            self.sink = cast(BinaryIO, name)
+        else:
+            self.sink = CallableWriter(name)  # type: ignore
+        self.bufferedWriter: BinaryIO = self.sink
+        seekable = getattr(self.sink, "seekable", lambda: False)()
+
+        if not write_header:
+            return
+        if carv2 and seekable:
+            self._carv2_offset = self.sink.tell()
+            self.bufferedWriter.write(bytes(CARV2_DATA_OFFSET))
+        if carv2 and not seekable:
+            if reserve_header:
+                raise ValueError("Reserving the header requires a seekable sink.")
+            self._spool = SpooledTemporaryFile(max_size=spool_size)
+            self.bufferedWriter = self._spool  # type: ignore
+        elif roots is not None:
+            self.bufferedWriter.write(self._get_header(roots))
+        elif reserve_header or carv2:
+            if not seekable:
+                raise ValueError("Reserving the header requires a seekable sink.")
+            self._reserve_header_slot()
+        elif not isinstance(name, str):
+            self._spool = SpooledTemporaryFile(max_size=spool_size)
+            self.bufferedWriter = self._spool  # type: ignore
 
     def __exit__(
         self,
@@ -58,16 +304,25 @@ class CARv1Writer(AbstractContextManager):
         """
         Exit the context manager and close the buffered writer.
 
+        Exceptions raised inside the context are not suppressed.
+
         Args:
             exc_type (Optional[Type[BaseException]]): The type of the exception, if any.
             exc_value (Optional[BaseException]): The exception value, if any.
             traceback (Optional[TracebackType]): The traceback, if any.
 
         Returns:
-                Optional[bool]: True if the buffered writer was closed successfully, False otherwise.
+            Optional[bool]: None, so that exceptions propagate.
         """
-        self.bufferedWriter.close()
-        return True
+        if self._spool is not None:
+            self._spool.close()
+        if self._owns_emitted:
+            self.emitted.close()  # type: ignore
+        if isinstance(self.name, str):
+            self.sink.close()
+        else:
+            self.sink.flush()
+        return None
 
     def _gen_cid(self, data: bytes, codec: str) -> CID:
         """
@@ -80,190 +335,539 @@ class CARv1Writer(AbstractContextManager):
         Returns:
             CID: The generated CID.
         """
-        hash_value: bytes = multihash.digest(data, "sha2-256")
-        return CID("base32", version=1, codec=codec, digest=hash_value)
+        return decode_cid(self._gen_cid_bytes(data=data, codec=codec))
 
-    def _get_block(self, cid: CID, data: bytes) -> bytes:
+    def _gen_cid_bytes(self, data: bytes, codec: str) -> bytes:
+        """
+        Generate the binary CID for the given data, without building a CID object.
+
+        Args:
+            data (bytes): The data to calculate the CID for.
+            codec (str): The codec to use for the CID, "raw" or "dag-pb".
+
+        Returns:
+            bytes: The binary CID.
+        """
+        return _CID_PREFIXES[codec] + sha256(data).digest()
+
+    def _get_block(self, cid: Union[CID, bytes], data: bytes) -> bytes:
         """
         Get a block with the given CID and data.
 
         Args:
-            cid (CID): The CID for the block.
+            cid (Union[CID, bytes]): The CID for the block.
             data (bytes): The data for the block.
 
         Returns:
             bytes: The block data.
         """
-        cid = bytes(cid)
-        return varint.encode(len(cid) + len(data)) + cid + data
+        return self._get_block_prefix(cid=bytes(cid), size=len(data)) + data
 
-    def _get_pbnode(self, dtype: Data.DataType) -> Tuple[PBNode, Data]:
+    def _open_file(self, file_name: str) -> BinaryIO:
         """
-        Create a PBNode and corresponding UnixFS Data object.
+        Open a file to write an archive to, with vectored writes where available.
 
         Args:
-            dtype (Data.DataType): The data type for the PBNode.
+            file_name (str): The path of the file.
 
         Returns:
-            Tuple[PBNode, Data]: A tuple containing the PBNode and UnixFS Data objects.
+            BinaryIO: The writable file.
         """
-        pbnode: PBNode = PBNode()
-        unixfs: Data = Data()
-        unixfs.Type = dtype
-        return (pbnode, unixfs)
+        if hasattr(os, "writev"):
+            return VectoredWriter(file_name)  # type: ignore
+        return open(file_name, "wb")
 
-    def _get_pblink(self, cid: CID, name: str, size: int) -> PBLink:
+    def _get_block_prefix(self, cid: bytes, size: int) -> bytes:
         """
-        Create a PBLink object.
+        Get the varint and CID preceding the data of a block.
 
         Args:
-            cid (CID): The CID for the link.
-            name (str): The name of the link.
-            size (int): The size of the linked data.
+            cid (bytes): The binary CID for the block.
+            size (int): The size of the data for the block.
+
+        Returns:
+            bytes: The block prefix.
+        """
+        return get_section_prefix(cid=cid, size=size)
+
+    def _write_block(self, cid: bytes, *parts: Union[bytes, memoryview]) -> None:
+        """
+        Write a block to the CARv1 file, unless it was already written and duplicate
+        blocks are skipped.
+
+        The block is passed in parts, such as its prefix and its data, so that the
+        data is handed to the writer without being copied into a single buffer.
+
+        Args:
+            cid (bytes): The binary CID for the block.
+            *parts (Union[bytes, memoryview]): The parts of the block, as returned by
+                `_get_block` or `_get_block_prefix` followed by the data.
+        """
+        metrics = self.metrics
+        if self.emitted is not None and not self.emitted.add(cid):
+            if metrics is not None:
+                metrics.add_duplicate()
+            return
+        if self.index is not None:
+            self.index.setdefault(cid, self.offset)
+        if metrics is not None:
+            start, offset = perf_counter(), self.offset
+        for part in parts:
+            self.bufferedWriter.write(part)
+            self.offset += len(part)
+        if metrics is not None:
+            metrics.observe("write", perf_counter() - start, self.offset - offset)
+
+    def _timed(self, stage: str, func: Callable, *args) -> Any:
+        """
+        Call a function, recording it as a run of a stage if metrics are enabled.
+
+        Args:
+            stage (str): The stage.
+            func (Callable): The function.
+            *args: The arguments of the function.
+
+        Returns:
+            Any: The result of the function.
+        """
+        if self.metrics is None:
+            return func(*args)
+        return self.metrics.call(stage, func, *args)
+
+    def _write_sections(self, stream: BinaryIO, length: Optional[int] = None) -> None:
+        """
+        Write the sections read from a stream, such as the blocks of a file built
+        into a spool of its own or copied from another archive.
+
+        Sections are copied as they are, unless duplicate blocks are skipped or the
+        blocks are indexed, in which case they are written one at a time.
+
+        Args:
+            stream (BinaryIO): The stream positioned at the first section.
+            length (Optional[int], optional): The number of bytes of sections to
+                write. Defaults to None, writing sections up to the end of the
+                stream.
+        """
+        written = 0
+        if self._copies_sections():
+            start = perf_counter()
+            while length is None or written < length:
+                size = (
+                    _COPY_SIZE if length is None else min(_COPY_SIZE, length - written)
+                )
+                data = stream.read(size)
+                if not data:
+                    break
+                self.bufferedWriter.write(data)
+                written += len(data)
+            self.offset += written
+            if self.metrics is not None:
+                self.metrics.observe("write", perf_counter() - start, written)
+            return
+        while length is None or written < length:
+            section = read_section(stream)
+            if section is None:
+                break
+            cid, block = section
+            self._write_block(cid, block)
+            written += len(block)
+
+    def _copies_sections(self) -> bool:
+        """
+        Check whether `_write_sections` can copy sections as they are, rather than
+        writing them one block at a time.
+        """
+        return self.emitted is None and self.index is None
+
+    def _get_pbnode(self, dtype: Data.DataType) -> PBNodeBuilder:
+        """
+        Create a dag-pb node with UnixFS data.
+
+        Args:
+            dtype (Data.DataType): The data type for the node.
 
         Returns:
-            PBLink: The PBLink object.
+            PBNodeBuilder: The node.
         """
-        pblink = PBLink()
-        pblink.Hash = bytes(cid)
-        pblink.Name = name
-        pblink.Tsize = size
-        return pblink
+        return PBNodeBuilder(dtype=dtype)
 
     def _serialize_and_write_pbnode(
-        self, pbnode: PBNode, unixfs: Data, codec: str = "dag-pb"
-    ) -> Tuple[bytes, CID]:
+        self, pbnode: PBNodeBuilder, codec: str = "dag-pb"
+    ) -> Tuple[bytes, bytes]:
         """
-        Serialize a PBNode and UnixFS Data object, then write to the CARv1 file.
+        Serialize a dag-pb node, then write to the CARv1 file.
 
         Args:
-            pbnode (PBNode): The PBNode object to serialize.
-            unixfs (Data): The UnixFS Data object to serialize.
+            pbnode (PBNodeBuilder): The node to serialize.
             codec (str, optional): The codec to use for serialization. Defaults to "dag-pb".
 
         Returns:
-            Tuple[bytes, CID]: The block data and CID of the serialized node.
+            Tuple[bytes, bytes]: The block data and binary CID of the serialized
+                node.
         """
-        pbnode.Data = unixfs.SerializeToString()
-        pbnode_bytes = pbnode.SerializeToString()
-
-        cid = self._gen_cid(data=pbnode_bytes, codec=codec)
+        # Canonical dag-pb, as written by kubo, writes the links before the data.
+        pbnode_bytes = self._timed("encode", pbnode.encode, self.profile == "kubo")
+        cid = self._timed("hash", self._gen_cid_bytes, pbnode_bytes, codec)
         pbnode_block = self._get_block(cid=cid, data=pbnode_bytes)
-        self.bufferedWriter.write(pbnode_block)
+        self._write_block(cid, pbnode_block)
+        if self.metrics is not None:
+            self.metrics.add_block()
         return (pbnode_block, cid)
 
-    def _get_raw_node(self) -> Generator[Tuple[bytes, CID], None, None]:
+    def _get_raw_node(self) -> Generator[Tuple[int, bytes], None, None]:
         """
         Generate raw node blocks from the input file.
 
+        With an executor, up to `max_in_flight` chunks are hashed and encoded
+        concurrently, and blocks are still written in the order of the chunks.
+
         Yields:
-            Generator[Tuple[bytes, CID], None, None]: Generator of block data and CIDs.
+            Generator[Tuple[int, bytes], None, None]: Generator of section sizes, or
+                block sizes with the kubo profile, and binary CIDs.
         """
         if not self.file:
             return None
-        for raw_data in self.file:
+        metrics = self.metrics
+        chunks: Iterable = self.file
+        if metrics is not None:
+            chunks = metrics.iterate("read", chunks)
+        if self.executor is not None:
+            encoded_nodes: Iterator[Tuple[bytes, Union[bytes, memoryview]]] = (
+                self._map_in_order(chunks)
+            )
+        elif metrics is None:
+            encoded_nodes = (
+                _encode_raw_node(raw_data, self._wrap_leaves) for raw_data in chunks
+            )
+        else:
+            encoded_nodes = (
+                metrics.call("hash", _encode_raw_node, raw_data, self._wrap_leaves)
+                for raw_data in chunks
+            )
 
-            codec, block = "raw", raw_data
-            if self.unixfs:
-                pbnode, unixfs = self._get_pbnode(dtype=Data.DataType.Raw)
-                unixfs.Data = raw_data
-                unixfs.blocksizes.extend([len(raw_data)])
-                pbnode.Data = unixfs.SerializeToString()
-                codec, block = "dag-pb", pbnode.SerializeToString()
+        for cid, block in encoded_nodes:
+            yield (self._write_raw_node(cid, block), cid)
 
-            cid: CID = self._gen_cid(data=block, codec=codec)
-            block = self._get_block(cid=cid, data=block)
+    def _write_raw_node(self, cid: bytes, block: Union[bytes, memoryview]) -> int:
+        """
+        Write an encoded chunk of the input file.
 
-            self.bufferedWriter.write(block)
+        Args:
+            cid (bytes): The binary CID of the chunk.
+            block (Union[bytes, memoryview]): The block data of the chunk.
 
-            yield (block, cid)
+        Returns:
+            int: The size of the section, or of the block with the kubo profile.
+        """
+        prefix = self._get_block_prefix(cid=cid, size=len(block))
+        self._write_block(cid, prefix, block)
+        if self.metrics is not None:
+            self.metrics.add_block()
+        if self.profile == "kubo":
+            return len(block)
+        return len(prefix) + len(block)
 
-    def _get_intermediate_node(self) -> Generator[Tuple[bytes, CID], None, None]:
+    def _map_in_order(
+        self, chunks: Iterable[bytes]
+    ) -> Generator[Tuple[bytes, bytes], None, None]:
         """
-        Generate intermediate file node blocks from raw node blocks.
+        Encode chunks on the executor, keeping at most `max_in_flight` of them
+        pending and yielding the results in the order of the chunks.
+
+        Args:
+            chunks (Iterable[bytes]): The chunks to encode.
 
         Yields:
-            Generator[Tuple[bytes, CID], None, None]: Generator of block data and CIDs.
+            Generator[Tuple[bytes, bytes], None, None]: Generator of binary CIDs
+                and block data.
         """
+        pending: Deque[Future] = deque()
+        to_process = isinstance(self.executor, ProcessPoolExecutor)
+        for raw_data in chunks:
+            if to_process and isinstance(raw_data, memoryview):
+                raw_data = raw_data.tobytes()
+            if len(pending) >= self.max_in_flight:
+                # Waiting for the executor is recorded as hashing.
+                yield self._timed("hash", pending.popleft().result)
+            pending.append(
+                self.executor.submit(  # type: ignore
+                    _encode_raw_node, raw_data, self._wrap_leaves
+                )
+            )
+        while pending:
+            yield self._timed("hash", pending.popleft().result)
 
-        pbnode, unixfs = self._get_pbnode(dtype=Data.DataType.File)
-        for i, (data, cid) in enumerate(self._get_raw_node()):
-            link = self._get_pblink(cid=cid, name=f"Chunks{i}", size=len(data))
-            pbnode.Links.extend([link])
-            unixfs.blocksizes.extend([len(data)])
+    def _add_file_link(
+        self,
+        pbnode: PBNodeBuilder,
+        cid: bytes,
+        name: str,
+        size: int,
+        filesize: int,
+    ) -> None:
+        """
+        Link a chunk or a subtree of a file from a file node.
 
-            if (i + 1) % self.max_children == 0:
-                pbnode_block, cid = self._serialize_and_write_pbnode(
-                    pbnode=pbnode, unixfs=unixfs
-                )
-                yield (pbnode_block, cid)
-                pbnode, unixfs = self._get_pbnode(dtype=Data.DataType.File)
+        With the kubo profile the link is unnamed and the UnixFS data records the
+        file size of the child, otherwise it records the size of the link.
 
-        if len(pbnode.Links) > 0:
-            pbnode_block, cid = self._serialize_and_write_pbnode(
-                pbnode=pbnode, unixfs=unixfs
-            )
-            yield (pbnode_block, cid)
+        Args:
+            pbnode (PBNodeBuilder): The file node.
+            cid (bytes): The binary CID of the child.
+            name (str): The name of the link.
+            size (int): The size of the link.
+            filesize (int): The number of bytes of the file under the child.
+        """
+        if self.profile == "kubo":
+            pbnode.add_link(cid=cid, name="", size=size)
+            pbnode.blocksizes.append(filesize)
+            pbnode.filesize = (pbnode.filesize or 0) + filesize
+            return
+        pbnode.add_link(cid=cid, name=name, size=size)
+        pbnode.blocksizes.append(size)
 
-    def _build_dag(self) -> Tuple[CID, int]:
+    def _write_file_node(self, pbnode: PBNodeBuilder) -> Tuple[int, int, bytes]:
         """
-        Generate the root node by building layers of file nodes.
+        Write a file node and get the size of a link to it.
+
+        With the kubo profile the size of a link is the cumulative size of the
+        blocks under it, otherwise it is the size of the section of the node.
+
+        Args:
+            pbnode (PBNodeBuilder): The file node.
 
         Returns:
-            Tuple[CID, int]: The CID of the root node and the number of layers.
-        """
-        parents = [(len(block), cid) for block, cid in self._get_intermediate_node()]
-        layers = int(ceil(log(len(parents), self.max_children)))
-
-        for layer in range(layers):
-            new_parents = []
-            for starting_index in range(0, len(parents), self.max_children):
-                pbnode, unixfs = self._get_pbnode(dtype=Data.DataType.File)
-                for i, (size, cid) in enumerate(
-                    islice(parents, starting_index, self.max_children + starting_index)
-                ):
-                    link = self._get_pblink(
-                        cid=cid, name=f"File_Layer:{layer}:Chunk{i}", size=size
-                    )
-
-                    pbnode.Links.extend([link])
-                    unixfs.blocksizes.extend([size])
-
-                pbnode_block, new_cid = self._serialize_and_write_pbnode(
-                    pbnode=pbnode, unixfs=unixfs
-                )
-                new_parents.append((len(pbnode_block), new_cid))
+            Tuple[int, int, bytes]: The size of a link to the node, the number of bytes
+                of the file under it with the kubo profile, otherwise 0, and its binary
+                CID.
+        """
+        pbnode_block, cid = self._serialize_and_write_pbnode(pbnode=pbnode)
+        if self.profile == "kubo":
+            return (pbnode.byte_size + sum(pbnode.sizes), pbnode.filesize or 0, cid)
+        return (len(pbnode_block), 0, cid)
 
-            parents = new_parents
+    def _write_empty_file(self) -> Tuple[int, int, bytes]:
+        """
+        Write the root of an empty file: an empty raw block with the kubo profile,
+        otherwise a file node without links.
 
-        return parents[0][1]
+        Returns:
+            Tuple[int, int, bytes]: The size of a link to the root, the number of bytes
+                of the file and its binary CID.
+        """
+        if self.profile == "kubo":
+            cid = self._gen_cid_bytes(data=b"", codec="raw")
+            self._write_block(cid, self._get_block(cid=cid, data=b""))
+            if self.metrics is not None:
+                self.metrics.add_block()
+            return (0, 0, cid)
+        return self._write_file_node(pbnode=self._get_pbnode(dtype=Data.DataType.File))
 
-    def _get_file_node(self, with_name_node=False) -> Optional[Tuple[int, CID]]:
+    def _get_file_node(self, with_name_node=False) -> Optional[Tuple[int, bytes]]:
         """
         Get the root node for the CARv1 file.
 
         Returns:
-            CID: The CID of the root node.
+            Tuple[int, bytes]: The size of a link to the root node, which is the size
+                of the file, or the cumulative size of its blocks with the kubo
+                profile, and the binary CID of the root node.
         """
         if not self.file:
             return None
-        file_cid = self._build_dag()
-        size = self.file.bufferedReader.tell()
+        size, file_cid = self.write_file(self.file)
         if with_name_node:
-            pbnode, unixfs = self._get_pbnode(dtype=Data.DataType.File)
-            link = self._get_pblink(
-                cid=file_cid, name=self.file.metadata["name"], size=size
-            )
-            pbnode.Links.extend([link])
-            unixfs.blocksizes.extend([size])
-            _, file_cid = self._serialize_and_write_pbnode(pbnode=pbnode, unixfs=unixfs)
+            pbnode = self._get_pbnode(dtype=Data.DataType.File)
+            pbnode.add_link(cid=file_cid, name=self.file.metadata["name"], size=size)
+            pbnode.blocksizes.append(size)
+            _, file_cid = self._serialize_and_write_pbnode(pbnode=pbnode)
         return (size, file_cid)
 
-    def _write_header(self, cid: CID) -> None:
-        encoded_root_node = dag_cbor.encode({"roots": [cid], "version": 1})
-        header = varint.encode(len(encoded_root_node)) + encoded_root_node
+    def _finish_file_node(
+        self, root: Tuple[int, int, bytes], file_size: int
+    ) -> Tuple[int, bytes]:
+        """
+        Get the size of a link to the root node of a file.
+
+        Args:
+            root (Tuple[int, int, bytes]): The size of a link to the root node, the
+                number of bytes of the file with the kubo profile and its binary CID,
+                as returned by `_FileDAG.finish`.
+            file_size (int): The number of bytes of the file.
+
+        Returns:
+            Tuple[int, bytes]: The size of a link to the root node, which is the size
+                of the file, or the cumulative size of its blocks with the kubo
+                profile, and its binary CID.
+        """
+        size, _, file_cid = root
+        if self.profile != "kubo":
+            size = file_size
+        return (size, file_cid)
+
+    def write_file(self, file: File) -> Tuple[int, bytes]:
+        """
+        Build the DAG of a file and write its blocks, without writing the header.
+
+        Args:
+            file (File): The file to write, chunked with its own chunk size.
+
+        Returns:
+            Tuple[int, bytes]: The size of a link to the root node, which is the size
+                of the file, or the cumulative size of its blocks with the kubo
+                profile, and the binary CID of the root node.
+        """
+        previous, self.file = self.file, file
+        try:
+            dag = _FileDAG(self)
+            for size, cid in self._get_raw_node():
+                dag.add_chunk(size, cid)
+            return self._finish_file_node(dag.finish(), file.bufferedReader.tell())
+        finally:
+            self.file = previous
+
+    def _get_header(self, roots: List[CID]) -> bytes:
+        """
+        Get the varint-prefixed DAG-CBOR header for the given roots.
+
+        Args:
+            roots (List[CID]): The CIDs of the root nodes.
+
+        Returns:
+            bytes: The header data.
+        """
+        encoded_root_node = dag_cbor.encode({"roots": roots, "version": 1})
+        return varint.encode(len(encoded_root_node)) + encoded_root_node
+
+    def _reserve_header_slot(self) -> None:
+        """
+        Write a zero-filled placeholder as wide as the header of a single root.
+
+        Every root produced by this writer is a CIDv1 with a single byte codec and a
+        sha2-256 multihash, so the header width does not depend on the final root.
+        """
+        placeholder = self._get_header([self._gen_cid(data=b"", codec="dag-pb")])
+        self._header_offset = self.sink.tell()
+        self._header_slot = len(placeholder)
+        self.bufferedWriter.write(bytes(self._header_slot))
+
+    def _write_header(self, roots: List[CID]) -> None:
+        """
+        Write the header for the given roots to the CARv1 file, and with `carv2` the
+        index and the CARv2 header.
+
+        Args:
+            roots (List[CID]): The CIDs of the root nodes.
+
+        Raises:
+            ValueError: If a root is not one of the roots written up front, or the
+                header does not fit the reserved header slot.
+        """
+        if not self.write_header:
+            self.bufferedWriter.flush()
+            return
+        header = self._get_final_header(roots)
+
+        if self._spool is not None:
+            for data in self._iter_spooled_archive(header):
+                self.sink.write(data)
+            self.sink.flush()
+            return
+
+        if self.roots is not None:
+            pass
+        elif self._header_slot is None:
+            self.bufferedWriter.flush()
+            prepend_data_to_file(file_name=self.name, data=header)  # type: ignore
+            return
+        elif len(header) != self._header_slot:
+            raise ValueError(
+                f"Header of {len(header)} bytes does not fit the reserved slot "
+                f"of {self._header_slot} bytes."
+            )
+        else:
+            end = self.bufferedWriter.tell()
+            self.bufferedWriter.seek(self._header_offset)
+            self.bufferedWriter.write(header)
+            self.bufferedWriter.seek(end)
+
+        if self._carv2_offset is not None:
+            data_size = len(header) + self.offset
+            self.bufferedWriter.write(self._get_index(len(header)))
+            end = self.bufferedWriter.tell()
+            self.bufferedWriter.seek(self._carv2_offset)
+            self.bufferedWriter.write(
+                encode_carv2_header(
+                    CARV2_DATA_OFFSET, data_size, CARV2_DATA_OFFSET + data_size
+                )
+            )
+            self.bufferedWriter.seek(end)
         self.bufferedWriter.flush()
-        prepend_data_to_file(file_name=self.name, data=header)
+
+    def _get_final_header(self, roots: List[CID]) -> bytes:
+        """
+        Get the header for the given roots, or for the roots written up front.
+
+        Args:
+            roots (List[CID]): The CIDs of the root nodes.
+
+        Returns:
+            bytes: The header data.
+
+        Raises:
+            ValueError: If a root is not one of the roots written up front.
+        """
+        if self.roots is not None:
+            for cid in roots:
+                if cid not in self.roots:
+                    raise ValueError(f"Root {cid} was not written to the header.")
+        return self._get_header(self.roots or roots)
+
+    def _iter_spooled_archive(self, header: bytes) -> Generator[bytes, None, None]:
+        """
+        Generate the pieces of a spooled archive in the order they are streamed to
+        the sink: with `carv2` the CARv2 header, then the header and the spooled
+        sections, and with `carv2` the index. The spool is closed once the sections
+        are read, and blocks are written to the sink from then on.
+
+        Args:
+            header (bytes): The header of the archive.
+
+        Yields:
+            Generator[bytes, None, None]: Generator of the pieces of the archive.
+        """
+        spool = cast(SpooledTemporaryFile, self._spool)
+        if self.carv2:
+            data_size = len(header) + self.offset
+            yield encode_carv2_header(
+                CARV2_DATA_OFFSET, data_size, CARV2_DATA_OFFSET + data_size
+            )
+        yield header
+        spool.seek(0)
+        while True:
+            data = spool.read(_COPY_SIZE)
+            if not data:
+                break
+            yield data
+        spool.close()
+        self._spool = None
+        self.bufferedWriter = self.sink
+        if self.carv2:
+            yield self._get_index(len(header))
+
+    def _get_index(self, header_size: int) -> bytes:
+        """
+        Get the CARv2 index of the blocks written so far.
+
+        Args:
+            header_size (int): The size of the CARv1 header preceding the sections.
+
+        Returns:
+            bytes: The MultihashIndexSorted index.
+        """
+        return encode_multihash_index_sorted(
+            (cid, header_size + offset)
+            for cid, offset in self.index.items()  # type: ignore
+        )
 
     def get_car(self) -> Optional[CID]:
         """
@@ -275,6 +879,296 @@ class CARv1Writer(AbstractContextManager):
         node = self._get_file_node()
         if not node:
             return None
-        _, cid = node
-        self._write_header(cid=cid)
+        cid = decode_cid(node[1])
+        self._timed("header", self._write_header, [cid])
         return cid
+
+    def _track_shared_blocks(self) -> None:
+        """
+        Skip duplicate blocks from the first entry added on, so that blocks shared
+        between entries are written once.
+        """
+        if self.emitted is None:
+            self.emitted = CIDSet()
+            self._owns_emitted = True
+
+    def _add_root(self, cid: CID) -> CID:
+        """
+        Record a root of a multi-root archive, unless it was already added.
+
+        Args:
+            cid (CID): The CID of the root.
+
+        Returns:
+            CID: The CID of the root.
+        """
+        if cid not in self._added_roots:
+            self._added_roots.append(cid)
+        return cid
+
+    def add_file(self, file: File) -> CID:
+        """
+        Build the DAG of a file and write its blocks, without writing the header,
+        to add it as a root of a multi-root archive finished by `finalize`.
+
+        Args:
+            file (File): The file to add, chunked with its own chunk size.
+
+        Returns:
+            CID: The CID of the root node of the file.
+        """
+        self._track_shared_blocks()
+        _, cid = self.write_file(file)
+        return self._add_root(decode_cid(cid))
+
+    def add_folder(self, folder_path: str, **kwargs) -> CID:
+        """
+        Build the DAG of a folder and write its blocks, without writing the header,
+        to add it as a root of a multi-root archive finished by `finalize`.
+
+        Args:
+            folder_path (str): The path of the folder.
+            **kwargs: The arguments of `folder_to_dag`, such as `chunk_size`.
+
+        Returns:
+            CID: The CID of the root folder node.
+        """
+        from .utils import folder_to_dag
+
+        self._track_shared_blocks()
+        cid = folder_to_dag(self, folder_path, write_header=False, **kwargs)
+        return self._add_root(cid)
+
+    def finalize(self, roots: Optional[List[CID]] = None) -> List[CID]:
+        """
+        Write the header of an archive built with `add_file` and `add_folder`.
+
+        The archive must be written by name, streamed through a spool or have its
+        roots known up front: a reserved header slot, as with `reserve_header` or
+        `carv2` to a seekable sink, only fits a single root.
+
+        Args:
+            roots (Optional[List[CID]], optional): The roots to write. Defaults to
+                None, writing the roots added, in the order they were added.
+
+        Returns:
+            List[CID]: The roots written.
+
+        Raises:
+            ValueError: If there is no root, a root was not written up front, or
+                the header does not fit the reserved header slot.
+        """
+        roots = list(self._added_roots if roots is None else roots)
+        if not roots:
+            raise ValueError("An archive needs at least one root.")
+        self._timed("header", self._write_header, roots)
+        return roots
+
+
+class _FileDAG:
+    """
+    Builds the DAG of a file from its chunks as they are written, so that the
+    chunks can be read by a blocking loop or awaited on an event loop alike.
+
+    With the balanced layout, the layers are built keeping one partially filled
+    node per layer, which is written as soon as it has `max_children` links and
+    linked from the layer above. With the trickle layout, every node links up to
+    `max_children` chunks, followed by `_TRICKLE_DEPTH_REPEAT` subtrees of each
+    depth from 1 up to its own depth, for as long as chunks remain; the root has
+    no depth limit, so the first chunks of the file are linked from it. Either
+    way, memory use is bounded by the depth of the DAG times `max_children`.
+
+    Attributes:
+        car_writer (CARv1Writer): The writer the nodes are written with.
+        chunks (int): The number of chunks added so far.
+    """
+
+    def __init__(self, car_writer: CARv1Writer):
+        """
+        Initializes a _FileDAG object.
+
+        Args:
+            car_writer (CARv1Writer): The writer the nodes are written with.
+
+        Raises:
+            ValueError: If `max_children` is less than 2 with the balanced layout.
+        """
+        self.car_writer = car_writer
+        self.chunks = 0
+        self._trickle = car_writer.layout == "trickle"
+        self._kubo = car_writer.profile == "kubo"
+        if not self._trickle and car_writer.max_children < 2:
+            raise ValueError("max_children must be at least 2.")
+        # The intermediate node linking the chunks, without the kubo profile.
+        self._node = car_writer._get_pbnode(dtype=Data.DataType.File)
+        # For each balanced layer, the partially filled node and its first child.
+        self._layers: List[List] = []
+        self._counts: List[int] = []
+        # For each open trickle node, the node, its depth limit, the depth of the
+        # subtrees being linked, or 0 while linking chunks, and how many of them.
+        self._frames: List[List] = [[self._node, -1, 0, 0]]
+
+    def add_chunk(self, size: int, cid: bytes) -> None:
+        """
+        Link the next chunk of the file, once its block is written.
+
+        Args:
+            size (int): The size of the section of the chunk, or of its block with
+                the kubo profile.
+            cid (bytes): The binary CID of the chunk.
+        """
+        if self._trickle:
+            self._add_trickle_chunk(size, cid)
+        elif self._kubo:
+            # Raw leaves hold the chunk as it is, so their size is their file size.
+            self._add_link(0, (size, size, cid))
+        else:
+            self._node.add_link(cid=cid, name=f"Chunks{self.chunks}", size=size)
+            self._node.blocksizes.append(size)
+            if len(self._node) == self.car_writer.max_children:
+                self._write_intermediate_node()
+        self.chunks += 1
+
+    def finish(self) -> Tuple[int, int, bytes]:
+        """
+        Write the remaining nodes of the file.
+
+        Returns:
+            Tuple[int, int, bytes]: The size of a link to the root node, the number of
+                bytes of the file with the kubo profile, otherwise 0, and the binary
+                CID of the root node.
+        """
+        if self._trickle:
+            return self._finish_trickle()
+        if not self._kubo and len(self._node) > 0:
+            self._write_intermediate_node()
+        layers = self._layers
+        if not layers:
+            return self.car_writer._write_empty_file()
+        layer = 0
+        while layer < len(layers) - 1 or self._counts[layer] > 1:
+            if layers[layer][0]:
+                self._write_node(layer)
+            layer += 1
+        return layers[layer][1]
+
+    def _write_intermediate_node(self) -> None:
+        """
+        Write the node linking the last chunks, without the kubo profile, and link
+        it from the first balanced layer.
+        """
+        block, cid = self.car_writer._serialize_and_write_pbnode(pbnode=self._node)
+        self._node = self.car_writer._get_pbnode(dtype=Data.DataType.File)
+        self._add_link(0, (len(block), 0, cid))
+
+    def _add_link(self, layer: int, child: Tuple[int, int, bytes]) -> None:
+        """
+        Link a child from the partially filled node of a balanced layer, writing the
+        node once it has `max_children` links.
+
+        Args:
+            layer (int): The layer of the node, 0 being the one above the chunks.
+            child (Tuple[int, int, bytes]): The size of a link to the child, the
+                number of bytes of the file it holds with the kubo profile,
+                otherwise 0, and its binary CID.
+        """
+        car_writer = self.car_writer
+        layers = self._layers
+        if layer == len(layers):
+            layers.append([car_writer._get_pbnode(dtype=Data.DataType.File), child])
+            self._counts.append(0)
+        pbnode = layers[layer][0]
+        if not pbnode:
+            layers[layer][1] = child
+        size, filesize, cid = child
+        car_writer._add_file_link(
+            pbnode=pbnode,
+            cid=cid,
+            name=f"File_Layer:{layer}:Chunk{len(pbnode)}",
+            size=size,
+            filesize=filesize,
+        )
+        self._counts[layer] += 1
+        if len(pbnode) == car_writer.max_children:
+            self._write_node(layer)
+
+    def _write_node(self, layer: int) -> None:
+        """
+        Write the partially filled node of a balanced layer, replace it with an
+        empty one and link it from the layer above.
+
+        Args:
+            layer (int): The layer of the node.
+        """
+        child = self.car_writer._write_file_node(pbnode=self._layers[layer][0])
+        self._layers[layer] = [
+            self.car_writer._get_pbnode(dtype=Data.DataType.File),
+            None,
+        ]
+        self._add_link(layer + 1, child)
+
+    def _add_trickle_chunk(self, size: int, cid: bytes) -> None:
+        """
+        Link a chunk from the trickle node it belongs to, closing the nodes that
+        reached their depth limit and opening the subtrees it starts.
+
+        Args:
+            size (int): The size of the section of the chunk, or of its block with
+                the kubo profile.
+            cid (bytes): The binary CID of the chunk.
+        """
+        car_writer = self.car_writer
+        frames = self._frames
+        while True:
+            frame = frames[-1]
+            pbnode, max_depth, depth, repeat = frame
+            if depth == 0 and len(pbnode) < car_writer.max_children:
+                car_writer._add_file_link(
+                    pbnode=pbnode,
+                    cid=cid,
+                    name=f"Chunks{self.chunks}",
+                    size=size,
+                    # Raw leaves hold the chunk as it is with the kubo profile.
+                    filesize=size,
+                )
+                return
+            if depth == 0:
+                frame[2], frame[3] = 1, 0
+            elif 0 <= max_depth <= depth:
+                self._close_trickle_node()
+            elif repeat == _TRICKLE_DEPTH_REPEAT:
+                frame[2], frame[3] = depth + 1, 0
+            else:
+                node = car_writer._get_pbnode(dtype=Data.DataType.File)
+                frames.append([node, depth, 0, 0])
+
+    def _close_trickle_node(self) -> None:
+        """
+        Write the innermost open trickle node and link it from its parent.
+        """
+        pbnode, max_depth, _, _ = self._frames.pop()
+        size, filesize, cid = self.car_writer._write_file_node(pbnode=pbnode)
+        parent = self._frames[-1]
+        self.car_writer._add_file_link(
+            pbnode=parent[0],
+            cid=cid,
+            name=f"File_Layer:{max_depth}:Chunk{len(parent[0])}",
+            size=size,
+            filesize=filesize,
+        )
+        parent[3] += 1
+
+    def _finish_trickle(self) -> Tuple[int, int, bytes]:
+        """
+        Close the open trickle nodes and write the root node.
+
+        Returns:
+            Tuple[int, int, bytes]: The size of a link to the root node, the number of
+                bytes of the file with the kubo profile, otherwise 0, and the binary
+                CID of the root node.
+        """
+        if self.chunks == 0 and self._kubo:
+            return self.car_writer._write_empty_file()
+        while len(self._frames) > 1:
+            self._close_trickle_node()
+        return self.car_writer._write_file_node(pbnode=self._frames[0][0])
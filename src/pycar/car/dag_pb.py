@@ -0,0 +1,200 @@
+from multiformats import CID, varint  # type: ignore
+from pycar.protobufs import Data  # type: ignore
+from typing import Iterator, List, Optional, Tuple, Union
+from .sections import decode_varint
+
+
+def _length_delimited(tag: bytes, value: Union[bytes, memoryview]) -> bytes:
+    """
+    Encode a length-delimited protobuf field.
+    """
+    return b"".join((tag, varint.encode(len(value)), value))
+
+
+def _iter_fields(
+    data: Union[bytes, memoryview]
+) -> Iterator[Tuple[int, Union[bytes, memoryview]]]:
+    """
+    Iterate over the field numbers and values of a protobuf message, skipping the
+    varint fields and yielding the length-delimited ones.
+    """
+    offset, end = 0, len(data)
+    while offset < end:
+        key, offset = decode_varint(data, offset)
+        if key & 7 == 0:
+            _, offset = decode_varint(data, offset)
+        elif key & 7 == 2:
+            length, offset = decode_varint(data, offset)
+            if offset + length > end:
+                raise ValueError("Unexpected end of buffer inside a field.")
+            yield (key >> 3, data[offset : offset + length])
+            offset += length
+        else:
+            raise ValueError(f"Unexpected wire type {key & 7} in a dag-pb node.")
+
+
+def get_link_cids(data: Union[bytes, memoryview]) -> List[bytes]:
+    """
+    Get the binary CIDs of the links of an encoded dag-pb node, without decoding
+    the rest of the node.
+
+    Args:
+        data (Union[bytes, memoryview]): The encoded node.
+
+    Returns:
+        List[bytes]: The binary CIDs of the links, in order.
+
+    Raises:
+        ValueError: If the node is not a valid protobuf message.
+    """
+    cids = []
+    for number, link in _iter_fields(data):
+        if number == 2:
+            for link_number, value in _iter_fields(link):
+                if link_number == 1:
+                    cids.append(bytes(value))
+    return cids
+
+
+class PBNodeBuilder:
+    """
+    A dag-pb node with UnixFS data, whose links are collected into arrays and
+    encoded in a single pass.
+
+    The encoding is byte for byte the one of the `PBNode` and `Data` protobufs:
+    fields in field number order, optional fields only when set, and the names and
+    sizes of links always set. The canonical dag-pb order, links before data, is
+    available as well.
+
+    Attributes:
+        dtype (Data.DataType): The UnixFS type of the node.
+        hashes (List[bytes]): The binary CIDs of the links.
+        names (List[str]): The names of the links.
+        sizes (List[int]): The sizes of the links.
+        blocksizes (List[int]): The UnixFS block sizes of the node.
+        data (Optional[bytes]): The UnixFS data of the node, if any.
+        filesize (Optional[int]): The UnixFS file size of the node, if any.
+        hash_type (Optional[int]): The UnixFS hash type of the node, if any.
+        fanout (Optional[int]): The UnixFS fanout of the node, if any.
+        byte_size (int): The size of the node as last encoded.
+    """
+
+    __slots__ = (
+        "dtype",
+        "hashes",
+        "names",
+        "sizes",
+        "blocksizes",
+        "data",
+        "filesize",
+        "hash_type",
+        "fanout",
+        "byte_size",
+    )
+
+    def __init__(self, dtype: Data.DataType):
+        """
+        Initializes a PBNodeBuilder object.
+
+        Args:
+            dtype (Data.DataType): The UnixFS type of the node.
+        """
+        self.dtype = dtype
+        self.hashes: List[bytes] = []
+        self.names: List[str] = []
+        self.sizes: List[int] = []
+        self.blocksizes: List[int] = []
+        self.data: Optional[bytes] = None
+        self.filesize: Optional[int] = None
+        self.hash_type: Optional[int] = None
+        self.fanout: Optional[int] = None
+        self.byte_size = 0
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def add_link(self, cid: Union[CID, bytes], name: str, size: int) -> None:
+        """
+        Add a link to the node.
+
+        Args:
+            cid (Union[CID, bytes]): The CID of the link.
+            name (str): The name of the link.
+            size (int): The size of the link.
+        """
+        self.hashes.append(cid if isinstance(cid, bytes) else bytes(cid))
+        self.names.append(name)
+        self.sizes.append(size)
+
+    def clear_links(self) -> None:
+        """
+        Remove the links and block sizes of the node.
+        """
+        self.hashes.clear()
+        self.names.clear()
+        self.sizes.clear()
+        self.blocksizes.clear()
+
+    def sort_links(self) -> None:
+        """
+        Sort the links of the node by name, as kubo does for directories.
+        """
+        order = sorted(range(len(self.names)), key=self.names.__getitem__)
+        self.hashes = [self.hashes[i] for i in order]
+        self.names = [self.names[i] for i in order]
+        self.sizes = [self.sizes[i] for i in order]
+
+    def encode_unixfs(self) -> bytes:
+        """
+        Encode the UnixFS data of the node.
+
+        Returns:
+            bytes: The serialized `Data` protobuf.
+        """
+        parts = [b"\x08", varint.encode(self.dtype)]
+        if self.data is not None:
+            parts.append(_length_delimited(b"\x12", self.data))
+        if self.filesize is not None:
+            parts += (b"\x18", varint.encode(self.filesize))
+        for blocksize in self.blocksizes:
+            parts += (b"\x20", varint.encode(blocksize))
+        if self.hash_type is not None:
+            parts += (b"\x28", varint.encode(self.hash_type))
+        if self.fanout is not None:
+            parts += (b"\x30", varint.encode(self.fanout))
+        return b"".join(parts)
+
+    def encode(self, canonical: bool = False) -> bytes:
+        """
+        Encode the node.
+
+        Args:
+            canonical (bool, optional): Flag indicating whether to write the links
+                before the data, as canonical dag-pb does, rather than in field
+                number order. Defaults to False.
+
+        Returns:
+            bytes: The serialized `PBNode` protobuf.
+        """
+        links = [
+            _length_delimited(
+                b"\x12",
+                b"".join(
+                    (
+                        _length_delimited(b"\x0a", cid),
+                        _length_delimited(b"\x12", name.encode()),
+                        b"\x18",
+                        varint.encode(size),
+                    )
+                ),
+            )
+            for cid, name, size in zip(self.hashes, self.names, self.sizes)
+        ]
+        data = _length_delimited(b"\x0a", self.encode_unixfs())
+        if canonical:
+            links.append(data)
+        else:
+            links.insert(0, data)
+        encoded = b"".join(links)
+        self.byte_size = len(encoded)
+        return encoded
@@ -0,0 +1,168 @@
+from collections import deque
+from concurrent.futures import Executor, Future
+from multiformats import CID  # type: ignore
+from os import makedirs, path
+from pycar.protobufs import PBNode, Data  # type: ignore
+from typing import BinaryIO, Deque, Iterator, List, Optional, Tuple, Union
+from .reader import CARv1Reader
+from .sections import RAW, decode_cid, get_cid_codec
+
+_HAMT = Data.DataType.HAMTShard
+_DIRECTORY_TYPES = (Data.DataType.Directory, _HAMT)
+
+
+def _get_node(car_reader: CARv1Reader, cid: bytes) -> Tuple[Optional[PBNode], bytes]:
+    """
+    Get a block and decode it if it is a dag-pb node.
+
+    Args:
+        car_reader (CARv1Reader): The reader to get the block from.
+        cid (bytes): The binary CID of the block.
+
+    Returns:
+        Tuple[Optional[PBNode], bytes]: The decoded node, or None for a raw block,
+            and the block data.
+
+    Raises:
+        ValueError: If the block is not in the archive.
+    """
+    data = car_reader.get(cid)
+    if data is None:
+        raise ValueError(f"Block {CID.decode(cid)} is missing from the archive.")
+    if get_cid_codec(cid) == RAW:
+        return (None, data)
+    return (PBNode.FromString(data), data)
+
+
+def _get_unixfs(pbnode: PBNode) -> Data:
+    """
+    Decode the UnixFS data of a dag-pb node.
+    """
+    unixfs = Data()
+    if pbnode.HasField("Data"):
+        unixfs.ParseFromString(pbnode.Data)
+    return unixfs
+
+
+def write_file(car_reader: CARv1Reader, cid: Union[CID, bytes], out: BinaryIO) -> int:
+    """
+    Stream the data of a UnixFS file DAG to a writable stream.
+
+    The DAG is walked depth first with one iterator over the links of each node on
+    the path from the root, so memory is bounded by the depth of the DAG times the
+    number of children per node, and chunks are written as soon as they are read.
+
+    Args:
+        car_reader (CARv1Reader): The reader to get the blocks from.
+        cid (Union[CID, bytes]): The CID of the root of the file.
+        out (BinaryIO): The stream to write the file data to.
+
+    Returns:
+        int: The number of bytes written.
+    """
+    size = 0
+    stack: List[Iterator[bytes]] = [iter([bytes(cid)])]
+    while stack:
+        child = next(stack[-1], None)
+        if child is None:
+            stack.pop()
+            continue
+        pbnode, data = _get_node(car_reader, child)
+        if pbnode is None:
+            out.write(data)
+            size += len(data)
+            continue
+        unixfs = _get_unixfs(pbnode)
+        if unixfs.HasField("Data"):
+            out.write(unixfs.Data)
+            size += len(unixfs.Data)
+        if pbnode.Links:
+            stack.append(iter([link.Hash for link in pbnode.Links]))
+    return size
+
+
+def _export_file(car_reader: CARv1Reader, cid: bytes, file_path: str) -> int:
+    """
+    Write the data of a UnixFS file DAG to a file.
+    """
+    with open(file_path, "wb") as out:
+        return write_file(car_reader, cid, out)
+
+
+def _check_name(name: str) -> str:
+    """
+    Check that a link name is a single path component.
+
+    Raises:
+        ValueError: If the name could escape the folder it is exported to.
+    """
+    if not name or name in (".", "..") or "/" in name or path.sep in name:
+        raise ValueError(f"Refusing to export the unsafe link name {name!r}.")
+    return name
+
+
+def dag_to_folder(
+    car_reader: CARv1Reader,
+    output_path: str,
+    cid: Optional[Union[CID, bytes]] = None,
+    executor: Optional[Executor] = None,
+    max_in_flight: int = 64,
+) -> CID:
+    """
+    Export a UnixFS DAG, as built by `folder_to_dag` or `CARv1Writer.get_car`, to
+    the local file system. A directory, sharded or not, is exported as a folder at
+    `output_path`, a file as a file at `output_path`.
+
+    With an executor, up to `max_in_flight` files are written concurrently while
+    the calling thread walks the directories.
+
+    Args:
+        car_reader (CARv1Reader): The reader to get the blocks from.
+        output_path (str): The path to export the root to.
+        cid (Optional[Union[CID, bytes]], optional): The CID of the root to export.
+            Defaults to None, exporting the first root of the archive.
+        executor (Optional[Executor], optional): The executor to write files on.
+            Defaults to None, writing them one at a time.
+        max_in_flight (int, optional): The maximum number of files pending on the
+            executor. Defaults to 64.
+
+    Returns:
+        CID: The CID of the exported root.
+
+    Raises:
+        ValueError: If a block is missing or a link name is not a single path
+            component.
+    """
+    # Looking the root up first indexes the archive, if it is not indexed yet, before
+    # any file is written on the executor.
+    root = bytes(car_reader.roots[0] if cid is None else cid)
+    pending: Deque[Future] = deque()
+    folders = deque([(root, str(output_path))])
+    while folders:
+        folder_cid, folder_path = folders.popleft()
+        pbnode, _ = _get_node(car_reader, folder_cid)
+        unixfs = None if pbnode is None else _get_unixfs(pbnode)
+        if pbnode is None or unixfs is None or unixfs.Type not in _DIRECTORY_TYPES:
+            if executor is None:
+                _export_file(car_reader, folder_cid, folder_path)
+                continue
+            if len(pending) >= max_in_flight:
+                pending.popleft().result()
+            pending.append(
+                executor.submit(_export_file, car_reader, folder_cid, folder_path)
+            )
+            continue
+        makedirs(folder_path, exist_ok=True)
+        # The links of a HAMT shard are named after their slot, followed by the
+        # name of the entry, or by nothing for a child shard.
+        width = len(f"{unixfs.fanout - 1:X}") if unixfs.Type == _HAMT else 0
+        for link in pbnode.Links:
+            if width and len(link.Name) == width:
+                folders.append((link.Hash, folder_path))
+                continue
+            name = _check_name(link.Name[width:])
+            folders.append((link.Hash, path.join(folder_path, name)))
+
+    while pending:
+        pending.popleft().result()
+    return decode_cid(root)
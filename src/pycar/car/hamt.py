@@ -0,0 +1,261 @@
+from multiformats import CID  # type: ignore
+from pycar.protobufs import Data  # type: ignore
+from struct import unpack_from
+from typing import Any, List, Optional, Tuple, Union
+from pycar.utils.spill import SpillTable
+
+mmh3: Any
+try:
+    import mmh3
+except ImportError:  # pragma: no cover
+    mmh3 = None
+
+# The multicodec of the 64 bit murmur3 x64 hash, as recorded in HAMTShard nodes.
+MURMUR3_X64_64 = 0x22
+HAMT_FANOUT = 256
+
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+_C1 = 0x87C37B91114253D5
+_C2 = 0x4CF5AD432745937F
+
+
+def _rotl(x: int, r: int) -> int:
+    return ((x << r) | (x >> (64 - r))) & _MASK64
+
+
+def _fmix(k: int) -> int:
+    k ^= k >> 33
+    k = (k * 0xFF51AFD7ED558CCD) & _MASK64
+    k ^= k >> 33
+    k = (k * 0xC4CEB9FE1A85EC53) & _MASK64
+    return k ^ (k >> 33)
+
+
+def _murmur3_x64_64_python(data: bytes) -> int:
+    """
+    Get the first 64 bits of the 128 bit murmur3 x64 hash of data, with seed 0.
+    """
+    length = len(data)
+    h1 = h2 = 0
+    end = length - length % 16
+    for offset in range(0, end, 16):
+        k1, k2 = unpack_from("<QQ", data, offset)
+        h1 ^= _rotl((k1 * _C1) & _MASK64, 31) * _C2 & _MASK64
+        h1 = (_rotl(h1, 27) + h2) & _MASK64
+        h1 = (h1 * 5 + 0x52DCE729) & _MASK64
+        h2 ^= _rotl((k2 * _C2) & _MASK64, 33) * _C1 & _MASK64
+        h2 = (_rotl(h2, 31) + h1) & _MASK64
+        h2 = (h2 * 5 + 0x38495AB5) & _MASK64
+
+    tail = data[end:]
+    if len(tail) > 8:
+        k2 = int.from_bytes(tail[8:], "little")
+        h2 ^= _rotl((k2 * _C2) & _MASK64, 33) * _C1 & _MASK64
+    if tail:
+        k1 = int.from_bytes(tail[:8], "little")
+        h1 ^= _rotl((k1 * _C1) & _MASK64, 31) * _C2 & _MASK64
+
+    h1 ^= length
+    h2 ^= length
+    h1 = (h1 + h2) & _MASK64
+    h2 = (h2 + h1) & _MASK64
+    h1 = _fmix(h1)
+    h2 = _fmix(h2)
+    return (h1 + h2) & _MASK64
+
+
+def murmur3_x64_64(data: bytes) -> bytes:
+    """
+    Hash a directory entry name the way UnixFS HAMTs do: the first 64 bits of the
+    128 bit murmur3 x64 hash with seed 0, big endian. Uses mmh3 when installed.
+
+    Args:
+        data (bytes): The data to hash.
+
+    Returns:
+        bytes: The 8 byte hash.
+    """
+    if mmh3 is not None:
+        value = mmh3.hash64(data, signed=False)[0]
+    else:
+        value = _murmur3_x64_64_python(data)
+    return value.to_bytes(8, "big")
+
+
+class ShardedDirectory:
+    """
+    A directory written as a HAMT of UnixFS HAMTShard nodes, for directories too
+    large for a single node.
+
+    Entries are spilled to an on-disk SQLite table as they are added, keyed by the
+    hash of their names, and read back in hash order to write the shards depth
+    first, keeping one partially filled shard per level in memory.
+
+    Attributes:
+        car_writer (CARv1Writer): The writer the shards are written with.
+        fanout (int): The number of slots of each shard.
+        spill_path (str): The path of the SQLite database entries are spilled to.
+    """
+
+    def __init__(
+        self,
+        car_writer,
+        fanout: int = HAMT_FANOUT,
+        spill_path: Optional[str] = None,
+    ):
+        """
+        Initializes a ShardedDirectory object.
+
+        Args:
+            car_writer (CARv1Writer): The writer the shards are written with.
+            fanout (int, optional): The number of slots of each shard, a power of
+                two of at least 8. Defaults to 256.
+            spill_path (Optional[str], optional): The path of the `SpillTable` to
+                spill entries to. Defaults to None, using a temporary file.
+
+        Raises:
+            ValueError: If the fanout is not a power of two of at least 8.
+        """
+        if fanout < 8 or fanout & (fanout - 1):
+            raise ValueError("The fanout must be a power of two of at least 8.")
+        self.car_writer = car_writer
+        self.fanout = fanout
+        self._bits = fanout.bit_length() - 1
+        self._max_depth = 64 // self._bits
+        self._width = len(f"{fanout - 1:X}")
+        self._disk = SpillTable(
+            "CREATE TABLE IF NOT EXISTS entries (hash BLOB, name TEXT, cid BLOB, "
+            "size INTEGER, PRIMARY KEY (hash, name)) WITHOUT ROWID",
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+            spill_path,
+        )
+        self.spill_path = self._disk.path
+        self._pending: List[Tuple[bytes, str, bytes, int]] = []
+        self._entries = 0
+
+    def __len__(self) -> int:
+        return self._entries
+
+    def add(self, name: str, cid: Union[CID, bytes], size: int) -> None:
+        """
+        Add an entry to the directory.
+
+        Args:
+            name (str): The name of the entry.
+            cid (Union[CID, bytes]): The CID of the entry.
+            size (int): The size of a link to the entry.
+        """
+        digest = murmur3_x64_64(name.encode())
+        self._pending.append((digest, name, bytes(cid), size))
+        self._entries += 1
+        if len(self._pending) >= 4096:
+            self._flush()
+
+    def _flush(self) -> None:
+        """
+        Move the entries held in memory to the on-disk table.
+        """
+        self._disk.insert(self._pending)
+        self._pending.clear()
+
+    def _digits(self, digest: bytes) -> List[int]:
+        """
+        Split the hash of a name into the slots it takes at each level.
+        """
+        value = int.from_bytes(digest, "big")
+        mask = self.fanout - 1
+        return [
+            (value >> (64 - self._bits * (depth + 1))) & mask
+            for depth in range(self._max_depth)
+        ]
+
+    def _new_shard(self, slot: int) -> list:
+        pbnode = self.car_writer._get_pbnode(dtype=Data.DataType.HAMTShard)
+        # The node, its occupied slots, the total size of its links and the slot
+        # it takes in its parent.
+        return [pbnode, 0, 0, slot]
+
+    def _link(
+        self, shard: list, slot: int, name: str, cid: Union[CID, bytes], size: int
+    ) -> None:
+        shard[0].add_link(cid=cid, name=f"{slot:0{self._width}X}{name}", size=size)
+        shard[1] |= 1 << slot
+        shard[2] += size
+
+    def _write_shard(self, shard: list) -> Tuple[int, bytes]:
+        """
+        Write a shard and get the size of a link to it, which is the cumulative
+        size of the blocks under it with the kubo profile, and otherwise the total
+        size of its entries.
+        """
+        pbnode, bitfield, total, _ = shard
+        pbnode.data = bitfield.to_bytes((bitfield.bit_length() + 7) // 8, "big")
+        pbnode.hash_type = MURMUR3_X64_64
+        pbnode.fanout = self.fanout
+        _, cid = self.car_writer._serialize_and_write_pbnode(pbnode=pbnode)
+        if self.car_writer.profile == "kubo":
+            total += pbnode.byte_size
+        return (total, cid)
+
+    def write(self) -> Tuple[int, bytes]:
+        """
+        Write the shards of the directory.
+
+        An entry takes a slot of the deepest shard its hash shares with the hash
+        of a neighbouring entry in hash order, so the shards are opened and written
+        in a single pass over the sorted entries.
+
+        Returns:
+            Tuple[int, bytes]: The size of a link to the root shard and its binary
+                CID.
+
+        Raises:
+            ValueError: If two names have the same hash.
+        """
+        self._flush()
+        rows = self._disk.execute(
+            "SELECT hash, name, cid, size FROM entries ORDER BY hash, name"
+        )
+
+        def common_prefix(a: List[int], b: Optional[List[int]]) -> int:
+            if b is None:
+                return 0
+            depth = 0
+            while depth < self._max_depth and a[depth] == b[depth]:
+                depth += 1
+            if depth == self._max_depth:
+                raise ValueError("Two entry names have the same HAMT hash.")
+            return depth
+
+        shards = [self._new_shard(0)]
+        previous: Optional[List[int]] = None
+        row = rows.fetchone()
+        while row is not None:
+            next_row = rows.fetchone()
+            digits = self._digits(row[0])
+            next_digits = None if next_row is None else self._digits(next_row[0])
+            shared = common_prefix(digits, previous)
+            depth = max(shared, common_prefix(digits, next_digits))
+
+            while len(shards) > shared + 1:
+                child = shards.pop()
+                size, cid = self._write_shard(child)
+                self._link(shards[-1], child[3], "", cid, size)
+            while len(shards) < depth + 1:
+                shards.append(self._new_shard(digits[len(shards) - 1]))
+
+            _, name, cid, size = row
+            self._link(shards[-1], digits[depth], name, cid, size)
+            previous, row = digits, next_row
+
+        while len(shards) > 1:
+            child = shards.pop()
+            size, cid = self._write_shard(child)
+            self._link(shards[-1], child[3], "", cid, size)
+        return self._write_shard(shards[0])
+
+    def close(self) -> None:
+        """
+        Close the table of entries.
+        """
+        self._disk.close()
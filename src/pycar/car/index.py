@@ -0,0 +1,119 @@
+from multiformats import varint  # type: ignore
+from struct import pack, unpack_from
+from typing import Dict, Iterable, List, Optional, Tuple
+from .sections import decode_varint, get_cid_multihash
+
+CARV2_PRAGMA = bytes.fromhex("0aa16776657273696f6e02")
+CARV2_HEADER_LENGTH = 40
+CARV2_DATA_OFFSET = len(CARV2_PRAGMA) + CARV2_HEADER_LENGTH
+MULTIHASH_INDEX_SORTED = 0x0401
+
+
+def encode_carv2_header(data_offset: int, data_size: int, index_offset: int) -> bytes:
+    """
+    Get the CARv2 pragma followed by the fixed-size CARv2 header.
+
+    Args:
+        data_offset (int): The offset of the CARv1 payload.
+        data_size (int): The size of the CARv1 payload.
+        index_offset (int): The offset of the index, or 0 if there is none.
+
+    Returns:
+        bytes: The pragma and header.
+    """
+    return CARV2_PRAGMA + bytes(16) + pack("<QQQ", data_offset, data_size, index_offset)
+
+
+def encode_multihash_index_sorted(entries: Iterable[Tuple[bytes, int]]) -> bytes:
+    """
+    Encode a MultihashIndexSorted CARv2 index: for every multihash code, buckets of
+    fixed-width `digest | offset` records sorted by digest.
+
+    Args:
+        entries (Iterable[Tuple[bytes, int]]): The binary CIDs of the blocks and the
+            offsets of their sections relative to the CARv1 payload.
+
+    Returns:
+        bytes: The index, starting with its multicodec.
+    """
+    codes: Dict[int, Dict[int, List[bytes]]] = {}
+    for cid, offset in entries:
+        code, digest = get_cid_multihash(cid)
+        width = len(digest) + 8
+        codes.setdefault(code, {}).setdefault(width, []).append(
+            digest + pack("<Q", offset)
+        )
+
+    parts = [varint.encode(MULTIHASH_INDEX_SORTED), pack("<i", len(codes))]
+    for code in sorted(codes):
+        widths = codes[code]
+        parts.append(pack("<Qi", code, len(widths)))
+        for width in sorted(widths):
+            records = widths[width]
+            records.sort(key=lambda record: record[:-8])
+            parts.append(pack("<Iq", width, width * len(records)))
+            parts.extend(records)
+    return b"".join(parts)
+
+
+class MultihashIndexSorted:
+    """
+    A decoded MultihashIndexSorted CARv2 index, looked up by binary search.
+
+    Args:
+        data (bytes): The encoded index, starting with its multicodec.
+
+    Raises:
+        ValueError: If the index is not a MultihashIndexSorted index.
+    """
+
+    def __init__(self, data: bytes):
+        codec, offset = decode_varint(data)
+        if codec != MULTIHASH_INDEX_SORTED:
+            raise ValueError(f"Unsupported CARv2 index codec {codec:#x}.")
+        self._buckets: Dict[Tuple[int, int], Tuple[bytes, int]] = {}
+        (code_count,) = unpack_from("<i", data, offset)
+        offset += 4
+        for _ in range(code_count):
+            code, width_count = unpack_from("<Qi", data, offset)
+            offset += 12
+            for _ in range(width_count):
+                width, length = unpack_from("<Iq", data, offset)
+                offset += 12
+                self._buckets[(code, width)] = (
+                    data[offset : offset + length],
+                    length // width,
+                )
+                offset += length
+
+    def __len__(self) -> int:
+        return sum(count for _, count in self._buckets.values())
+
+    def get(self, cid: bytes) -> Optional[int]:
+        """
+        Get the offset of the section of a block relative to the CARv1 payload.
+
+        Args:
+            cid (bytes): The binary CID of the block.
+
+        Returns:
+            Optional[int]: The offset, or None if the block is not indexed.
+        """
+        code, digest = get_cid_multihash(cid)
+        width = len(digest) + 8
+        bucket = self._buckets.get((code, width))
+        if bucket is None:
+            return None
+        records, count = bucket
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            start = middle * width
+            if records[start : start + width - 8] < digest:
+                low = middle + 1
+            else:
+                high = middle
+        start = low * width
+        if low < count and records[start : start + width - 8] == digest:
+            return unpack_from("<Q", records, start + width - 8)[0]
+        return None
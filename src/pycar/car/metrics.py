@@ -0,0 +1,200 @@
+from threading import Lock
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+# The stages of the writer pipeline that are timed.
+STAGES = ("read", "hash", "encode", "write", "header")
+
+
+class WriterMetrics:
+    """
+    Per-stage timers, counters and progress callbacks for a `CARv1Writer`.
+
+    Pass an instance as the `metrics` of a writer to record where its time goes:
+
+    - read: reading chunks from the file.
+    - hash: hashing chunks and encoding UnixFS leaves, or waiting for them on the
+      executor, and hashing nodes.
+    - encode: serializing dag-pb nodes.
+    - write: writing sections to the archive, or to the spool of a file built in
+      parallel.
+    - header: writing the header, including prepending it to a finished file.
+
+    Stage times are summed across the threads sharing the metrics, so they can
+    exceed the wall time. A writer without metrics only pays a None check per
+    block.
+
+    Attributes:
+        seconds (Dict[str, float]): The time spent in each stage.
+        calls (Dict[str, int]): The number of times each stage ran.
+        bytes (Dict[str, int]): The bytes read by the read stage and written by the
+            write stage.
+        blocks (int): The number of blocks encoded.
+        duplicate_blocks (int): The number of blocks skipped as duplicates.
+        progress (Optional[Callable[[WriterMetrics], Any]]): The callback called
+            with the metrics after every `progress_interval` blocks.
+        progress_interval (int): The number of blocks between progress callbacks.
+    """
+
+    def __init__(
+        self,
+        progress: Optional[Callable[["WriterMetrics"], Any]] = None,
+        progress_interval: int = 1,
+    ):
+        """
+        Initializes a WriterMetrics object.
+
+        Args:
+            progress (Optional[Callable[[WriterMetrics], Any]], optional): The
+                callback called with the metrics as blocks are encoded. Defaults to
+                None.
+            progress_interval (int, optional): The number of blocks between progress
+                callbacks. Defaults to 1.
+        """
+        self.seconds: Dict[str, float] = dict.fromkeys(STAGES, 0.0)
+        self.calls: Dict[str, int] = dict.fromkeys(STAGES, 0)
+        self.bytes: Dict[str, int] = {"read": 0, "write": 0}
+        self.blocks = 0
+        self.duplicate_blocks = 0
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self._lock = Lock()
+
+    def observe(self, stage: str, seconds: float, size: int = 0) -> None:
+        """
+        Record a run of a stage.
+
+        Args:
+            stage (str): The stage.
+            seconds (float): The time the stage took.
+            size (int, optional): The bytes read or written. Defaults to 0.
+        """
+        with self._lock:
+            self.seconds[stage] += seconds
+            self.calls[stage] += 1
+            if size:
+                self.bytes[stage] += size
+
+    def call(self, stage: str, func: Callable, *args) -> Any:
+        """
+        Call a function, recording the time it took as a run of a stage.
+
+        Args:
+            stage (str): The stage.
+            func (Callable): The function.
+            *args: The arguments of the function.
+
+        Returns:
+            Any: The result of the function.
+        """
+        start = perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.observe(stage, perf_counter() - start)
+
+    def iterate(self, stage: str, iterable: Iterable) -> Iterator:
+        """
+        Iterate over chunks, recording the time and bytes of every step as a run of
+        a stage.
+
+        Args:
+            stage (str): The stage.
+            iterable (Iterable): The chunks.
+
+        Yields:
+            Iterator: The chunks.
+        """
+        iterator = iter(iterable)
+        while True:
+            start = perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.observe(stage, perf_counter() - start, len(item))
+            yield item
+
+    def add_block(self) -> None:
+        """
+        Count an encoded block, calling the progress callback when it is due.
+        """
+        with self._lock:
+            self.blocks += 1
+            due = self.progress is not None and (
+                self.blocks % self.progress_interval == 0
+            )
+        if due:
+            self.progress(self)  # type: ignore
+
+    def add_duplicate(self) -> None:
+        """
+        Count a block skipped as a duplicate.
+        """
+        with self._lock:
+            self.duplicate_blocks += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get the metrics as a dict.
+
+        Returns:
+            Dict[str, Any]: The stage times, calls and bytes, and the counters.
+        """
+        with self._lock:
+            return {
+                "stages": {
+                    stage: {
+                        "seconds": self.seconds[stage],
+                        "calls": self.calls[stage],
+                        **({"bytes": self.bytes[stage]} if stage in self.bytes else {}),
+                    }
+                    for stage in STAGES
+                },
+                "blocks": self.blocks,
+                "duplicate_blocks": self.duplicate_blocks,
+            }
+
+    def to_prometheus(self, prefix: str = "pycar_writer") -> str:
+        """
+        Get the metrics in the Prometheus text exposition format.
+
+        Args:
+            prefix (str, optional): The prefix of the metric names. Defaults to
+                "pycar_writer".
+
+        Returns:
+            str: The metrics, one sample per line.
+        """
+        metrics = self.to_dict()
+        lines = []
+
+        def family(name: str, help_text: str, samples: Dict[str, Any]) -> None:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for labels, value in samples.items():
+                lines.append(f"{prefix}_{name}{labels} {value}")
+
+        stages = metrics["stages"]
+        family(
+            "stage_seconds_total",
+            "Time spent in each stage of the writer.",
+            {f'{{stage="{s}"}}': stages[s]["seconds"] for s in STAGES},
+        )
+        family(
+            "stage_calls_total",
+            "Number of runs of each stage of the writer.",
+            {f'{{stage="{s}"}}': stages[s]["calls"] for s in STAGES},
+        )
+        family(
+            "stage_bytes_total",
+            "Bytes read and written by the writer.",
+            {f'{{stage="{s}"}}': stages[s]["bytes"] for s in self.bytes},
+        )
+        family("blocks_total", "Number of blocks encoded.", {"": metrics["blocks"]})
+        family(
+            "duplicate_blocks_total",
+            "Number of blocks skipped as duplicates.",
+            {"": metrics["duplicate_blocks"]},
+        )
+        return "\n".join(lines) + "\n"
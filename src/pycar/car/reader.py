@@ -0,0 +1,330 @@
+from contextlib import AbstractContextManager, contextmanager
+from multiformats import CID  # type: ignore
+from types import TracebackType
+from typing import (
+    BinaryIO,
+    Dict,
+    Generator,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+import dag_cbor  # type: ignore
+from io import UnsupportedOperation
+from struct import unpack
+from threading import Lock
+import os
+from .index import CARV2_HEADER_LENGTH, MultihashIndexSorted
+from .sections import get_stream_size, read_block, read_varint, skip_block
+
+
+def _cid_bytes(cid: Union[CID, bytes, str]) -> bytes:
+    """
+    Get the binary form of a CID given as a CID, its binary form or a string.
+    """
+    if isinstance(cid, bytes):
+        return cid
+    if isinstance(cid, str):
+        cid = CID.decode(cid)
+    return bytes(cid)
+
+
+class CARv1Reader(AbstractContextManager):
+    """
+    Context manager for reading blocks from a CARv1 file or stream, or from the
+    CARv1 payload of a seekable CARv2 file.
+
+    Blocks are streamed one at a time, so memory use is bounded by the largest
+    block. With `index`, the archive is scanned once, seeking past the data of each
+    block, to map every CID to the offset of its data for constant time lookups.
+    Lookups in a CARv2 file with a MultihashIndexSorted index binary search that
+    index instead of scanning the archive. Lookups restore the position of the
+    reader, so blocks may be looked up while iterating. Once indexed, `get` may be
+    called from several threads.
+
+    Args:
+        source (Union[str, BinaryIO]): The name of the CARv1 file, or a readable
+            binary stream positioned at the start of the archive.
+        index (bool): Flag indicating whether to index the blocks up front.
+
+    Attributes:
+        source (Union[str, BinaryIO]): The name of the CARv1 file, or the stream.
+        bufferedReader (BinaryIO): The buffered reader for the CARv1 file.
+        roots (List[CID]): The roots listed in the header.
+        version (int): The version listed in the header, 2 for a CARv2 file.
+        data_offset (int): The offset of the first section, after the header.
+        data_end (Optional[int]): The offset just past the last section of a CARv2
+            file.
+        carv2_index (Optional[MultihashIndexSorted]): The index of a CARv2 file, once
+            loaded.
+        index (Optional[Dict[bytes, Tuple[int, int]]]): The offset and length of the
+            data of each block by binary CID, once indexed.
+    """
+
+    def __init__(self, source: Union[str, BinaryIO], index: bool = False):
+        """
+        Initializes a CARv1Reader object and reads the header.
+
+        Args:
+            source (Union[str, BinaryIO]): The name of the CARv1 file, or a readable
+                binary stream positioned at the start of the archive. Streams are
+                left open.
+            index (bool, optional): Flag indicating whether to index the blocks up
+                front. The stream must be seekable. Defaults to False.
+
+        Raises:
+            ValueError: If the header is missing or is not a CARv1 header, or if a
+                CARv2 file is not seekable.
+        """
+        self.source = source
+        self.bufferedReader: BinaryIO = (
+            open(source, "rb") if isinstance(source, str) else source
+        )
+        self.index: Optional[Dict[bytes, Tuple[int, int]]] = None
+        self.data_end: Optional[int] = None
+        self.carv2_index: Optional[MultihashIndexSorted] = None
+        self._carv2_index_offset = 0
+        self._payload_offset = self._tell()
+        self._consumed = False
+        self._lock = Lock()
+        self._fd: Optional[int] = None
+        if hasattr(os, "pread"):
+            try:
+                self._fd = self.bufferedReader.fileno()
+            except (AttributeError, OSError, UnsupportedOperation):
+                pass
+
+        header = self._read_header()
+        self.version: int = header["version"]
+        if self.version == 2:
+            if not self.bufferedReader.seekable():
+                raise ValueError("CARv2 files must be read from a seekable stream.")
+            start = self._payload_offset
+            data_offset, data_size, index_offset = unpack(
+                "<QQQ", self.bufferedReader.read(CARV2_HEADER_LENGTH)[16:]
+            )
+            self._payload_offset = start + data_offset
+            self.data_end = self._payload_offset + data_size
+            if index_offset:
+                self._carv2_index_offset = start + index_offset
+            self.bufferedReader.seek(self._payload_offset)
+            header = self._read_header()
+        if header["version"] != 1:
+            raise ValueError(f"Not a CARv1 header: {header!r}.")
+        self.roots: List[CID] = list(header.get("roots", []))
+        self.data_offset = self._tell()
+
+        if index:
+            self.build_index()
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+        /,
+    ) -> None:
+        """
+        Exit the context manager and close the reader if it opened the file.
+
+        Args:
+            exc_type (Optional[Type[BaseException]]): The type of the exception, if any.
+            exc_value (Optional[BaseException]): The exception value, if any.
+            traceback (Optional[TracebackType]): The traceback, if any.
+        """
+        if isinstance(self.source, str):
+            self.bufferedReader.close()
+
+    def _read_header(self) -> dict:
+        """
+        Read a varint-prefixed DAG-CBOR header.
+
+        Raises:
+            ValueError: If the header is missing or has no supported version.
+        """
+        length = read_varint(self.bufferedReader)
+        if length is None:
+            raise ValueError("Missing CARv1 header.")
+        header = dag_cbor.decode(self.bufferedReader.read(length))
+        if not isinstance(header, dict) or header.get("version") not in (1, 2):
+            raise ValueError(f"Not a CARv1 header: {header!r}.")
+        return header
+
+    def _tell(self) -> int:
+        """
+        Get the position of the reader, or 0 if the stream cannot tell it.
+        """
+        try:
+            return self.bufferedReader.tell()
+        except (AttributeError, OSError):
+            return 0
+
+    @contextmanager
+    def _keep_position(self) -> Iterator[None]:
+        """
+        Restore the position of the reader once done seeking it, so that a lookup
+        does not move an iteration over the sections in progress.
+        """
+        position = self.bufferedReader.tell()
+        try:
+            yield
+        finally:
+            self.bufferedReader.seek(position)
+
+    def _rewind(self) -> None:
+        """
+        Position the reader at the first section.
+
+        Raises:
+            ValueError: If the sections were already consumed from a stream that is
+                not seekable.
+        """
+        if self.bufferedReader.seekable():
+            self.bufferedReader.seek(self.data_offset)
+        elif self._consumed:
+            raise ValueError("The sections of a non-seekable stream were consumed.")
+        self._consumed = True
+
+    def _at_end(self) -> bool:
+        """
+        Check whether the reader is past the last section of a CARv2 file.
+        """
+        return self.data_end is not None and self.bufferedReader.tell() >= self.data_end
+
+    def _get_data_size(self) -> int:
+        """
+        Get the offset the sections end at: the end of the data of a CARv2 file, or
+        of the stream if it ends first.
+        """
+        size = get_stream_size(self.bufferedReader)
+        return size if self.data_end is None else min(size, self.data_end)
+
+    def __iter__(self) -> Generator[Tuple[CID, bytes], None, None]:
+        """
+        Iterate over the blocks of the archive.
+
+        Yields:
+            Generator[Tuple[CID, bytes], None, None]: Generator of CIDs and block data.
+        """
+        for cid, data in self.iter_raw():
+            yield (CID.decode(cid), data)
+
+    def iter_raw(self) -> Generator[Tuple[bytes, bytes], None, None]:
+        """
+        Iterate over the blocks of the archive, without decoding the CIDs.
+
+        Yields:
+            Generator[Tuple[bytes, bytes], None, None]: Generator of binary CIDs and
+                block data.
+        """
+        self._rewind()
+        while not self._at_end():
+            block = read_block(self.bufferedReader)
+            if block is None:
+                return
+            yield block
+
+    def iter_offsets(self) -> Generator[Tuple[bytes, int, int], None, None]:
+        """
+        Iterate over the blocks of the archive, seeking past their data.
+
+        Yields:
+            Generator[Tuple[bytes, int, int], None, None]: Generator of binary CIDs,
+                and offsets and lengths of block data.
+        """
+        self._rewind()
+        size = self._get_data_size()
+        while not self._at_end():
+            block = skip_block(self.bufferedReader, size)
+            if block is None:
+                return
+            yield block
+
+    def build_index(self) -> Dict[bytes, Tuple[int, int]]:
+        """
+        Scan the archive once and map every CID to the offset and length of its
+        data. The first occurrence of a CID wins.
+
+        Returns:
+            Dict[bytes, Tuple[int, int]]: The index.
+        """
+        index: Dict[bytes, Tuple[int, int]] = {}
+        with self._keep_position():
+            for cid, offset, length in self.iter_offsets():
+                index.setdefault(cid, (offset, length))
+        self.index = index
+        return index
+
+    def _get_from_carv2_index(self, cid: bytes) -> Optional[Tuple[int, int]]:
+        """
+        Look a block up in the index of a CARv2 file.
+
+        Args:
+            cid (bytes): The binary CID of the block.
+
+        Returns:
+            Optional[Tuple[int, int]]: The offset and length of the data of the
+                block, or None if it is not indexed.
+        """
+        if self.carv2_index is None:
+            self.bufferedReader.seek(self._carv2_index_offset)
+            self.carv2_index = MultihashIndexSorted(self.bufferedReader.read())
+        offset = self.carv2_index.get(cid)
+        if offset is None:
+            return None
+        self.bufferedReader.seek(self._payload_offset + offset)
+        block_cid, data_offset, length = skip_block(  # type: ignore
+            self.bufferedReader, self._get_data_size()
+        )
+        # The index is keyed by multihash, so check the codec of the block as well.
+        if block_cid != cid:
+            return None
+        return (data_offset, length)
+
+    def _lookup(self, cid: Union[CID, bytes, str]) -> Optional[Tuple[int, int]]:
+        """
+        Look a block up, in the index of a CARv2 file if there is one and otherwise
+        in the index built on first use.
+
+        Args:
+            cid (Union[CID, bytes, str]): The CID of the block.
+
+        Returns:
+            Optional[Tuple[int, int]]: The offset and length of the data of the
+                block, or None if it is not in the archive.
+        """
+        cid = _cid_bytes(cid)
+        if self.index is None and self._carv2_index_offset:
+            with self._lock, self._keep_position():
+                return self._get_from_carv2_index(cid)
+        if self.index is None:
+            self.build_index()
+        return self.index.get(cid)  # type: ignore
+
+    def __contains__(self, cid: Union[CID, bytes, str]) -> bool:
+        return self._lookup(cid) is not None
+
+    def get(self, cid: Union[CID, bytes, str]) -> Optional[bytes]:
+        """
+        Get the data of a block, using the index of a CARv2 file or indexing the
+        archive on first use.
+
+        Args:
+            cid (Union[CID, bytes, str]): The CID of the block.
+
+        Returns:
+            Optional[bytes]: The block data, or None if the block is not in the
+                archive.
+        """
+        entry = self._lookup(cid)
+        if entry is None:
+            return None
+        offset, length = entry
+        if self._fd is not None:
+            return os.pread(self._fd, length, offset)
+        with self._lock, self._keep_position():
+            self.bufferedReader.seek(offset)
+            return self.bufferedReader.read(length)
@@ -0,0 +1,292 @@
+from multiformats import CID, varint  # type: ignore
+from os import SEEK_END
+from typing import BinaryIO, Generator, Optional, Tuple
+
+# Upper bound of the length of a binary CID: four varints and a 64 byte digest.
+_MAX_CID_LENGTH = 4 * 9 + 64
+
+RAW = 0x55
+DAG_PB = 0x70
+SHA2_256 = 0x12
+# A CIDv0 is a bare sha2-256 multihash, starting with its code and length.
+_CIDV0_PREFIX = bytes((SHA2_256, 32))
+
+
+def get_cid_prefix(codec: int) -> bytes:
+    """
+    Get the bytes preceding the digest in a CIDv1 with a sha2-256 multihash.
+
+    Args:
+        codec (int): The multicodec of the content.
+
+    Returns:
+        bytes: The version, codec, hash function and digest length.
+    """
+    return varint.encode(1) + varint.encode(codec) + bytes([SHA2_256, 32])
+
+
+def decode_cid(cid: bytes) -> CID:
+    """
+    Decode a binary CID into a CID object, displayed in base32 like the CIDs
+    written by `CARv1Writer` if it is a CIDv1.
+
+    Args:
+        cid (bytes): The binary CID.
+
+    Returns:
+        CID: The CID object.
+    """
+    decoded = CID.decode(cid)
+    return decoded if decoded.version == 0 else decoded.set(base="base32")
+
+
+def read_varint(stream: BinaryIO) -> Optional[int]:
+    """
+    Read an unsigned LEB128 varint from a stream.
+
+    Args:
+        stream (BinaryIO): The stream to read from.
+
+    Returns:
+        Optional[int]: The decoded value, or None at the end of the stream.
+
+    Raises:
+        ValueError: If the stream ends in the middle of the varint.
+    """
+    value, shift = 0, 0
+    while True:
+        byte = stream.read(1)
+        if not byte:
+            if shift:
+                raise ValueError("Unexpected end of stream inside a varint.")
+            return None
+        value |= (byte[0] & 0x7F) << shift
+        if byte[0] < 0x80:
+            return value
+        shift += 7
+
+
+def decode_varint(data: bytes, offset: int = 0) -> Tuple[int, int]:
+    """
+    Decode an unsigned LEB128 varint from a buffer.
+
+    Args:
+        data (bytes): The buffer to decode from.
+        offset (int, optional): The offset of the varint. Defaults to 0.
+
+    Returns:
+        Tuple[int, int]: The decoded value and the offset just past the varint.
+
+    Raises:
+        ValueError: If the buffer ends in the middle of the varint.
+    """
+    value, shift = 0, 0
+    while offset < len(data):
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return (value, offset)
+        shift += 7
+    raise ValueError("Unexpected end of buffer inside a varint.")
+
+
+def get_cid_length(data: bytes, offset: int = 0) -> int:
+    """
+    Get the length of the binary CID at the start of a section body.
+
+    Args:
+        data (bytes): The buffer holding the CID.
+        offset (int, optional): The offset of the CID. Defaults to 0.
+
+    Returns:
+        int: The length of the binary CID in bytes.
+    """
+    if data[offset : offset + 2] == _CIDV0_PREFIX:
+        return 34
+    _, end = decode_varint(data, offset)  # version
+    _, end = decode_varint(data, end)  # codec
+    _, end = decode_varint(data, end)  # multihash code
+    digest_length, end = decode_varint(data, end)
+    return end + digest_length - offset
+
+
+def is_cidv0(cid: bytes) -> bool:
+    """
+    Check whether a binary CID is a CIDv0, a bare sha2-256 multihash.
+
+    Args:
+        cid (bytes): The binary CID.
+
+    Returns:
+        bool: True for a CIDv0.
+    """
+    return len(cid) == 34 and cid[:2] == _CIDV0_PREFIX
+
+
+def get_cid_codec(cid: bytes) -> int:
+    """
+    Get the multicodec of a binary CID.
+
+    Args:
+        cid (bytes): The binary CID.
+
+    Returns:
+        int: The code of the codec, dag-pb for CIDv0.
+    """
+    if is_cidv0(cid):
+        return DAG_PB
+    _, offset = decode_varint(cid)  # version
+    codec, _ = decode_varint(cid, offset)
+    return codec
+
+
+def get_cid_multihash(cid: bytes) -> Tuple[int, bytes]:
+    """
+    Get the hash function and digest of a binary CID.
+
+    Args:
+        cid (bytes): The binary CID.
+
+    Returns:
+        Tuple[int, bytes]: The multihash code of the hash function and the digest.
+    """
+    if is_cidv0(cid):
+        return (SHA2_256, cid[2:])
+    _, offset = decode_varint(cid)  # version
+    _, offset = decode_varint(cid, offset)  # codec
+    code, offset = decode_varint(cid, offset)
+    length, offset = decode_varint(cid, offset)
+    return (code, cid[offset : offset + length])
+
+
+def get_section_prefix(cid: bytes, size: int) -> bytes:
+    """
+    Get the varint and CID preceding the data of a section.
+
+    Args:
+        cid (bytes): The binary CID of the block.
+        size (int): The size of the data of the block.
+
+    Returns:
+        bytes: The section prefix.
+    """
+    return varint.encode(len(cid) + size) + cid
+
+
+def read_block(stream: BinaryIO) -> Optional[Tuple[bytes, bytes]]:
+    """
+    Read a section and split it into its CID and its data.
+
+    Args:
+        stream (BinaryIO): The stream to read from.
+
+    Returns:
+        Optional[Tuple[bytes, bytes]]: The binary CID and the data of the block, or
+            None at the end of the stream.
+
+    Raises:
+        ValueError: If the stream ends in the middle of a section.
+    """
+    length = read_varint(stream)
+    if length is None:
+        return None
+    body = stream.read(length)
+    if len(body) != length:
+        raise ValueError("Unexpected end of stream inside a section.")
+    cid_length = get_cid_length(body)
+    return (body[:cid_length], body[cid_length:])
+
+
+def get_stream_size(stream: BinaryIO) -> int:
+    """
+    Get the size of a seekable stream, keeping its position.
+
+    Args:
+        stream (BinaryIO): The seekable stream.
+
+    Returns:
+        int: The size of the stream.
+    """
+    position = stream.tell()
+    size = stream.seek(0, SEEK_END)
+    stream.seek(position)
+    return size
+
+
+def skip_block(
+    stream: BinaryIO, size: Optional[int] = None
+) -> Optional[Tuple[bytes, int, int]]:
+    """
+    Read the CID of a section and seek past its data.
+
+    Args:
+        stream (BinaryIO): The seekable stream to read from.
+        size (Optional[int], optional): The offset the sections end at, such as the
+            size of the stream. Defaults to None, getting the size of the stream.
+
+    Returns:
+        Optional[Tuple[bytes, int, int]]: The binary CID, and the offset and length
+            of the data of the block, or None at the end of the stream.
+
+    Raises:
+        ValueError: If the stream ends in the middle of a section.
+    """
+    length = read_varint(stream)
+    if length is None:
+        return None
+    start = stream.tell()
+    # Seeking past the end of a file succeeds, so check against its size.
+    if start + length > (get_stream_size(stream) if size is None else size):
+        raise ValueError("Unexpected end of stream inside a section.")
+    head = stream.read(min(length, _MAX_CID_LENGTH))
+    try:
+        cid_length = get_cid_length(head)
+    except (IndexError, ValueError):
+        raise ValueError("Unexpected end of stream inside a section.")
+    if cid_length > len(head):
+        raise ValueError("Unexpected end of stream inside a section.")
+    stream.seek(start + length)
+    return (head[:cid_length], start + cid_length, length - cid_length)
+
+
+def read_section(stream: BinaryIO) -> Optional[Tuple[bytes, bytes]]:
+    """
+    Read a `varint | CID | data` section as written by `CARv1Writer._get_block`.
+
+    Args:
+        stream (BinaryIO): The stream to read from.
+
+    Returns:
+        Optional[Tuple[bytes, bytes]]: The binary CID and the whole section,
+            including the varint, or None at the end of the stream.
+
+    Raises:
+        ValueError: If the stream ends in the middle of a section.
+    """
+    length = read_varint(stream)
+    if length is None:
+        return None
+    body = stream.read(length)
+    if len(body) != length:
+        raise ValueError("Unexpected end of stream inside a section.")
+    cid_length = get_cid_length(body)
+    return (body[:cid_length], varint.encode(length) + body)
+
+
+def iter_sections(stream: BinaryIO) -> Generator[Tuple[bytes, bytes], None, None]:
+    """
+    Iterate over the sections of a stream of blocks.
+
+    Args:
+        stream (BinaryIO): The stream to read from.
+
+    Yields:
+        Generator[Tuple[bytes, bytes], None, None]: Generator of binary CIDs and
+            whole sections.
+    """
+    while True:
+        section = read_section(stream)
+        if section is None:
+            return
+        yield section
@@ -0,0 +1,180 @@
+from json import dump
+from multiformats import CID  # type: ignore
+from pycar.abstract import File
+from typing import Any, Callable, List, NamedTuple, Optional, Union
+from .compressed_archive import CARv1Writer
+from .sections import decode_cid
+
+
+class Shard(NamedTuple):
+    """
+    A finished shard of a split archive.
+
+    Attributes:
+        path (str): The path of the shard.
+        root (CID): The root of the shard, which is the last block written to it.
+        size (int): The number of bytes of the shard.
+        blocks (int): The number of blocks of the shard.
+    """
+
+    path: str
+    root: CID
+    size: int
+    blocks: int
+
+
+class SplitCARv1Writer(CARv1Writer):
+    """
+    Context manager for writing an archive as a sequence of CARv1 shards of at most
+    `max_size` bytes each, rolling over to a new shard as the DAG is built.
+
+    Every shard is a valid CARv1 file whose single root is the last block written
+    to it, so the last shard has the root of the DAG as its root. A shard is
+    finished, and handed to `on_shard`, as soon as the next one is started, so it
+    can be uploaded while the rest of the DAG is built. The shards, in order, and
+    the roots of the archive are listed in a JSON manifest.
+
+    Blocks are written whole, so a block larger than `max_size` gets a shard of its
+    own that exceeds it.
+
+    Attributes:
+        name_pattern (str): The pattern of the paths of the shards.
+        max_size (int): The maximum number of bytes of a shard.
+        on_shard (Optional[Callable[[Shard], Any]]): The callback called with every
+            finished shard.
+        manifest_path (Optional[str]): The path of the manifest, if any.
+        shards (List[Shard]): The finished shards.
+    """
+
+    # The shards are always files with a reserved header slot.
+    name: str
+    _header_slot: int
+
+    def __init__(
+        self,
+        file: Optional[File],
+        name_pattern: str,
+        max_size: int,
+        on_shard: Optional[Callable[[Shard], Any]] = None,
+        manifest_path: Optional[str] = None,
+        **kwargs,
+    ):
+        """
+        Initializes a SplitCARv1Writer object.
+
+        Args:
+            file (Optional[File]): The file to write, or None to write a folder.
+            name_pattern (str): The pattern of the paths of the shards, formatted
+                with the index of the shard, such as "archive-{index:05}.car".
+            max_size (int): The maximum number of bytes of a shard.
+            on_shard (Optional[Callable[[Shard], Any]], optional): The callback
+                called with every finished shard. Defaults to None.
+            manifest_path (Optional[str], optional): The path to write the JSON
+                manifest of the shards to. Defaults to None.
+            **kwargs: The arguments of the `CARv1Writer`, such as `unixfs` or
+                `dedup`, other than `reserve_header`, `roots` and `carv2`.
+
+        Raises:
+            ValueError: If the pattern has no index, an argument is not supported or
+                `max_size` does not leave room for a block after the header.
+        """
+        if "{index" not in name_pattern:
+            raise ValueError("The name pattern must contain an {index} field.")
+        for unsupported in ("reserve_header", "roots", "carv2"):
+            if kwargs.get(unsupported):
+                raise ValueError(f"{unsupported} is not supported when splitting.")
+        self.name_pattern = name_pattern
+        self.max_size = max_size
+        self.on_shard = on_shard
+        self.manifest_path = manifest_path
+        self.shards: List[Shard] = []
+        self._blocks = 0
+        self._last_cid: Optional[bytes] = None
+        super().__init__(
+            file, name_pattern.format(index=0), reserve_header=True, **kwargs
+        )
+        if max_size <= self._header_slot:
+            self.sink.close()
+            raise ValueError("max_size does not leave room for any block.")
+
+    def _copies_sections(self) -> bool:
+        # Sections are written one block at a time to roll over between them.
+        return False
+
+    def _write_block(self, cid: bytes, *parts: Union[bytes, memoryview]) -> None:
+        """
+        Write a block to the current shard, first rolling over to a new shard if
+        it would exceed `max_size`, unless the block is a duplicate to skip.
+
+        Args:
+            cid (bytes): The binary CID for the block.
+            *parts (Union[bytes, memoryview]): The parts of the block.
+        """
+        duplicate = self.emitted is not None and cid in self.emitted
+        size = sum(len(part) for part in parts)
+        if (
+            not duplicate
+            and self._blocks
+            and self._header_slot + self.offset + size > self.max_size
+        ):
+            self._finish_shard()
+            self.name = self.name_pattern.format(index=len(self.shards))
+            self.sink = self.bufferedWriter = self._open_file(self.name)
+            self.offset = 0
+            self._blocks = 0
+            self._reserve_header_slot()
+        super()._write_block(cid, *parts)
+        if not duplicate:
+            self._blocks += 1
+            self._last_cid = cid
+
+    def _finish_shard(self) -> None:
+        """
+        Fill in the header of the current shard with its last block as its root,
+        close it and hand it to `on_shard`.
+
+        Raises:
+            ValueError: If the shard has no block, or the header does not fit the
+                reserved header slot.
+        """
+        if self._last_cid is None:
+            raise ValueError("A shard needs at least one block.")
+        root = decode_cid(self._last_cid)
+        header = self._get_header([root])
+        if len(header) != self._header_slot:
+            raise ValueError(f"The header of root {root} does not fit the shard.")
+        self.bufferedWriter.seek(self._header_offset)
+        self.bufferedWriter.write(header)
+        self.sink.close()
+        shard = Shard(self.name, root, self._header_slot + self.offset, self._blocks)
+        self.shards.append(shard)
+        if self.on_shard is not None:
+            self.on_shard(shard)
+
+    def _write_header(self, roots: List[CID]) -> None:
+        """
+        Finish the last shard and write the manifest with the given roots.
+
+        Args:
+            roots (List[CID]): The CIDs of the root nodes of the archive.
+        """
+        self._finish_shard()
+        if self.manifest_path is None:
+            return
+        with open(self.manifest_path, "w") as manifest:
+            dump(
+                {
+                    "roots": [str(root) for root in roots],
+                    "shards": [
+                        {
+                            "path": shard.path,
+                            "root": str(shard.root),
+                            "size": shard.size,
+                            "blocks": shard.blocks,
+                        }
+                        for shard in self.shards
+                    ],
+                },
+                manifest,
+                indent=2,
+            )
@@ -2,49 +2,350 @@ from os import walk, path
 from pycar.file_types import BinaryFile
 from multiformats import CID  # type: ignore
 from pycar.protobufs import Data  # type: ignore
+from collections import deque
+from concurrent.futures import Executor, Future
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Deque, Generator, Optional, Tuple, cast
 from . import CARv1Writer
+from .cache import FileCache
+from .hamt import ShardedDirectory
+from .sections import decode_cid
+from .split import SplitCARv1Writer
+
+_FILE, _ENTER, _LEAVE = range(3)
+
+_Event = Tuple[int, str, str, Optional[Future]]
+# The path, name and future of a file whose DAG is built by the caller.
+_FileRequest = Tuple[str, str, Optional[Future]]
+
+
+def _walk_folder(folder_path: str) -> Generator[_Event, None, None]:
+    """
+    Walk a folder in the order its DAG is written: the files of a folder first, then
+    each of its sub folders, enclosed in enter and leave events.
+
+    Args:
+        folder_path (str): The path of the folder to walk.
+
+    Yields:
+        Generator[_Event, None, None]: Generator of event kinds, paths and names.
+    """
+    for root, dirs, files in walk(folder_path):
+        for file in files:
+            yield (_FILE, path.join(root, file), file, None)
+        for dir in dirs:
+            dir_path = path.join(root, dir)
+            yield (_ENTER, dir_path, dir, None)
+            yield from _walk_folder(dir_path)
+            yield (_LEAVE, dir_path, dir, None)
+        break
+
+
+def _get_file_dag(
+    car_writer: CARv1Writer, file_path: str, name: str, chunk_size: int, spool_size: int
+) -> Tuple[int, bytes, SpooledTemporaryFile]:
+    """
+    Build the DAG of a file into a spool of its own, so that files can be built
+    concurrently while a single thread writes them to the archive.
+
+    Args:
+        car_writer (CARv1Writer): The writer whose settings the DAG is built with.
+        file_path (str): The path of the file.
+        name (str): The name of the file.
+        chunk_size (int): The size of each chunk of the file.
+        spool_size (int): Maximum number of bytes spooled in memory before
+            spilling to disk.
+
+    Returns:
+        Tuple[int, bytes, SpooledTemporaryFile]: The size and binary CID of the file,
+            and the spool holding its blocks.
+    """
+    # The worker shares the settings of the DAG and the metrics with the writer,
+    # and has an offset, index and deduplication of its own or none at all.
+    spool = SpooledTemporaryFile(max_size=spool_size)
+    worker = CARv1Writer(
+        None,
+        cast(BinaryIO, spool),
+        unixfs=car_writer.unixfs,
+        max_children=car_writer.max_children,
+        layout=car_writer.layout,
+        profile=car_writer.profile,
+        metrics=car_writer.metrics,
+        write_header=False,
+    )
+    with open(file_path, "rb") as bytestream:
+        size, cid = worker.write_file(
+            BinaryFile(
+                bufferedReader=bytestream,
+                chunkSize=chunk_size,
+                metadata={"name": name},
+            )
+        )
+    spool.seek(0)
+    return (size, cid, spool)
+
+
+def _get_dag_params(car_writer: CARv1Writer, chunk_size: int) -> str:
+    """
+    Get the parameters the DAG of a file depends on, to key the file cache with.
+    """
+    return (
+        f"{chunk_size}:{car_writer.unixfs}:{car_writer.max_children}:"
+        f"{car_writer.layout}:{car_writer.profile}"
+    )
+
+
+def _is_cached(
+    cache: Optional[FileCache], file_path: str, car_writer: CARv1Writer, chunk_size: int
+) -> bool:
+    """
+    Check whether a file can be copied from the cache.
+    """
+    if cache is None:
+        return False
+    key = FileCache.key(file_path, _get_dag_params(car_writer, chunk_size))
+    return cache.get(key) is not None
+
+
+def _prefetch_files(
+    events: Generator[_Event, None, None],
+    car_writer: CARv1Writer,
+    chunk_size: int,
+    executor: Executor,
+    max_in_flight: int,
+    spool_size: int,
+    cache: Optional[FileCache] = None,
+) -> Generator[_Event, None, None]:
+    """
+    Submit the files of a walk to the executor ahead of the events being consumed,
+    keeping at most `max_in_flight` of them pending. Files found in the cache are
+    not submitted.
+
+    Yields:
+        Generator[_Event, None, None]: The events of the walk in order, with the
+            future of each file.
+    """
+    pending: Deque[_Event] = deque()
+    in_flight = 0
+    for kind, event_path, name, _ in events:
+        future = None
+        if kind == _FILE and not _is_cached(cache, event_path, car_writer, chunk_size):
+            future = executor.submit(
+                _get_file_dag, car_writer, event_path, name, chunk_size, spool_size
+            )
+            in_flight += 1
+        pending.append((kind, event_path, name, future))
+        while in_flight >= max_in_flight:
+            event = pending.popleft()
+            if event[0] == _FILE:
+                in_flight -= 1
+            yield event
+    yield from pending
+
+
+def _build_folder(
+    car_writer: CARv1Writer,
+    events: Generator[_Event, None, None],
+    chunk_size: int,
+    shard_threshold: Optional[int],
+    cache: Optional[FileCache],
+) -> Generator[_FileRequest, Tuple[int, bytes], CID]:
+    """
+    Build the DAG of a folder from the events of its walk, leaving the files to
+    the caller, so that they can be built by a blocking loop or on an event loop.
+
+    Every file that is not copied from the cache is yielded with its name and
+    future, if it was prefetched, and the size of a link to it and its binary CID
+    are sent back once its blocks are written.
+
+    Args:
+        car_writer (CARv1Writer): The writer to write the DAG with.
+        events (Generator[_Event, None, None]): The events of the walk.
+        chunk_size (int): The size of each chunk of a file.
+        shard_threshold (Optional[int]): The size of the links of a directory
+            above which it is sharded, or None never to shard directories.
+        cache (Optional[FileCache]): The cache of the DAGs of files, if any.
+
+    Yields:
+        Generator[_FileRequest, Tuple[int, bytes], CID]: Generator of the paths,
+            names and futures of the files to build, returning the CID of the root
+            folder node.
+    """
+
+    def new_folder():
+        folder_node = car_writer._get_pbnode(dtype=Data.DataType.Directory)
+        # The node, the total size of its links, the estimated size of its links
+        # and the HAMT it is written as once sharded.
+        return [folder_node, 0, 0, None]
+
+    kubo = car_writer.profile == "kubo"
+
+    def add_link(folder, cid, name, size):
+        folder_node, _, _, sharded = folder
+        folder[1] += size
+        if sharded is not None:
+            sharded.add(name=name, cid=cid, size=size)
+            return
+        folder_node.add_link(cid=cid, name=name, size=size)
+        if not kubo:
+            folder_node.blocksizes.append(size)
+        folder[2] += len(name.encode()) + len(folder_node.hashes[-1])
+        if shard_threshold is not None and folder[2] > shard_threshold:
+            sharded = ShardedDirectory(car_writer)
+            for link_name, link_cid, link_size in zip(
+                folder_node.names, folder_node.hashes, folder_node.sizes
+            ):
+                sharded.add(name=link_name, cid=link_cid, size=link_size)
+            folder_node.clear_links()
+            folder[3] = sharded
+
+    def write_folder(folder):
+        folder_node, total_size, _, sharded = folder
+        if sharded is not None:
+            try:
+                return sharded.write()
+            finally:
+                sharded.close()
+        if kubo:
+            # kubo sorts the links of a directory by name, and links to it with
+            # the cumulative size of the blocks under it.
+            folder_node.sort_links()
+        _, directory_cid = car_writer._serialize_and_write_pbnode(
+            pbnode=folder_node, codec="dag-pb"
+        )
+        if kubo:
+            total_size += folder_node.byte_size
+        return (total_size, directory_cid)
+
+    params = _get_dag_params(car_writer, chunk_size)
+    # The offsets of a split archive are relative to shards a file may span.
+    record = (
+        isinstance(car_writer.name, str)
+        and car_writer.emitted is None
+        and not isinstance(car_writer, SplitCARv1Writer)
+    )
+
+    folders = [new_folder()]
+    for kind, event_path, name, future in events:
+        if kind == _FILE:
+            key = cached = None
+            if cache is not None:
+                key = FileCache.key(event_path, params)
+                cached = cache.get(key)
+            start = car_writer.offset
+            if cached is not None:
+                cache.copy(cached, car_writer)  # type: ignore
+                size, cid = cached.size, cached.cid
+            else:
+                size, cid = yield (event_path, name, future)
+            if key is not None and record:
+                cache.put(  # type: ignore
+                    key,
+                    car=car_writer.name,  # type: ignore
+                    offset=start,
+                    length=car_writer.offset - start,
+                    size=size,
+                    cid=cid,
+                )
+            add_link(folders[-1], cid=cid, name=name, size=size)
+        elif kind == _ENTER:
+            folders.append(new_folder())
+        else:
+            size, cid = write_folder(folders.pop())
+            add_link(folders[-1], cid=cid, name=name, size=size)
+
+    return decode_cid(write_folder(folders.pop())[1])
 
 
 def folder_to_dag(
-    car_writer: CARv1Writer, folder_path: str, chunk_size: int = 262144
+    car_writer: CARv1Writer,
+    folder_path: str,
+    chunk_size: int = 262144,
+    executor: Optional[Executor] = None,
+    max_in_flight: int = 64,
+    spool_size: int = 1024 * 1024,
+    shard_threshold: Optional[int] = 262144,
+    cache: Optional[FileCache] = None,
+    write_header: bool = True,
 ) -> CID:
-    def helper(folder_path):
-        folder_node, folder_unixfs = car_writer._get_pbnode(
-            dtype=Data.DataType.Directory
-        )
-        total_size = 0
-
-        def add_link(cid, name, size):
-            link = car_writer._get_pblink(cid=cid, name=name, size=size)
-            folder_node.Links.extend([link])
-            folder_unixfs.blocksizes.extend([size])
-
-        try:
-            for root, dirs, files in walk(folder_path):
-                for file in files:
-                    file_path = path.join(root, file)
-                    with open(file_path, "rb") as bytestream:
-                        car_writer.file = BinaryFile(
-                            bufferedReader=bytestream,
-                            chunkSize=chunk_size,
-                            metadata={"name": file},
-                        )
-                        size, cid = car_writer._get_file_node()
-                        add_link(cid=cid, name=file, size=size)
-                        total_size += size
-                for dir in dirs:
-                    dir_path = path.join(root, dir)
-                    size, cid = helper(dir_path)
-                    add_link(cid=cid, name=dir, size=size)
-                    total_size += size
-                break
-            _, directory_cid = car_writer._serialize_and_write_pbnode(
-                pbnode=folder_node, unixfs=folder_unixfs, codec="dag-pb"
+    """
+    Build the DAG of a folder, write it to the CARv1 file and write the header.
+
+    With an executor, which should be a ThreadPoolExecutor, up to `max_in_flight`
+    files are read, chunked and hashed concurrently, each into a spool holding up to
+    `spool_size` bytes in memory, while the calling thread writes them to the
+    archive in the order of the sequential walk, skipping blocks already written
+    if the writer deduplicates them. The result is byte-identical to the
+    sequential one.
+
+    A directory whose links outgrow `shard_threshold` is written as a HAMT of
+    UnixFS HAMTShard nodes instead of a single node, spilling its entries to disk
+    so that memory use does not grow with the number of entries.
+
+    With a cache, files unchanged since they were last written to an archive that
+    still exists unchanged are copied from it instead of being read and hashed,
+    and the files written to this archive are added to the cache, unless duplicate
+    blocks are skipped, which can leave the blocks of a file incomplete.
+
+    Args:
+        car_writer (CARv1Writer): The writer to write the DAG with.
+        folder_path (str): The path of the folder.
+        chunk_size (int, optional): The size of each chunk of a file. Defaults to
+            262144.
+        executor (Optional[Executor], optional): The executor to build the DAGs of
+            files on. Defaults to None, building them one at a time.
+        max_in_flight (int, optional): The maximum number of files pending on the
+            executor. Defaults to 64.
+        spool_size (int, optional): Maximum number of bytes of a pending file
+            spooled in memory before spilling to disk. Defaults to 1 MiB.
+        shard_threshold (Optional[int], optional): The size of the links of a
+            directory, estimated as the lengths of their names and CIDs, above
+            which it is sharded. Defaults to 256 KiB, as kubo does. None never
+            shards directories.
+        cache (Optional[FileCache], optional): The cache of the DAGs of files.
+            Defaults to None, building the DAG of every file.
+        write_header (bool, optional): Flag indicating whether to write the header
+            with the folder as the only root. Defaults to True; `add_folder` builds
+            the DAG of a folder without it.
+
+    Returns:
+        CID: The CID of the root folder node.
+
+    Raises:
+        FileNotFoundError: If the folder does not exist.
+    """
+    if not path.isdir(folder_path):
+        raise FileNotFoundError(f"Folder '{folder_path}' not found.")
+
+    def build_file(
+        file_path: str, name: str, future: Optional[Future]
+    ) -> Tuple[int, bytes]:
+        if future is not None:
+            size, cid, spool = future.result()
+            with spool:
+                car_writer._write_sections(spool)  # type: ignore
+            return (size, cid)
+        with open(file_path, "rb") as bytestream:
+            return car_writer.write_file(
+                BinaryFile(
+                    bufferedReader=bytestream,
+                    chunkSize=chunk_size,
+                    metadata={"name": name},
+                )
             )
-            return (total_size, directory_cid)
-        except FileNotFoundError:
-            raise FileNotFoundError(f"Folder '{folder_path}' not found.")
 
-    _, cid = helper(folder_path=folder_path)
-    car_writer._write_header(cid=cid)
+    events = _walk_folder(folder_path)
+    if executor is not None:
+        events = _prefetch_files(
+            events, car_writer, chunk_size, executor, max_in_flight, spool_size, cache
+        )
+    builder = _build_folder(car_writer, events, chunk_size, shard_threshold, cache)
+    try:
+        request = next(builder)
+        while True:
+            request = builder.send(build_file(*request))
+    except StopIteration as stop:
+        cid = stop.value
+    if write_header:
+        car_writer._timed("header", car_writer._write_header, [cid])
     return cid
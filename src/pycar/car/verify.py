@@ -0,0 +1,221 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha256
+from mmap import mmap, ACCESS_READ
+from os import cpu_count
+from time import perf_counter
+from typing import Generator, List, NamedTuple, Optional, Set, Tuple, Union
+from .dag_pb import get_link_cids
+from .reader import CARv1Reader
+from .sections import DAG_PB, SHA2_256, get_cid_codec, get_cid_multihash
+
+# The blocks hashed by a worker at once, bounded by count and by bytes.
+_BATCH_BLOCKS = 4096
+_BATCH_BYTES = 16 * 1024 * 1024
+
+# The archive mapped by a worker process, opened once by its initializer.
+_mapped: Optional[mmap] = None
+
+
+def verify_block(cid: bytes, data: Union[bytes, memoryview]) -> bool:
+    """
+    Check that the data of a block hashes to the digest of its CID.
+
+    Args:
+        cid (bytes): The binary CID of the block.
+        data (Union[bytes, memoryview]): The data of the block.
+
+    Returns:
+        bool: True if the data matches the CID.
+    """
+    code, digest = get_cid_multihash(cid)
+    if code == SHA2_256:
+        return sha256(data).digest() == digest
+    from multiformats import multihash  # type: ignore
+
+    return bytes(multihash.unwrap(multihash.get(code=code).digest(data))) == digest
+
+
+def verify_car(car_reader: CARv1Reader) -> List[bytes]:
+    """
+    Rehash every block of an archive.
+
+    Args:
+        car_reader (CARv1Reader): The reader of the archive.
+
+    Returns:
+        List[bytes]: The binary CIDs of the blocks whose data does not match.
+    """
+    return [cid for cid, data in car_reader.iter_raw() if not verify_block(cid, data)]
+
+
+class VerifyReport(NamedTuple):
+    """
+    The result of verifying an archive with `verify_archive`.
+
+    Attributes:
+        blocks (int): The number of blocks.
+        size (int): The number of bytes of block data hashed.
+        seconds (float): The time taken to verify the archive.
+        mismatched (List[bytes]): The binary CIDs of the blocks whose data does not
+            match.
+        undecodable (List[bytes]): The binary CIDs of the dag-pb blocks whose links
+            cannot be decoded.
+        missing (List[bytes]): The binary CIDs of the roots and links that are not
+            in the archive.
+    """
+
+    blocks: int
+    size: int
+    seconds: float
+    mismatched: List[bytes]
+    undecodable: List[bytes]
+    missing: List[bytes]
+
+    @property
+    def ok(self) -> bool:
+        """
+        Whether every block matches its CID and the DAG is complete.
+        """
+        return not (self.mismatched or self.undecodable or self.missing)
+
+    @property
+    def throughput(self) -> float:
+        """
+        The bytes of block data verified per second.
+        """
+        return self.size / self.seconds if self.seconds else 0.0
+
+
+def _check_blocks(
+    buffer: mmap, batch: List[Tuple[bytes, int, int]]
+) -> Tuple[List[bytes], List[bytes], List[bytes]]:
+    """
+    Rehash a batch of blocks in a mapped archive and collect the links of the
+    dag-pb blocks that match their CIDs.
+
+    Args:
+        buffer (mmap): The mapped archive.
+        batch (List[Tuple[bytes, int, int]]): The binary CIDs, and offsets and
+            lengths of the data of the blocks.
+
+    Returns:
+        Tuple[List[bytes], List[bytes], List[bytes]]: The mismatched and undecodable
+            blocks, and the links of the batch.
+    """
+    mismatched, undecodable, links = [], [], []
+    with memoryview(buffer) as view:
+        for cid, offset, length in batch:
+            data = view[offset : offset + length]
+            if not verify_block(cid, data):
+                mismatched.append(cid)
+            elif get_cid_codec(cid) == DAG_PB:
+                try:
+                    links.extend(get_link_cids(data))
+                except ValueError:
+                    undecodable.append(cid)
+            data.release()
+    return (mismatched, undecodable, links)
+
+
+def _init_worker(path: str) -> None:
+    """
+    Map the archive in a worker process.
+    """
+    global _mapped
+    with open(path, "rb") as f:
+        _mapped = mmap(f.fileno(), 0, access=ACCESS_READ)
+
+
+def _check_batch(
+    batch: List[Tuple[bytes, int, int]]
+) -> Tuple[List[bytes], List[bytes], List[bytes]]:
+    """
+    Check a batch of blocks in the archive mapped by the worker process.
+    """
+    return _check_blocks(_mapped, batch)  # type: ignore
+
+
+def _iter_batches(
+    car_reader: CARv1Reader,
+) -> Generator[List[Tuple[bytes, int, int]], None, None]:
+    """
+    Scan an archive, seeking past the data of the blocks, and group the blocks
+    into batches.
+    """
+    batch: List[Tuple[bytes, int, int]] = []
+    size = 0
+    for block in car_reader.iter_offsets():
+        batch.append(block)
+        size += block[2]
+        if len(batch) >= _BATCH_BLOCKS or size >= _BATCH_BYTES:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+def verify_archive(path: str, processes: Optional[int] = None) -> VerifyReport:
+    """
+    Rehash every block of an archive file and check that every root and every link
+    of its dag-pb blocks is in the archive.
+
+    The calling process scans the archive, seeking past the data of the blocks,
+    and hands batches of their offsets to a pool of processes that each map the
+    file and hash slices of the mapping, so that the data is neither copied nor
+    pickled. The CIDs seen are kept in a set, and the links not seen yet in
+    another, which stays small as the writers of this package write the children
+    of a node before the node.
+
+    Args:
+        path (str): The path of the CARv1 or CARv2 file.
+        processes (Optional[int], optional): The number of processes to hash on, or
+            0 to hash on the calling process. Defaults to None, using a process per
+            CPU.
+
+    Returns:
+        VerifyReport: The blocks and bytes verified, the time taken and the
+            problems found.
+    """
+    start = perf_counter()
+    seen: Set[bytes] = set()
+    needed: Set[bytes] = set()
+    mismatched: List[bytes] = []
+    undecodable: List[bytes] = []
+    blocks = size = 0
+
+    def collect(result: Tuple[List[bytes], List[bytes], List[bytes]]) -> None:
+        mismatched.extend(result[0])
+        undecodable.extend(result[1])
+        needed.update(link for link in result[2] if link not in seen)
+
+    with CARv1Reader(path) as reader:
+        needed.update(bytes(root) for root in reader.roots)
+        workers = (cpu_count() or 1) if processes is None else processes
+        if workers <= 0:
+            with open(path, "rb") as f, mmap(f.fileno(), 0, access=ACCESS_READ) as m:
+                for batch in _iter_batches(reader):
+                    seen.update(cid for cid, _, _ in batch)
+                    blocks += len(batch)
+                    size += sum(length for _, _, length in batch)
+                    collect(_check_blocks(m, batch))
+        else:
+            with ProcessPoolExecutor(
+                workers, initializer=_init_worker, initargs=(path,)
+            ) as pool:
+                pending: deque = deque()
+                for batch in _iter_batches(reader):
+                    seen.update(cid for cid, _, _ in batch)
+                    blocks += len(batch)
+                    size += sum(length for _, _, length in batch)
+                    pending.append(pool.submit(_check_batch, batch))
+                    # Bound the batches in flight, and so the memory they hold.
+                    if len(pending) >= 2 * workers:
+                        collect(pending.popleft().result())
+                while pending:
+                    collect(pending.popleft().result())
+
+    missing = sorted(cid for cid in needed if cid not in seen)
+    return VerifyReport(
+        blocks, size, perf_counter() - start, mismatched, undecodable, missing
+    )
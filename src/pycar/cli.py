@@ -0,0 +1,189 @@
+"""
+The `pycar` command line: pack files and folders into archives, unpack them, list
+their blocks and verify them.
+
+Only the standard library is imported up front, and each subcommand imports what
+it uses, so that `--help` and small jobs start quickly.
+"""
+
+from argparse import ArgumentParser, Namespace
+from os import devnull, dup2, open as os_open, O_WRONLY, path, remove
+import sys
+from typing import List, Optional
+
+
+def _executor(jobs: int):
+    """
+    Get a thread pool of `jobs` workers, or None to work on the calling thread.
+    """
+    if jobs <= 0:
+        return None
+    from concurrent.futures import ThreadPoolExecutor
+
+    return ThreadPoolExecutor(jobs)
+
+
+def _pack(args: Namespace) -> int:
+    from pycar.car import CARv1Writer, folder_to_dag
+
+    options = dict(
+        unixfs=args.unixfs,
+        max_children=args.max_children,
+        reserve_header=True,
+        dedup=args.dedup,
+        carv2=args.carv2,
+        layout=args.layout,
+        profile=args.profile,
+    )
+    executor = _executor(args.jobs)
+    try:
+        if path.isdir(args.source):
+            with CARv1Writer(None, args.output, **options) as car:
+                cid = folder_to_dag(
+                    car, args.source, chunk_size=args.chunk_size, executor=executor
+                )
+        else:
+            from pycar.file_types import BinaryFile
+
+            with open(args.source, "rb") as f:
+                file = BinaryFile(
+                    bufferedReader=f,
+                    chunkSize=args.chunk_size,
+                    metadata={"name": path.basename(args.source)},
+                )
+                with CARv1Writer(
+                    file, args.output, executor=executor, **options
+                ) as car:
+                    cid = car.get_car()
+    except BaseException:
+        # Do not leave a partial archive behind.
+        if path.exists(args.output):
+            remove(args.output)
+        raise
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    print(cid)
+    return 0
+
+
+def _unpack(args: Namespace) -> int:
+    from multiformats import CID  # type: ignore
+    from pycar.car import CARv1Reader, dag_to_folder
+
+    root = None if args.root is None else CID.decode(args.root)
+    executor = _executor(args.jobs)
+    try:
+        with CARv1Reader(args.car) as reader:
+            cid = dag_to_folder(reader, args.output, cid=root, executor=executor)
+    except BaseException:
+        # Do not leave a partial archive behind.
+        if path.exists(args.output):
+            remove(args.output)
+        raise
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    print(cid)
+    return 0
+
+
+def _ls(args: Namespace) -> int:
+    from pycar.car import CARv1Reader
+    from pycar.car.sections import decode_cid
+
+    with CARv1Reader(args.car) as reader:
+        if args.roots:
+            for root in reader.roots:
+                print(decode_cid(bytes(root)))
+            return 0
+        for cid, _, length in reader.iter_offsets():
+            print(f"{decode_cid(cid)}\t{length}")
+    return 0
+
+
+def _verify(args: Namespace) -> int:
+    from pycar.car.sections import decode_cid
+    from pycar.car.verify import verify_archive
+
+    report = verify_archive(args.car, processes=args.jobs)
+    for cid in report.mismatched:
+        print(f"{decode_cid(cid)}: data does not match the CID", file=sys.stderr)
+    for cid in report.undecodable:
+        print(f"{decode_cid(cid)}: links cannot be decoded", file=sys.stderr)
+    for cid in report.missing:
+        print(f"{decode_cid(cid)}: block is missing from the archive", file=sys.stderr)
+    print(
+        f"{report.blocks} blocks, {report.size / 1e6:.1f} MB in "
+        f"{report.seconds:.2f} s ({report.throughput / 1e6:.1f} MB/s)",
+        file=sys.stderr,
+    )
+    if not report.ok:
+        return 1
+    print("OK")
+    return 0
+
+
+def _get_parser() -> ArgumentParser:
+    parser = ArgumentParser(prog="pycar", description="Pack, unpack and inspect CARs.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    pack = subparsers.add_parser("pack", help="Pack a file or folder into a CAR.")
+    pack.add_argument("source", help="The file or folder to pack.")
+    pack.add_argument("output", help="The path of the archive to write.")
+    pack.add_argument("--chunk-size", type=int, default=262144)
+    pack.add_argument("--max-children", type=int, default=1024)
+    pack.add_argument("--unixfs", action="store_true", help="Wrap leaves in UnixFS.")
+    pack.add_argument("--layout", choices=["balanced", "trickle"], default="balanced")
+    pack.add_argument("--profile", choices=["kubo"], default=None)
+    pack.add_argument("--dedup", action="store_true", help="Skip duplicate blocks.")
+    pack.add_argument("--carv2", action="store_true", help="Write a CARv2 file.")
+    pack.add_argument("--jobs", type=int, default=0, help="Threads to hash on.")
+    pack.set_defaults(func=_pack)
+
+    unpack = subparsers.add_parser("unpack", help="Unpack a CAR to files.")
+    unpack.add_argument("car", help="The archive to unpack.")
+    unpack.add_argument("output", help="The path to unpack the root to.")
+    unpack.add_argument("--root", default=None, help="The CID of the root to unpack.")
+    unpack.add_argument("--jobs", type=int, default=0, help="Threads to write on.")
+    unpack.set_defaults(func=_unpack)
+
+    ls = subparsers.add_parser("ls", help="List the blocks of a CAR.")
+    ls.add_argument("car", help="The archive to list.")
+    ls.add_argument("--roots", action="store_true", help="List the roots only.")
+    ls.set_defaults(func=_ls)
+
+    verify = subparsers.add_parser("verify", help="Check the blocks of a CAR.")
+    verify.add_argument("car", help="The archive to verify.")
+    verify.add_argument("--jobs", type=int, default=0, help="Processes to hash on.")
+    verify.set_defaults(func=_verify)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the `pycar` command line.
+
+    Args:
+        argv (Optional[List[str]], optional): The arguments. Defaults to None,
+            using the arguments of the process.
+
+    Returns:
+        int: The exit status.
+    """
+    parser = _get_parser()
+    args = parser.parse_args(argv)
+    try:
+        return args.func(args)
+    except BrokenPipeError:
+        # The reader of the output, such as head, exited early. The output is
+        # redirected so that flushing it at exit does not fail again.
+        dup2(os_open(devnull, O_WRONLY), sys.stdout.fileno())
+        return 1
+    except (OSError, ValueError) as error:
+        parser.exit(1, f"pycar: error: {error}\n")
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
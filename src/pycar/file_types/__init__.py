@@ -1,3 +1,17 @@
-from .binary_file import BinaryFile
+from typing import TYPE_CHECKING
+from pycar._lazy import attach
 
-__all__ = ["BinaryFile"]
+if TYPE_CHECKING:
+    from .binary_file import BinaryFile as BinaryFile
+    from .cdc_file import CDCFile as CDCFile
+    from .mapped_file import MappedFile as MappedFile
+
+# CDCFile imports numpy, so it is only imported when used.
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    exports={
+        "BinaryFile": ".binary_file",
+        "CDCFile": ".cdc_file",
+        "MappedFile": ".mapped_file",
+    },
+)
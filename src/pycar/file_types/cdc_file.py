@@ -0,0 +1,181 @@
+from pycar.abstract.file import File
+from hashlib import sha256
+from typing import Any, BinaryIO, Optional
+
+np: Any
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# Width of the gear hash in bits, and so the number of bytes it depends on.
+_WINDOW = 32
+_MASK32 = 0xFFFFFFFF
+# Number of positions hashed at once when numpy is installed.
+_STRIDE = 65536
+
+_GEAR = tuple(
+    int.from_bytes(sha256(bytes([byte])).digest()[:4], "big") for byte in range(256)
+)
+_GEAR_ARRAY = None if np is None else np.array(_GEAR, dtype=np.uint32)
+
+
+def _top_bits_mask(bits: int) -> int:
+    """
+    Get a mask of the given number of most significant bits of the gear hash, which
+    are the bits depending on the most bytes.
+    """
+    return ((1 << bits) - 1) << (_WINDOW - bits)
+
+
+def _find_cut_python(data: bytes, start: int, end: int, mask: int) -> int:
+    """
+    Find the first position in `[start, end)` whose gear hash has none of the bits
+    of `mask` set, one byte at a time.
+
+    Returns:
+        int: The position, or -1 if there is none.
+    """
+    gear = _GEAR
+    h = 0
+    for byte in data[start - _WINDOW + 1 : start]:
+        h = ((h << 1) + gear[byte]) & _MASK32
+    for i in range(start, end):
+        h = ((h << 1) + gear[data[i]]) & _MASK32
+        if not h & mask:
+            return i
+    return -1
+
+
+def _find_cut_numpy(data: bytes, start: int, end: int, mask: int) -> int:
+    """
+    Find the first position in `[start, end)` whose gear hash has none of the bits
+    of `mask` set, hashing the positions of a whole stride at once.
+
+    The gear hash of a position is the sum of the gear values of the last 32 bytes,
+    each shifted left by its distance from the position, so the hashes of all
+    positions follow from five shifted additions over doubling windows.
+
+    Returns:
+        int: The position, or -1 if there is none.
+    """
+    for stride_start in range(start, end, _STRIDE):
+        stride_end = min(stride_start + _STRIDE, end)
+        offset = stride_start - _WINDOW + 1
+        hashes = np.take(
+            _GEAR_ARRAY, np.frombuffer(data, np.uint8, stride_end - offset, offset)
+        )
+        width = 1
+        while width < _WINDOW:
+            hashes[width:] += hashes[:-width] << np.uint32(width)
+            width <<= 1
+        cuts = np.flatnonzero((hashes[_WINDOW - 1 :] & np.uint32(mask)) == 0)
+        if len(cuts):
+            return stride_start + int(cuts[0])
+    return -1
+
+
+_find_cut = _find_cut_python if np is None else _find_cut_numpy
+
+
+class CDCFile(File):
+    """
+    This class represents a binary file and provides an iterator over content
+    defined chunks of binary data from the file, using FastCDC with normalized
+    chunking over a 32-byte gear hash.
+
+    Chunk boundaries depend only on the bytes around them, so inserting or removing
+    bytes only changes the chunks around the edit. When numpy is installed the
+    hashes of 64 KiB of positions are computed at once, otherwise one byte at a
+    time; both produce the same chunks.
+
+    Attributes:
+        bufferedReader (BinaryIO): The binary input stream representing the file.
+        chunkSize (int): The average size of each chunk of data.
+        minSize (int): The minimum size of each chunk of data.
+        maxSize (int): The maximum size of each chunk of data.
+        metadata (Optional[dict]): Metadata associated with the file.
+    """
+
+    def __init__(
+        self,
+        bufferedReader: BinaryIO,
+        minSize: int = 65536,
+        chunkSize: int = 262144,
+        maxSize: int = 1048576,
+        metadata: Optional[dict] = None,
+    ):
+        """
+        Initializes a CDCFile object.
+
+        Args:
+            bufferedReader (BinaryIO): A binary input stream representing the file.
+            minSize (int, optional): The minimum size of each chunk of data.
+                Defaults to 64 KiB.
+            chunkSize (int, optional): The average size of each chunk of data.
+                Defaults to 256 KiB.
+            maxSize (int, optional): The maximum size of each chunk of data.
+                Defaults to 1 MiB.
+            metadata (Optional[dict], optional): Metadata associated with the file.
+                Defaults to None.
+
+        Raises:
+            ValueError: If the sizes are not such that 64 <= minSize < chunkSize
+                < maxSize.
+        """
+        if not 64 <= minSize < chunkSize < maxSize:
+            raise ValueError(
+                "Chunk sizes must satisfy 64 <= minSize < chunkSize < maxSize."
+            )
+        super().__init__(
+            bufferedReader=bufferedReader, chunkSize=chunkSize, metadata=metadata
+        )
+        self.minSize = minSize
+        self.maxSize = maxSize
+        bits = chunkSize.bit_length() - 1
+        self._mask_small = _top_bits_mask(min(bits + 1, _WINDOW))
+        self._mask_large = _top_bits_mask(max(bits - 1, 1))
+        self._buffer = b""
+        self._eof = False
+
+    def __next__(self) -> bytes:
+        """
+        Iterates over content defined chunks of binary data from the file.
+
+        Returns:
+            bytes: A chunk of binary data from the file.
+
+        Raises:
+            StopIteration: If the end of the file has been reached.
+        """
+        while not self._eof and len(self._buffer) < self.maxSize:
+            data: bytes = self.bufferedReader.read(self.maxSize)
+            if not data:
+                self._eof = True
+            self._buffer += data
+        if not self._buffer:
+            raise StopIteration
+
+        buffer = self._buffer
+        size = len(buffer)
+        if size <= self.minSize:
+            cut = size
+        else:
+            normal = min(self.chunkSize, size)
+            cut = _find_cut(buffer, self.minSize, normal, self._mask_small)
+            if cut < 0:
+                cut = _find_cut(
+                    buffer, normal, min(self.maxSize, size), self._mask_large
+                )
+            cut = min(self.maxSize, size) if cut < 0 else cut + 1
+
+        self._buffer = buffer[cut:]
+        return buffer[:cut]
+
+    def reset(self) -> None:
+        """
+        Resets the read position of the CDCFile object to the beginning of the file.
+        """
+        self.bufferedReader.seek(0)
+        self._buffer = b""
+        self._eof = False
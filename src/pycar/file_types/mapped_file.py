@@ -0,0 +1,112 @@
+from pycar.abstract.file import File
+from mmap import mmap, ACCESS_READ
+from os import fstat
+from types import TracebackType
+from typing import BinaryIO, Optional, Type
+
+
+class MappedFile(File):
+    """
+    This class represents a memory-mapped binary file and provides an iterator over
+    read-only memoryview chunks of the mapping, so that chunks are hashed and
+    written without being copied.
+
+    The position of the underlying reader follows the chunks, so that its `tell`
+    reports the number of bytes consumed like it does for a BinaryFile. The mapping
+    is released by `close`, or on leaving the object as a context manager, once
+    the chunks are no longer used.
+
+    Attributes:
+        bufferedReader (BinaryIO): The binary input stream representing the file. It
+            must be backed by a file descriptor.
+        chunkSize (int): The size of each chunk of data to read.
+        metadata (Optional[dict]): Metadata associated with the file.
+    """
+
+    def __init__(
+        self,
+        bufferedReader: BinaryIO,
+        chunkSize: int = 1024,
+        metadata: Optional[dict] = None,
+    ):
+        """
+        Initializes a MappedFile object.
+
+        Args:
+            bufferedReader (BinaryIO): A binary input stream representing the file.
+                It must be backed by a file descriptor.
+            chunkSize (Optional[int], optional): The size of each chunk of data to
+                read from the file. Defaults to 1024 bytes.
+            metadata (Optional[dict], optional): Metadata associated with the file.
+                Defaults to None.
+        """
+        super().__init__(
+            bufferedReader=bufferedReader, chunkSize=chunkSize, metadata=metadata
+        )
+        fd = bufferedReader.fileno()
+        self._size = fstat(fd).st_size
+        self._map: Optional[mmap] = None
+        if self._size:
+            self._map = mmap(fd, 0, access=ACCESS_READ)
+            self._view = memoryview(self._map)
+        else:
+            self._view = memoryview(b"")
+        self._position = bufferedReader.tell()
+
+    def __enter__(self) -> "MappedFile":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+        /,
+    ) -> None:
+        """
+        Exit the context manager and release the mapping.
+
+        Args:
+            exc_type (Optional[Type[BaseException]]): The type of the exception, if any.
+            exc_value (Optional[BaseException]): The exception value, if any.
+            traceback (Optional[TracebackType]): The traceback, if any.
+        """
+        self.close()
+
+    def close(self) -> None:
+        """
+        Release the view of the mapping and unmap the file. The underlying reader is
+        left open.
+
+        Raises:
+            BufferError: If a chunk of the file is still referenced.
+        """
+        self._view.release()
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def __next__(self) -> memoryview:
+        """
+        Iterates over chunks of the mapped file.
+
+        Returns:
+            memoryview: A read-only view of a chunk of the file.
+
+        Raises:
+            StopIteration: If the end of the file has been reached.
+        """
+        start = self._position
+        if start >= self._size:
+            raise StopIteration
+        self._position = min(start + self.chunkSize, self._size)
+        self.bufferedReader.seek(self._position)
+        return self._view[start : self._position]
+
+    def reset(self) -> None:
+        """
+        Resets the read position of the MappedFile object to the beginning of the
+        file.
+        """
+        self._position = 0
+        self.bufferedReader.seek(0)
@@ -1,4 +1,17 @@
-from .ipld_dag_pb2 import PBLink, PBNode
-from .unixfs_pb2 import Data
+from typing import TYPE_CHECKING
+from pycar._lazy import attach
 
-__all__ = ["PBLink", "PBNode", "Data"]
+if TYPE_CHECKING:
+    from .ipld_dag_pb2 import PBLink as PBLink, PBNode as PBNode
+    from .unixfs_pb2 import Data as Data
+
+# The generated modules load protobuf descriptors, so they are only imported when
+# used.
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    exports={
+        "PBLink": ".ipld_dag_pb2",
+        "PBNode": ".ipld_dag_pb2",
+        "Data": ".unixfs_pb2",
+    },
+)
@@ -1,3 +1,20 @@
-from pycar.utils.prepend import prepend_data_to_file
+from typing import TYPE_CHECKING
+from pycar._lazy import attach
 
-__all__ = ["prepend_data_to_file"]
+if TYPE_CHECKING:
+    from pycar.utils.prepend import prepend_data_to_file as prepend_data_to_file
+    from pycar.utils.sink import (
+        CallableWriter as CallableWriter,
+        VectoredWriter as VectoredWriter,
+    )
+    from pycar.utils.cid_set import CIDSet as CIDSet
+
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    exports={
+        "prepend_data_to_file": ".prepend",
+        "CallableWriter": ".sink",
+        "VectoredWriter": ".sink",
+        "CIDSet": ".cid_set",
+    },
+)
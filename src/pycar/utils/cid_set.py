@@ -0,0 +1,93 @@
+from typing import Optional, Set
+from .spill import SpillTable
+
+
+class CIDSet:
+    """
+    A compact set of binary CIDs, kept in memory and optionally spilled to an
+    on-disk SQLite table once it grows past a number of entries.
+
+    Attributes:
+        max_memory_entries (Optional[int]): The number of entries kept in memory
+            before spilling to disk, or None to keep every entry in memory.
+        spill_path (Optional[str]): The path of the SQLite database entries are
+            spilled to.
+    """
+
+    def __init__(
+        self,
+        max_memory_entries: Optional[int] = None,
+        spill_path: Optional[str] = None,
+    ):
+        """
+        Initializes a CIDSet object.
+
+        Args:
+            max_memory_entries (Optional[int], optional): The number of entries kept
+                in memory before spilling to disk. Defaults to None, keeping every
+                entry in memory.
+            spill_path (Optional[str], optional): The path of the `SpillTable` to
+                spill to. Defaults to None, using a temporary file.
+        """
+        self.max_memory_entries = max_memory_entries
+        self.spill_path = spill_path
+        self._memory: Set[bytes] = set()
+        self._disk: Optional[SpillTable] = None
+        self._disk_entries = 0
+
+    def __contains__(self, cid: bytes) -> bool:
+        if cid in self._memory:
+            return True
+        if self._disk is None:
+            return False
+        row = self._disk.execute("SELECT 1 FROM cids WHERE cid = ?", (cid,))
+        return row.fetchone() is not None
+
+    def __len__(self) -> int:
+        return len(self._memory) + self._disk_entries
+
+    def add(self, cid: bytes) -> bool:
+        """
+        Add a binary CID to the set.
+
+        Args:
+            cid (bytes): The binary CID to add.
+
+        Returns:
+            bool: True if the CID was not in the set yet, False otherwise.
+        """
+        if cid in self:
+            return False
+        self._memory.add(cid)
+        if (
+            self.max_memory_entries is not None
+            and len(self._memory) > self.max_memory_entries
+        ):
+            self._spill()
+        return True
+
+    def _spill(self) -> None:
+        """
+        Move the entries held in memory to the on-disk table.
+        """
+        if self._disk is None:
+            self._disk = SpillTable(
+                "CREATE TABLE IF NOT EXISTS cids (cid BLOB PRIMARY KEY) WITHOUT ROWID",
+                "INSERT OR IGNORE INTO cids VALUES (?)",
+                self.spill_path,
+            )
+            self.spill_path = self._disk.path
+            self._disk_entries = self._disk.execute(
+                "SELECT COUNT(*) FROM cids"
+            ).fetchone()[0]
+        self._disk.insert((cid,) for cid in self._memory)
+        self._disk_entries += len(self._memory)
+        self._memory.clear()
+
+    def close(self) -> None:
+        """
+        Close the spilled entries, if any.
+        """
+        if self._disk is not None:
+            self._disk.close()
+            self._disk = None
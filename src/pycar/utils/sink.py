@@ -0,0 +1,171 @@
+import os
+from io import FileIO, SEEK_SET
+from typing import Callable, List, Union
+
+try:
+    _IOV_MAX = os.sysconf("SC_IOV_MAX")
+except (AttributeError, ValueError, OSError):  # pragma: no cover
+    _IOV_MAX = 1024
+
+
+class CallableWriter:
+    """
+    Adapts a callable into a minimal, non-seekable, writable binary stream.
+
+    Attributes:
+        callback (Callable[[bytes], object]): The callable receiving every write.
+    """
+
+    def __init__(self, callback: Callable[[bytes], object]):
+        """
+        Initializes a CallableWriter object.
+
+        Args:
+            callback (Callable[[bytes], object]): The callable receiving every write.
+        """
+        self.callback = callback
+
+    def write(self, data: bytes) -> int:
+        """
+        Pass the given data on to the callable.
+
+        Args:
+            data (bytes): The data to write.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        self.callback(data)
+        return len(data)
+
+    def flush(self) -> None:
+        """
+        Do nothing, the callable receives every write as soon as it happens.
+        """
+
+    def seekable(self) -> bool:
+        """
+        Report that the stream is not seekable.
+
+        Returns:
+            bool: Always False.
+        """
+        return False
+
+
+class VectoredWriter:
+    """
+    An unbuffered file that gathers writes and flushes them with `os.writev`, which
+    is only available on POSIX systems, so that buffers such as memoryviews of a memory-mapped input
+    reach the file without being copied.
+
+    Read-only buffers are kept by reference until the next flush, other buffers are
+    copied when written.
+
+    Attributes:
+        raw (FileIO): The unbuffered file written to.
+        buffer_size (int): The number of pending bytes that triggers a flush.
+        max_parts (int): The number of pending buffers that triggers a flush.
+    """
+
+    def __init__(self, name: str, buffer_size: int = 1024 * 1024):
+        """
+        Initializes a VectoredWriter object.
+
+        Args:
+            name (str): The name of the file to create.
+            buffer_size (int, optional): The number of pending bytes that triggers a
+                flush. Defaults to 1 MiB.
+        """
+        self.raw: FileIO = FileIO(name, "wb")
+        self.buffer_size = buffer_size
+        self.max_parts = _IOV_MAX
+        self._parts: List[Union[bytes, memoryview]] = []
+        self._pending = 0
+
+    def write(self, data: Union[bytes, bytearray, memoryview]) -> int:
+        """
+        Queue the given data, flushing once enough data is pending.
+
+        Args:
+            data (Union[bytes, bytearray, memoryview]): The data to write.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        if not isinstance(data, bytes) and not (
+            isinstance(data, memoryview) and data.readonly
+        ):
+            data = bytes(data)
+        self._parts.append(data)
+        self._pending += len(data)
+        if self._pending >= self.buffer_size or len(self._parts) >= self.max_parts:
+            self.flush()
+        return len(data)
+
+    def flush(self) -> None:
+        """
+        Write every pending buffer to the file.
+        """
+        parts = self._parts
+        fd = self.raw.fileno()
+        start = 0
+        while start < len(parts):
+            written = os.writev(fd, parts[start : start + self.max_parts])
+            while start < len(parts) and written >= len(parts[start]):
+                written -= len(parts[start])
+                start += 1
+            if written:
+                parts[start] = memoryview(parts[start])[written:]
+        self._parts = []
+        self._pending = 0
+
+    def tell(self) -> int:
+        """
+        Get the current position, including the pending data.
+
+        Returns:
+            int: The current position.
+        """
+        return self.raw.tell() + self._pending
+
+    def seek(self, offset: int, whence: int = SEEK_SET) -> int:
+        """
+        Flush the pending data and change the current position.
+
+        Args:
+            offset (int): The offset to seek to.
+            whence (int, optional): What the offset is relative to. Defaults to the
+                start of the file.
+
+        Returns:
+            int: The new position.
+        """
+        self.flush()
+        return self.raw.seek(offset, whence)
+
+    def seekable(self) -> bool:
+        """
+        Report that the file is seekable.
+
+        Returns:
+            bool: Always True.
+        """
+        return True
+
+    def fileno(self) -> int:
+        """
+        Get the file descriptor of the file.
+
+        Returns:
+            int: The file descriptor.
+        """
+        return self.raw.fileno()
+
+    def close(self) -> None:
+        """
+        Flush the pending data and close the file.
+        """
+        if not self.raw.closed:
+            self.flush()
+            self.raw.close()
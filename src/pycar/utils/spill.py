@@ -0,0 +1,66 @@
+from sqlite3 import connect, Cursor
+from tempfile import NamedTemporaryFile
+from os import remove
+from typing import Any, Iterable, Optional, Tuple
+
+
+class SpillTable:
+    """
+    An on-disk SQLite table that entries held in memory are spilled to in batches,
+    in a database at a given path or in a temporary file removed on close.
+
+    Attributes:
+        path (str): The path of the SQLite database.
+        insert_sql (str): The statement inserting one row.
+    """
+
+    def __init__(self, schema: str, insert_sql: str, path: Optional[str] = None):
+        """
+        Initializes a SpillTable object, creating the table if it does not exist.
+
+        Args:
+            schema (str): The statement creating the table.
+            insert_sql (str): The statement inserting one row.
+            path (Optional[str], optional): The path of the SQLite database.
+                Defaults to None, using a temporary file that is removed on close.
+        """
+        self._temporary = path is None
+        if path is None:
+            with NamedTemporaryFile(suffix=".sqlite", delete=False) as tmp_file:
+                path = tmp_file.name
+        self.path = path
+        self.insert_sql = insert_sql
+        self._connection = connect(path, check_same_thread=False)
+        self._connection.execute(schema)
+
+    def execute(self, sql: str, parameters: Iterable[Any] = ()) -> Cursor:
+        """
+        Run a query against the database.
+
+        Args:
+            sql (str): The query.
+            parameters (Iterable[Any], optional): The parameters of the query.
+                Defaults to ().
+
+        Returns:
+            Cursor: The cursor over the rows of the result.
+        """
+        return self._connection.execute(sql, tuple(parameters))
+
+    def insert(self, rows: Iterable[Tuple[Any, ...]]) -> None:
+        """
+        Insert a batch of rows in a single transaction.
+
+        Args:
+            rows (Iterable[Tuple[Any, ...]]): The rows to insert.
+        """
+        with self._connection:
+            self._connection.executemany(self.insert_sql, rows)
+
+    def close(self) -> None:
+        """
+        Close the database, removing it if it was a temporary file.
+        """
+        self._connection.close()
+        if self._temporary:
+            remove(self.path)
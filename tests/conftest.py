@@ -0,0 +1,65 @@
+from pycar.car import CARv1Writer, folder_to_dag
+from pycar.file_types import BinaryFile
+import pytest
+
+from pathlib import Path
+
+
+@pytest.fixture
+def statics_path():
+    return Path(__file__).parent / "statics"
+
+
+@pytest.fixture
+def dummy_file_path(statics_path):
+    return statics_path / "dummy"
+
+
+@pytest.fixture
+def dummy_folder_path(statics_path):
+    return statics_path / "dummy_folder"
+
+
+@pytest.fixture
+def write_file_car(tmp_path, dummy_file_path):
+    """
+    Write a file to an archive named in tmp_path, or to a stream or callable sink,
+    and return its root CID. The writer is a UnixFS one with 3 children per node
+    unless the keyword arguments say otherwise.
+    """
+
+    def write_car(
+        name, file_type=BinaryFile, chunk_size=64, path=dummy_file_path, **kwargs
+    ):
+        sink = str(tmp_path / name) if isinstance(name, str) else name
+        options = {"unixfs": True, "max_children": 3, **kwargs}
+        with open(path, "rb") as f:
+            file = file_type(
+                bufferedReader=f, chunkSize=chunk_size, metadata={"name": "dummy"}
+            )
+            with CARv1Writer(file, sink, **options) as c:
+                return c.get_car()
+
+    return write_car
+
+
+@pytest.fixture
+def write_folder_car(tmp_path, dummy_folder_path):
+    """
+    Write a folder to an archive named in tmp_path and return its root CID. The
+    writer is a UnixFS one with 3 children per node unless `writer_options` say
+    otherwise, and the other keyword arguments are passed to `folder_to_dag`.
+    """
+
+    def write_car(
+        name,
+        folder_path=dummy_folder_path,
+        chunk_size=64,
+        writer_options=None,
+        **kwargs,
+    ):
+        options = {"unixfs": True, "max_children": 3, **(writer_options or {})}
+        with CARv1Writer(None, str(tmp_path / name), **options) as c:
+            return folder_to_dag(c, str(folder_path), chunk_size=chunk_size, **kwargs)
+
+    return write_car
@@ -0,0 +1,167 @@
+from pycar.car import AsyncCARv1Writer, CARv1Writer, async_folder_to_dag, folder_to_dag
+from pycar.file_types import BinaryFile
+import asyncio
+import pytest
+
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+
+def test_async_writer_matches_sync_writer(statics_path):
+    data = (statics_path / "dummy").read_bytes()
+    expected = BytesIO()
+    with CARv1Writer(
+        BinaryFile(BytesIO(data), chunkSize=64, metadata={"name": "dummy"}),
+        expected,
+        unixfs=True,
+        max_children=3,
+    ) as c:
+        cid = c.get_car()
+
+    async def write_car():
+        stream = asyncio.StreamReader()
+        # Feed the stream in pieces that do not line up with the chunks.
+        for start in range(0, len(data), 100):
+            stream.feed_data(data[start : start + 100])
+        stream.feed_eof()
+        parts = []
+
+        async def sink(part):
+            parts.append(part)
+
+        async with AsyncCARv1Writer(
+            stream, sink, chunk_size=64, buffer_size=256, unixfs=True, max_children=3
+        ) as c:
+            root = await c.get_car()
+        return root, b"".join(parts)
+
+    assert asyncio.run(write_car()) == (cid, expected.getvalue())
+
+
+def test_async_folder_to_dag_matches_sync(statics_path):
+    expected = BytesIO()
+    with CARv1Writer(None, expected, unixfs=True) as c:
+        cid = folder_to_dag(c, str(statics_path / "dummy_folder"), chunk_size=64)
+
+    async def write_car():
+        output = BytesIO()
+
+        async def sink(part):
+            output.write(part)
+
+        async with AsyncCARv1Writer(None, sink, unixfs=True) as c:
+            root = await async_folder_to_dag(
+                c, str(statics_path / "dummy_folder"), chunk_size=64
+            )
+        return root, output.getvalue()
+
+    assert asyncio.run(write_car()) == (cid, expected.getvalue())
+
+
+def write_async(data, chunk_size, feed=100, **kwargs):
+    async def write_car():
+        stream = asyncio.StreamReader()
+        for start in range(0, len(data), feed):
+            stream.feed_data(data[start : start + feed])
+        stream.feed_eof()
+        output = BytesIO()
+
+        async def sink(part):
+            output.write(part)
+
+        async with AsyncCARv1Writer(
+            stream, sink, chunk_size=chunk_size, buffer_size=256, **kwargs
+        ) as c:
+            root = await c.get_car()
+        return root, output.getvalue()
+
+    return asyncio.run(write_car())
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"layout": "trickle", "max_children": 2},
+        {"profile": "kubo", "carv2": True},
+        {"unixfs": True, "carv2": True, "max_in_flight": 1},
+    ],
+)
+def test_async_writer_matches_sync_writer_options(options):
+    data = bytes(range(256)) * 40
+    expected = BytesIO()
+    file = BinaryFile(BytesIO(data), chunkSize=64, metadata={"name": "data"})
+    with CARv1Writer(file, expected, **options) as c:
+        cid = c.get_car()
+
+    assert write_async(data, 64, **options) == (cid, expected.getvalue())
+
+
+def test_async_writer_with_roots_up_front():
+    data = bytes(range(256)) * 40
+    file = BinaryFile(BytesIO(data), chunkSize=64, metadata={"name": "data"})
+    with CARv1Writer(file, BytesIO(), unixfs=True) as c:
+        cid = c.get_car()
+    expected = BytesIO()
+    file = BinaryFile(BytesIO(data), chunkSize=64, metadata={"name": "data"})
+    with CARv1Writer(file, expected, unixfs=True, roots=[cid]) as c:
+        c.get_car()
+
+    assert write_async(data, 64, unixfs=True, roots=[cid]) == (
+        cid,
+        expected.getvalue(),
+    )
+
+
+def test_async_writers_share_a_single_thread():
+    data = bytes(range(256)) * 40
+    file = BinaryFile(BytesIO(data), chunkSize=64, metadata={"name": "data"})
+    with CARv1Writer(file, BytesIO(), unixfs=True) as c:
+        cid = c.get_car()
+
+    async def write_car(output):
+        loop = asyncio.get_running_loop()
+        stream = asyncio.StreamReader()
+        stream.feed_data(data)
+        stream.feed_eof()
+
+        async def sink(part):
+            # Like aiofiles, write on the default executor of the event loop.
+            await loop.run_in_executor(None, output.write, part)
+
+        async with AsyncCARv1Writer(
+            stream, sink, chunk_size=64, buffer_size=256, unixfs=True
+        ) as c:
+            return await c.get_car()
+
+    async def write_cars():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(1))
+        outputs = [BytesIO() for _ in range(4)]
+        roots = await asyncio.wait_for(
+            asyncio.gather(*(write_car(output) for output in outputs)), timeout=10
+        )
+        return roots, outputs
+
+    roots, outputs = asyncio.run(write_cars())
+    assert roots == [cid] * 4
+    assert len({output.getvalue() for output in outputs}) == 1
+
+
+def test_async_folder_to_dag_matches_sync_kubo(statics_path):
+    folder = str(statics_path / "dummy_folder")
+    expected = BytesIO()
+    with CARv1Writer(None, expected, profile="kubo", carv2=True) as c:
+        cid = folder_to_dag(c, folder, chunk_size=64, shard_threshold=64)
+
+    async def write_car():
+        output = BytesIO()
+
+        async def sink(part):
+            output.write(part)
+
+        async with AsyncCARv1Writer(None, sink, profile="kubo", carv2=True) as c:
+            root = await async_folder_to_dag(
+                c, folder, chunk_size=64, shard_threshold=64
+            )
+        return root, output.getvalue()
+
+    assert asyncio.run(write_car()) == (cid, expected.getvalue())
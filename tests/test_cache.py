@@ -0,0 +1,62 @@
+from pycar.car import CARv1Reader, FileCache
+import pycar.car.utils
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from shutil import copytree
+from pathlib import Path
+
+
+@pytest.fixture
+def folder_path(tmp_path):
+    return Path(
+        copytree(Path(__file__).parent / "statics" / "dummy_folder", tmp_path / "in")
+    )
+
+
+def test_folder_to_dag_copies_cached_files(
+    folder_path, tmp_path, monkeypatch, write_folder_car
+):
+    opened = []
+
+    class CountingBinaryFile(pycar.car.utils.BinaryFile):
+        def __init__(self, *args, **kwargs):
+            opened.append(kwargs["metadata"]["name"])
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(pycar.car.utils, "BinaryFile", CountingBinaryFile)
+
+    def write_car(name, executor=None, **kwargs):
+        with FileCache(str(tmp_path / "cache.sqlite")) as cache:
+            cid = write_folder_car(
+                name,
+                folder_path=folder_path,
+                writer_options=kwargs,
+                executor=executor,
+                cache=cache,
+            )
+        with CARv1Reader(str(tmp_path / name)) as reader:
+            assert reader.roots == [cid]
+            blocks = list(reader)
+            for block_cid, data in blocks:
+                assert reader.get(block_cid) == data
+        return cid
+
+    cid = write_car("first.car")
+    assert sorted(opened) == ["dummy1", "dummy2"]
+
+    opened.clear()
+    assert write_car("second.car", carv2=True) == cid
+    assert opened == []
+
+    (folder_path / "sub1" / "dummy1").write_bytes(b"changed")
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        expected = write_folder_car("expected.car", folder_path=folder_path)
+        opened.clear()
+        assert write_car("third.car", executor=executor) == expected
+        assert opened == ["dummy1"]
+        # CARv2 archives built on workers copy their spools into the index too.
+        (folder_path / "sub1" / "dummy1").write_bytes(b"changed again")
+        expected = write_folder_car("expected.car", folder_path=folder_path)
+        opened.clear()
+        assert write_car("fourth.car", executor=executor, carv2=True) == expected
+    assert opened == ["dummy1"]
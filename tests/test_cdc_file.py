@@ -0,0 +1,65 @@
+from pycar.car import CARv1Writer
+from pycar.file_types import CDCFile
+from pycar.file_types import cdc_file
+import pytest
+
+from io import BytesIO
+from random import Random
+
+
+@pytest.fixture
+def data():
+    return Random(0).randbytes(1 << 20)
+
+
+def chunk(data, **kwargs):
+    return list(
+        CDCFile(
+            bufferedReader=BytesIO(data),
+            minSize=1024,
+            chunkSize=8192,
+            maxSize=32768,
+            **kwargs,
+        )
+    )
+
+
+def test_cdc_file_chunks_within_bounds(data):
+    chunks = chunk(data)
+    assert b"".join(chunks) == data
+    assert all(1024 <= len(c) <= 32768 for c in chunks[:-1])
+
+
+def test_cdc_file_boundaries_survive_insertion(data):
+    chunks = chunk(data)
+    edited = chunk(data[:1000] + b"inserted" + data[1000:])
+    assert len(set(chunks) & set(edited)) >= len(chunks) - 2
+
+
+def test_cdc_file_python_and_numpy_cuts_match(data, monkeypatch):
+    if cdc_file.np is None:
+        pytest.skip("numpy is not installed")
+    chunks = chunk(data)
+    monkeypatch.setattr(cdc_file, "_find_cut", cdc_file._find_cut_python)
+    assert chunk(data) == chunks
+
+
+def test_cdc_file_rejects_bad_sizes():
+    with pytest.raises(ValueError):
+        CDCFile(bufferedReader=BytesIO(b""), minSize=4096, chunkSize=1024)
+
+
+def test_cdc_file_car_writer(data, tmp_path):
+    with CARv1Writer(
+        CDCFile(
+            bufferedReader=BytesIO(data),
+            minSize=1024,
+            chunkSize=8192,
+            maxSize=32768,
+            metadata={"name": "data"},
+        ),
+        str(tmp_path / "cdc.car"),
+        unixfs=True,
+    ) as c:
+        cid = c.get_car()
+    assert cid is not None
@@ -0,0 +1,26 @@
+from pycar.utils import CIDSet
+
+import os
+
+
+def test_cid_set_spills_to_disk(tmp_path):
+    cids = CIDSet(max_memory_entries=3, spill_path=str(tmp_path / "cids.sqlite"))
+    for i in range(10):
+        assert cids.add(bytes([i]))
+    for i in range(10):
+        assert not cids.add(bytes([i]))
+        assert bytes([i]) in cids
+    assert bytes([10]) not in cids
+    assert len(cids) == 10
+    cids.close()
+    assert (tmp_path / "cids.sqlite").exists()
+
+
+def test_cid_set_removes_temporary_spill():
+    cids = CIDSet(max_memory_entries=1)
+    cids.add(b"a")
+    cids.add(b"b")
+    spill_path = cids.spill_path
+    assert spill_path is not None and os.path.exists(spill_path)
+    cids.close()
+    assert not os.path.exists(spill_path)
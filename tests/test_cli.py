@@ -0,0 +1,62 @@
+from pycar.car import CARv1Reader
+from pycar.cli import main
+import pytest
+
+import os
+import subprocess
+import sys
+
+
+def test_cli_pack_ls_verify_unpack(tmp_path, capsys):
+    folder = tmp_path / "folder"
+    (folder / "sub").mkdir(parents=True)
+    (folder / "a.txt").write_bytes(b"hello world")
+    (folder / "sub" / "b.bin").write_bytes(bytes(range(256)) * 2000)
+    car_path = str(tmp_path / "folder.car")
+
+    assert main(["pack", str(folder), car_path, "--chunk-size", "65536"]) == 0
+    root = capsys.readouterr().out.strip()
+    assert main(["ls", car_path, "--roots"]) == 0
+    assert capsys.readouterr().out.strip() == root
+    assert main(["ls", car_path]) == 0
+    with CARv1Reader(car_path) as reader:
+        blocks = sum(1 for _ in reader.iter_raw())
+    assert len(capsys.readouterr().out.splitlines()) == blocks
+    assert main(["verify", car_path]) == 0
+
+    assert main(["unpack", car_path, str(tmp_path / "out"), "--root", root]) == 0
+    assert (tmp_path / "out" / "a.txt").read_bytes() == b"hello world"
+    assert (tmp_path / "out" / "sub" / "b.bin").read_bytes() == bytes(range(256)) * 2000
+
+
+def test_cli_verify_detects_corruption(tmp_path, capsys):
+    (tmp_path / "file.txt").write_bytes(b"hello world")
+    car_path = tmp_path / "file.car"
+    assert main(["pack", str(tmp_path / "file.txt"), str(car_path)]) == 0
+    data = car_path.read_bytes()
+    car_path.write_bytes(data.replace(b"hello world", b"hello there"))
+    assert main(["verify", str(car_path)]) == 1
+    assert "does not match" in capsys.readouterr().err
+
+
+def test_import_is_lazy():
+    code = "import sys, pycar.cli; print('pycar.car' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+    )
+    assert result.stdout.strip() == "False"
+
+
+def test_cli_pack_failure_removes_the_archive(tmp_path, capsys, statics_path):
+    car_path = tmp_path / "file.car"
+    with pytest.raises(SystemExit) as error:
+        main(
+            ["pack", str(statics_path / "dummy"), str(car_path), "--max-children", "1"]
+        )
+    assert error.value.code == 1
+    assert "pycar: error: max_children must be at least 2." in capsys.readouterr().err
+    assert not car_path.exists()
@@ -0,0 +1,72 @@
+from multiformats import varint  # type: ignore
+from pycar.car.dag_pb import PBNodeBuilder, get_link_cids
+from pycar.protobufs import Data, PBLink, PBNode
+import pytest
+
+
+def protobuf_node(dtype, links, blocksizes, **fields):
+    pbnode, unixfs = PBNode(), Data()
+    unixfs.Type = dtype
+    for name, value in fields.items():
+        setattr(unixfs, name, value)
+    unixfs.blocksizes.extend(blocksizes)
+    for cid, name, size in links:
+        link = PBLink()
+        link.Hash, link.Name, link.Tsize = cid, name, size
+        pbnode.Links.extend([link])
+    pbnode.Data = unixfs.SerializeToString()
+    return pbnode
+
+
+@pytest.mark.parametrize(
+    "dtype, links, blocksizes, fields",
+    [
+        (Data.DataType.File, [], [], {}),
+        (Data.DataType.Raw, [], [5], {"Data": b"hello"}),
+        (
+            Data.DataType.File,
+            [(bytes(36), f"Chunks{i}", 300 * i) for i in range(1024)],
+            [300 * i for i in range(1024)],
+            {},
+        ),
+        (
+            Data.DataType.File,
+            [(bytes([1] * 36), "", 262144), (bytes([2] * 36), "", 1 << 40)],
+            [262144, 1 << 40],
+            {"filesize": 262144 + (1 << 40)},
+        ),
+        (Data.DataType.Directory, [(bytes(36), "héllo", 0)], [0], {}),
+        (
+            Data.DataType.HAMTShard,
+            [(bytes(36), "0Aname", 12)],
+            [],
+            {"Data": b"\x04\x00", "hashType": 0x22, "fanout": 256},
+        ),
+    ],
+)
+def test_pbnode_builder_matches_protobuf(dtype, links, blocksizes, fields):
+    builder = PBNodeBuilder(dtype=dtype)
+    for cid, name, size in links:
+        builder.add_link(cid=cid, name=name, size=size)
+    builder.blocksizes.extend(blocksizes)
+    builder.data = fields.get("Data")
+    builder.filesize = fields.get("filesize")
+    builder.hash_type = fields.get("hashType")
+    builder.fanout = fields.get("fanout")
+
+    pbnode = protobuf_node(dtype, links, blocksizes, **fields)
+    assert builder.encode() == pbnode.SerializeToString()
+    assert builder.byte_size == pbnode.ByteSize()
+    # Canonical dag-pb writes the links before the data.
+    canonical = builder.encode(canonical=True)
+    assert PBNode.FromString(canonical) == pbnode
+    assert canonical.endswith(b"\x0a" + varint.encode(len(pbnode.Data)) + pbnode.Data)
+    assert get_link_cids(canonical) == [cid for cid, _, _ in links]
+    assert get_link_cids(pbnode.SerializeToString()) == [cid for cid, _, _ in links]
+
+
+def test_get_link_cids_rejects_truncated_nodes():
+    builder = PBNodeBuilder(dtype=Data.DataType.File)
+    builder.add_link(cid=bytes(36), name="", size=1)
+    with pytest.raises(ValueError):
+        get_link_cids(builder.encode()[:-3])
@@ -0,0 +1,49 @@
+from pycar.car import CARv1Reader, CARv1Writer, dag_to_folder, folder_to_dag
+from pycar.file_types import BinaryFile
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _read_tree(root):
+    return {
+        str(file.relative_to(root)): file.read_bytes()
+        for file in root.rglob("*")
+        if file.is_file()
+    }
+
+
+@pytest.mark.parametrize("threads", [0, 4])
+def test_dag_to_folder_round_trip(statics_path, tmp_path, threads):
+    car_path = tmp_path / "dummy_folder.car"
+    with CARv1Writer(None, str(car_path), unixfs=True, max_children=3) as c:
+        cid = folder_to_dag(
+            car_writer=c, folder_path=statics_path / "dummy_folder", chunk_size=64
+        )
+
+    output_path = tmp_path / "out"
+    with CARv1Reader(str(car_path)) as reader:
+        if threads:
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                assert dag_to_folder(reader, str(output_path), executor=executor) == cid
+        else:
+            assert dag_to_folder(reader, str(output_path)) == cid
+
+    assert _read_tree(output_path) == _read_tree(statics_path / "dummy_folder")
+
+
+@pytest.mark.parametrize("unixfs", [False, True])
+def test_dag_to_folder_exports_file(statics_path, tmp_path, unixfs):
+    car_path = tmp_path / "dummy.car"
+    with open(statics_path / "dummy", "rb") as f:
+        with CARv1Writer(
+            BinaryFile(bufferedReader=f, chunkSize=64, metadata={"name": "dummy"}),
+            str(car_path),
+            unixfs=unixfs,
+            max_children=3,
+        ) as c:
+            c.get_car()
+
+    with CARv1Reader(str(car_path)) as reader:
+        dag_to_folder(reader, str(tmp_path / "dummy"))
+
+    assert (tmp_path / "dummy").read_bytes() == (statics_path / "dummy").read_bytes()
@@ -1,27 +1,166 @@
-from pycar.car import CARv1Writer
-from pycar.file_types import BinaryFile
+from pycar.car import CARv1Reader, CARv1Writer, dag_to_folder
+from pycar.car.sections import iter_sections, read_varint
+from pycar.file_types import BinaryFile, MappedFile
+from pycar.protobufs import PBNode  # type: ignore
+from pycar.utils import CIDSet
 import pytest
 
-from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
 
 
-@pytest.fixture
-def dummy_file_path():
-    # Get the path to the current test file
-    test_file_path = Path(__file__).parent
-    # Construct the full path to the dummy file
-    return test_file_path / "statics" / "dummy"
-
-
-def test_carv1_file_writer(dummy_file_path):
+def test_carv1_file_writer(dummy_file_path, tmp_path):
     try:
         with open(dummy_file_path, "rb") as f:
             with CARv1Writer(
                 BinaryFile(bufferedReader=f, chunkSize=1, metadata={"name": "dummy"}),
-                "file.car",
+                str(tmp_path / "file.car"),
                 unixfs=True,
                 max_children=1024,
             ) as c:
                 c.get_car()
     except Exception as e:
         pytest.fail(f"Test failed due to unexpected exception: {e}")
+
+
+def test_carv1_reserved_header_matches_prepend(write_file_car, tmp_path):
+    cid = write_file_car("False.car")
+    assert write_file_car("True.car", reserve_header=True) == cid
+    assert (tmp_path / "False.car").read_bytes() == (tmp_path / "True.car").read_bytes()
+
+
+def test_carv1_writer_streams_to_sinks(write_file_car, tmp_path):
+    write_car = write_file_car
+    cid = write_car("file.car")
+    expected = (tmp_path / "file.car").read_bytes()
+
+    buffer = BytesIO()
+    assert write_car(buffer) == cid
+    assert buffer.getvalue() == expected
+
+    chunks = []
+    assert write_car(chunks.append, spool_size=128) == cid
+    assert b"".join(chunks) == expected
+
+    buffer = BytesIO()
+    assert write_car(buffer, reserve_header=True) == cid
+    assert buffer.getvalue() == expected
+
+    chunks = []
+    assert write_car(chunks.append, roots=[cid]) == cid
+    assert b"".join(chunks) == expected
+
+
+@pytest.mark.parametrize("executor_type", [ThreadPoolExecutor, ProcessPoolExecutor])
+def test_carv1_writer_with_executor_matches_serial(
+    write_file_car, tmp_path, executor_type
+):
+    cid = write_file_car("serial.car")
+    with executor_type(max_workers=4) as executor:
+        assert write_file_car("parallel.car", executor=executor, max_in_flight=8) == cid
+    assert (tmp_path / "serial.car").read_bytes() == (
+        tmp_path / "parallel.car"
+    ).read_bytes()
+
+
+def test_carv1_writer_dedup_skips_duplicate_blocks(write_file_car, tmp_path):
+    def write_car(name, **kwargs):
+        return write_file_car(name, chunk_size=2, max_children=1024, **kwargs)
+
+    cid = write_car("plain.car")
+    assert write_car("dedup.car", dedup=True) == cid
+    assert write_car("spilled.car", dedup=CIDSet(max_memory_entries=2)) == cid
+
+    with open(tmp_path / "dedup.car", "rb") as f:
+        f.read(read_varint(f))
+        cids = [block_cid for block_cid, _ in iter_sections(f)]
+    assert len(cids) == len(set(cids))
+    assert (tmp_path / "dedup.car").stat().st_size < (
+        tmp_path / "plain.car"
+    ).stat().st_size
+    assert (tmp_path / "dedup.car").read_bytes() == (
+        tmp_path / "spilled.car"
+    ).read_bytes()
+
+
+@pytest.mark.parametrize("unixfs", [False, True])
+def test_carv1_writer_mapped_file_matches_binary_file(write_file_car, tmp_path, unixfs):
+    cid = write_file_car("binary.car", unixfs=unixfs)
+    assert write_file_car("mapped.car", file_type=MappedFile, unixfs=unixfs) == cid
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        assert (
+            write_file_car(
+                "pool.car", file_type=MappedFile, unixfs=unixfs, executor=executor
+            )
+            == cid
+        )
+    expected = (tmp_path / "binary.car").read_bytes()
+    assert (tmp_path / "mapped.car").read_bytes() == expected
+    assert (tmp_path / "pool.car").read_bytes() == expected
+
+
+def test_mapped_file_releases_the_mapping(dummy_file_path):
+    with open(dummy_file_path, "rb") as f:
+        with MappedFile(bufferedReader=f, chunkSize=64) as file:
+            assert bytes(next(file)) == dummy_file_path.read_bytes()[:64]
+            mapping = file._map
+        assert mapping.closed
+        assert not f.closed
+        with pytest.raises(ValueError):
+            next(file)
+
+
+def test_carv1_writer_empty_file(tmp_path):
+    car_path = tmp_path / "empty.car"
+    with CARv1Writer(
+        BinaryFile(bufferedReader=BytesIO(), chunkSize=64, metadata={"name": "empty"}),
+        str(car_path),
+        unixfs=True,
+        max_children=2,
+    ) as c:
+        cid = c.get_car()
+
+    with CARv1Reader(str(car_path)) as reader:
+        assert reader.roots == [cid]
+        dag_to_folder(reader, str(tmp_path / "empty"))
+    assert (tmp_path / "empty").read_bytes() == b""
+
+
+def test_carv1_writer_trickle_layout(dummy_file_path, tmp_path):
+    car_path = tmp_path / "trickle.car"
+    with open(dummy_file_path, "rb") as f:
+        with CARv1Writer(
+            BinaryFile(bufferedReader=f, chunkSize=16, metadata={"name": "dummy"}),
+            str(car_path),
+            unixfs=False,
+            max_children=2,
+            layout="trickle",
+        ) as c:
+            cid = c.get_car()
+
+    with CARv1Reader(str(car_path)) as reader:
+        root = PBNode.FromString(reader.get(cid))
+        assert [link.Name for link in root.Links[:3]] == [
+            "Chunks0",
+            "Chunks1",
+            "File_Layer:1:Chunk2",
+        ]
+        dag_to_folder(reader, str(tmp_path / "dummy"))
+    assert (tmp_path / "dummy").read_bytes() == dummy_file_path.read_bytes()
+
+    with pytest.raises(ValueError):
+        CARv1Writer(None, BytesIO(), layout="unknown")
+
+
+def test_carv1_writer_without_header_writes_sections(write_file_car, tmp_path):
+    cid = write_file_car("file.car")
+    with CARv1Reader(str(tmp_path / "file.car")) as reader:
+        data_offset = reader.data_offset
+    expected = (tmp_path / "file.car").read_bytes()[data_offset:]
+
+    sections = BytesIO()
+    assert write_file_car(sections, write_header=False) == cid
+    assert sections.getvalue() == expected
+
+    with pytest.raises(ValueError):
+        CARv1Writer(None, BytesIO(), carv2=True, write_header=False)
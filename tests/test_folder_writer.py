@@ -1,24 +1,75 @@
-from pycar.car import folder_to_dag, CARv1Writer
+from pycar.car import CARv1Reader, CARv1Writer, folder_to_dag
 import pytest
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 
-@pytest.fixture
-def dummy_folder_path():
-    # Get the path to the current test file
-    test_file_path = Path(__file__).parent
-    # Construct the full path to the dummy file
-    return test_file_path / "statics" / "dummy_folder"
-
-
-def test_carv1_file_writer(dummy_folder_path):
+def test_carv1_file_writer(dummy_folder_path, tmp_path):
     try:
         with CARv1Writer(
             None,
-            "dummy_folder.car",
+            str(tmp_path / "dummy_folder.car"),
             unixfs=True,
             max_children=1024,
         ) as c:
             folder_to_dag(car_writer=c, folder_path=dummy_folder_path, chunk_size=1)
     except Exception as e:
         pytest.fail(f"Test failed due to unexpected exception: {e}")
+
+
+def test_carv1_folder_writer_with_executor_matches_sequential(
+    write_folder_car, tmp_path
+):
+    cid = write_folder_car("sequential.car")
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert (
+            write_folder_car(
+                "parallel.car", executor=executor, max_in_flight=2, spool_size=256
+            )
+            == cid
+        )
+    assert (tmp_path / "sequential.car").read_bytes() == (
+        tmp_path / "parallel.car"
+    ).read_bytes()
+
+
+def test_carv1_folder_writer_missing_folder(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        folder_to_dag(
+            car_writer=CARv1Writer(None, str(tmp_path / "missing.car")),
+            folder_path=tmp_path / "missing",
+        )
+
+
+def test_carv1_folder_writer_dedup_with_executor_matches_sequential(
+    write_folder_car, tmp_path
+):
+    def write_car(name, **kwargs):
+        return write_folder_car(
+            name, chunk_size=2, writer_options={"dedup": True}, **kwargs
+        )
+
+    cid = write_car("sequential.car")
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert write_car("parallel.car", executor=executor) == cid
+    assert (tmp_path / "sequential.car").read_bytes() == (
+        tmp_path / "parallel.car"
+    ).read_bytes()
+
+
+def test_carv2_folder_writer_with_executor_matches_sequential(
+    write_folder_car, tmp_path
+):
+    cid = write_folder_car("sequential.car", writer_options={"carv2": True})
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert (
+            write_folder_car(
+                "parallel.car", writer_options={"carv2": True}, executor=executor
+            )
+            == cid
+        )
+    assert (tmp_path / "sequential.car").read_bytes() == (
+        tmp_path / "parallel.car"
+    ).read_bytes()
+    with CARv1Reader(str(tmp_path / "parallel.car")) as reader:
+        blocks = list(reader)
+        assert all(reader.get(block_cid) == data for block_cid, data in blocks)
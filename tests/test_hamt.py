@@ -0,0 +1,35 @@
+from pycar.car import CARv1Reader, CARv1Writer, dag_to_folder, folder_to_dag
+from pycar.car.hamt import _murmur3_x64_64_python, murmur3_x64_64
+from pycar.protobufs import PBNode, Data  # type: ignore
+import pytest
+
+
+def test_murmur3_x64_64():
+    assert murmur3_x64_64(b"hello") == (14688674573012802306).to_bytes(8, "big")
+    for length in range(40):
+        data = bytes(range(length))
+        assert murmur3_x64_64(data) == _murmur3_x64_64_python(data).to_bytes(8, "big")
+
+
+@pytest.mark.parametrize("profile", [None, "kubo"])
+def test_folder_to_dag_shards_large_folders(tmp_path, profile):
+    folder_path = tmp_path / "folder"
+    (folder_path / "sub").mkdir(parents=True)
+    for i in range(300):
+        (folder_path / f"file{i}").write_bytes(str(i).encode())
+    (folder_path / "sub" / "file").write_bytes(b"sub")
+
+    car_path = tmp_path / "folder.car"
+    with CARv1Writer(None, str(car_path), unixfs=True, profile=profile) as c:
+        cid = folder_to_dag(c, str(folder_path), shard_threshold=1024)
+
+    with CARv1Reader(str(car_path)) as reader:
+        root = Data.FromString(PBNode.FromString(reader.get(cid)).Data)
+        assert root.Type == Data.DataType.HAMTShard
+        assert (root.hashType, root.fanout) == (0x22, 256)
+        dag_to_folder(reader, str(tmp_path / "out"))
+
+    for file in folder_path.rglob("*"):
+        if file.is_file():
+            output = tmp_path / "out" / file.relative_to(folder_path)
+            assert output.read_bytes() == file.read_bytes()
@@ -0,0 +1,164 @@
+from pycar.car import CARv1Reader, CARv1Writer, dag_to_folder, folder_to_dag
+from pycar.file_types import BinaryFile
+from multiformats import CID, multihash
+import pytest
+
+from io import BytesIO
+from pathlib import Path
+from random import Random
+import os
+import shutil
+import subprocess
+
+
+def write_file_car(car_path, data, chunk_size=262144):
+    with CARv1Writer(
+        BinaryFile(BytesIO(data), chunkSize=chunk_size, metadata={"name": "file"}),
+        str(car_path),
+        profile="kubo",
+    ) as c:
+        cid = c.get_car()
+    return cid
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        # ipfs add --cid-version=1
+        (b"hello world", "bafkreifzjut3te2nhyekklss27nh3k72ysco7y32koao5eei66wof36n5e"),
+        (b"", "bafkreihdwdcefgh4dqkjv67uzcmw7ojee6xedzdetojuzjevtenxquvyku"),
+    ],
+)
+def test_kubo_profile_single_block_vectors(tmp_path, data, expected):
+    assert str(write_file_car(tmp_path / "file.car", data)) == expected
+
+
+# ipfs add --cid-version=1 --raw-leaves, as derived from standalone implementations
+# of the balanced and HAMT layouts of kubo; the tests comparing with kubo check
+# them where it is installed.
+@pytest.mark.parametrize(
+    "size, chunk_size, expected",
+    [
+        (
+            3 * 262144 + 1000,
+            262144,
+            "bafybeifhcraxxjagzqxkslt5275d7xxwjpmdtcelpivxqi76e427pt66w4",
+        ),
+        (
+            200 * 1024,
+            1024,
+            "bafybeib5wzftdpaiykgvir7mv3rzthssn4nhz3nnu3a7fke3natkgcvhba",
+        ),
+    ],
+)
+def test_kubo_profile_multi_chunk_file_vectors(tmp_path, size, chunk_size, expected):
+    data = Random(size).randbytes(size)
+    cid = write_file_car(tmp_path / "file.car", data, chunk_size=chunk_size)
+    assert str(cid) == expected
+
+
+def write_sharded_folder(tmp_path):
+    folder_path = tmp_path / "folder"
+    folder_path.mkdir()
+    # Enough links to outgrow the 256 KiB kubo shards directories past.
+    for i in range(7000):
+        (folder_path / f"file-{i:05}").write_bytes(str(i).encode())
+    with CARv1Writer(None, str(tmp_path / "folder.car"), profile="kubo") as c:
+        cid = folder_to_dag(c, str(folder_path))
+    return (folder_path, cid)
+
+
+def test_kubo_profile_sharded_folder_vector(tmp_path):
+    _, cid = write_sharded_folder(tmp_path)
+    assert str(cid) == "bafybeic572qznbqdhr63b2h653nlwcuktixozrohpofsf4okjwuhfxcnrq"
+
+
+def test_kubo_profile_empty_folder_vector(tmp_path):
+    (tmp_path / "empty").mkdir()
+    with CARv1Writer(None, str(tmp_path / "empty.car"), profile="kubo") as c:
+        cid = folder_to_dag(c, str(tmp_path / "empty"))
+    # ipfs add -r --cid-version=1, the CIDv1 of QmUNLLsPACCz1vLxQVkXqqLX5R1X345qqfHbsf67hvA3Nn
+    assert str(cid) == "bafybeiczsscdsbs7ffqz55asqdf3smv6klcw3gofszvwlyarci47bgf354"
+
+
+def test_kubo_profile_file_node_encoding(tmp_path):
+    car_path = tmp_path / "file.car"
+    cid = write_file_car(car_path, b"hello world", chunk_size=4)
+
+    leaves = [
+        bytes(CID("base32", 1, "raw", multihash.digest(chunk, "sha2-256")))
+        for chunk in (b"hell", b"o wo", b"rld")
+    ]
+    # Canonical dag-pb: unnamed links with their sizes, then the UnixFS data with
+    # the type, file size and block sizes.
+    expected = b"".join(
+        bytes([0x12, len(leaf) + 6, 0x0A, len(leaf)]) + leaf + bytes([0x12, 0, 0x18, n])
+        for leaf, n in zip(leaves, (4, 4, 3))
+    ) + bytes([0x0A, 10, 0x08, 2, 0x18, 11, 0x20, 4, 0x20, 4, 0x20, 3])
+    with CARv1Reader(str(car_path)) as reader:
+        assert reader.get(cid) == expected
+        dag_to_folder(reader, str(tmp_path / "out"))
+    assert (tmp_path / "out").read_bytes() == b"hello world"
+
+
+def test_kubo_profile_folder_round_trip(tmp_path):
+    folder_path = Path(__file__).parent / "statics" / "dummy_folder"
+    with CARv1Writer(None, str(tmp_path / "folder.car"), profile="kubo") as c:
+        folder_to_dag(c, str(folder_path), chunk_size=64)
+
+    with CARv1Reader(str(tmp_path / "folder.car")) as reader:
+        dag_to_folder(reader, str(tmp_path / "out"))
+    for file in folder_path.rglob("*"):
+        if file.is_file():
+            output = tmp_path / "out" / file.relative_to(folder_path)
+            assert output.read_bytes() == file.read_bytes()
+
+
+@pytest.fixture
+def kubo_cid(tmp_path):
+    """
+    Get the root CID `ipfs add --cid-version=1 --raw-leaves` computes for a path.
+    """
+    env = {**os.environ, "IPFS_PATH": str(tmp_path / "ipfs")}
+    subprocess.run(
+        ["ipfs", "init", "--profile=test"], env=env, check=True, capture_output=True
+    )
+
+    def add(path, *args):
+        result = subprocess.run(
+            ["ipfs", "add", "--cid-version=1", "--raw-leaves", "--only-hash", "-Q"]
+            + list(args)
+            + [str(path)],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        return result.stdout.strip()
+
+    return add
+
+
+@pytest.mark.skipif(shutil.which("ipfs") is None, reason="kubo is not installed")
+@pytest.mark.parametrize(
+    "size, chunk_size",
+    [
+        # Four leaves under the root, with kubo's default chunker.
+        (3 * 262144 + 1000, 262144),
+        # 200 leaves, more than the 174 links of a node, so two layers.
+        (200 * 1024, 1024),
+    ],
+)
+def test_kubo_profile_multi_chunk_file_matches_kubo(
+    tmp_path, kubo_cid, size, chunk_size
+):
+    data = Random(size).randbytes(size)
+    (tmp_path / "file").write_bytes(data)
+    cid = write_file_car(tmp_path / "file.car", data, chunk_size=chunk_size)
+    assert str(cid) == kubo_cid(tmp_path / "file", f"--chunker=size-{chunk_size}")
+
+
+@pytest.mark.skipif(shutil.which("ipfs") is None, reason="kubo is not installed")
+def test_kubo_profile_sharded_folder_matches_kubo(tmp_path, kubo_cid):
+    folder_path, cid = write_sharded_folder(tmp_path)
+    assert str(cid) == kubo_cid(folder_path, "-r")
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    "statement, unexpected",
+    [
+        ("import pycar", ["pycar.car", "typing", "google.protobuf", "multiformats"]),
+        ("from pycar.file_types import BinaryFile", ["numpy", "multiformats"]),
+        ("from pycar.car import CARv1Reader", ["numpy", "google.protobuf"]),
+        ("from pycar.utils import CIDSet", ["pycar.car", "multiformats"]),
+    ],
+)
+def test_imports_are_lazy(statement, unexpected):
+    code = f"import sys\n{statement}\nprint(*[m for m in {unexpected!r} if m in sys.modules])"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+    )
+    assert result.stdout.strip() == ""
+
+
+def test_lazy_attributes():
+    import pycar
+    import pycar.car
+
+    assert "car" in dir(pycar)
+    assert pycar.car.CARv1Writer.__name__ == "CARv1Writer"
+    assert set(pycar.car.__all__) <= set(dir(pycar.car))
+    with pytest.raises(AttributeError):
+        pycar.car.missing
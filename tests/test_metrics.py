@@ -0,0 +1,71 @@
+from pycar.car import CARv1Reader, CARv1Writer, WriterMetrics, folder_to_dag
+from pycar.file_types import BinaryFile
+
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+
+def test_writer_metrics(tmp_path):
+    progress = []
+    metrics = WriterMetrics(progress=lambda m: progress.append(m.blocks))
+    data = bytes(range(256)) * 40
+    with CARv1Writer(
+        BinaryFile(BytesIO(data), chunkSize=1024, metadata={"name": "file"}),
+        str(tmp_path / "file.car"),
+        max_children=4,
+        dedup=True,
+        metrics=metrics,
+    ) as c:
+        c.get_car()
+
+    with CARv1Reader(str(tmp_path / "file.car")) as reader:
+        blocks = sum(1 for _ in reader)
+    stats = metrics.to_dict()
+    assert stats["stages"]["read"]["bytes"] == len(data)
+    assert stats["stages"]["read"]["calls"] == 10
+    assert stats["stages"]["header"]["calls"] == 1
+    assert stats["blocks"] == blocks + stats["duplicate_blocks"]
+    assert stats["duplicate_blocks"] > 0
+    assert progress == list(range(1, stats["blocks"] + 1))
+
+    text = metrics.to_prometheus()
+    assert 'pycar_writer_stage_bytes_total{stage="read"} 10240\n' in text
+    assert f"pycar_writer_blocks_total {stats['blocks']}\n" in text
+
+
+def test_writer_metrics_folder(tmp_path):
+    folder = tmp_path / "folder"
+    folder.mkdir()
+    (folder / "a.txt").write_bytes(b"a" * 3000)
+    metrics = WriterMetrics(progress_interval=1000)
+    with CARv1Writer(
+        None, str(tmp_path / "folder.car"), unixfs=True, metrics=metrics
+    ) as c:
+        folder_to_dag(c, str(folder), chunk_size=1024)
+    # Three leaves, a file node and a folder node.
+    assert metrics.blocks == 5
+    assert metrics.to_dict()["stages"]["write"]["bytes"] > 3000
+
+
+def test_writer_metrics_folder_executor(tmp_path, dummy_folder_path):
+    def run(name, **kwargs):
+        progress = []
+        metrics = WriterMetrics(progress=lambda m: progress.append(m.blocks))
+        with CARv1Writer(
+            None, str(tmp_path / name), unixfs=True, dedup=True, metrics=metrics
+        ) as c:
+            folder_to_dag(c, dummy_folder_path, chunk_size=1024, **kwargs)
+        return metrics.to_dict(), progress
+
+    sequential, sequential_progress = run("sequential.car")
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        parallel, parallel_progress = run("parallel.car", executor=executor)
+
+    for key in ("blocks", "duplicate_blocks"):
+        assert parallel[key] == sequential[key]
+    for stage in ("read", "hash", "encode"):
+        assert (
+            parallel["stages"][stage]["calls"] == sequential["stages"][stage]["calls"]
+        )
+    assert parallel["stages"]["read"]["bytes"] == sequential["stages"]["read"]["bytes"]
+    assert sorted(parallel_progress) == sequential_progress
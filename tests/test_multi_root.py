@@ -0,0 +1,44 @@
+from pycar.car import CARv1Reader, CARv1Writer, dag_to_folder
+from pycar.file_types import BinaryFile
+import pytest
+
+from io import BytesIO
+
+
+def binary_file(data, name):
+    return BinaryFile(BytesIO(data), chunkSize=1024, metadata={"name": name})
+
+
+def test_multi_root_archive(tmp_path):
+    shared = bytes(range(256)) * 16
+    folder = tmp_path / "folder"
+    folder.mkdir()
+    (folder / "c.bin").write_bytes(shared)
+
+    car_path = str(tmp_path / "multi.car")
+    with CARv1Writer(None, car_path, unixfs=True) as c:
+        first = c.add_file(binary_file(shared + b"a", "a.bin"))
+        second = c.add_file(binary_file(shared + b"b", "b.bin"))
+        third = c.add_folder(str(folder), chunk_size=1024)
+        assert c.add_file(binary_file(shared + b"a", "a.bin")) == first
+        assert c.finalize() == [first, second, third]
+
+    with CARv1Reader(car_path) as reader:
+        assert reader.roots == [first, second, third]
+        cids = [cid for cid, _ in reader.iter_raw()]
+        # The chunks shared by the three entries are written once.
+        assert len(cids) == len(set(cids))
+        dag_to_folder(reader, str(tmp_path / "a.bin"), cid=first)
+        dag_to_folder(reader, str(tmp_path / "out"), cid=third)
+    assert (tmp_path / "a.bin").read_bytes() == shared + b"a"
+    assert (tmp_path / "out" / "c.bin").read_bytes() == shared
+
+
+def test_multi_root_archive_needs_a_header_that_fits(tmp_path):
+    with CARv1Writer(None, str(tmp_path / "multi.car"), reserve_header=True) as c:
+        c.add_file(binary_file(b"a", "a"))
+        c.add_file(binary_file(b"b", "b"))
+        with pytest.raises(ValueError):
+            c.finalize()
+        with pytest.raises(ValueError):
+            c.finalize(roots=[])
@@ -0,0 +1,103 @@
+from pycar.car import CARv1Reader, CARv1Writer
+from pycar.file_types import BinaryFile
+from multiformats import CID, multihash
+import pytest
+
+from io import BytesIO
+from pathlib import Path
+
+
+@pytest.fixture
+def dummy_car(tmp_path):
+    dummy_file_path = Path(__file__).parent / "statics" / "dummy"
+    car_path = tmp_path / "dummy.car"
+    with open(dummy_file_path, "rb") as f:
+        with CARv1Writer(
+            BinaryFile(bufferedReader=f, chunkSize=64, metadata={"name": "dummy"}),
+            str(car_path),
+            unixfs=False,
+            max_children=3,
+        ) as c:
+            cid = c.get_car()
+    return (cid, car_path)
+
+
+def test_carv1_reader_streams_blocks(dummy_car):
+    cid, car_path = dummy_car
+    with CARv1Reader(str(car_path)) as reader:
+        assert reader.roots == [cid]
+        blocks = list(reader)
+
+    assert blocks[-1][0] == cid
+    for block_cid, data in blocks:
+        assert multihash.digest(data, "sha2-256") == block_cid.digest
+
+    stream = BytesIO(car_path.read_bytes())
+    stream.seekable = lambda: False
+    assert [block_cid for block_cid, _ in CARv1Reader(stream)] == [
+        block_cid for block_cid, _ in blocks
+    ]
+
+
+def test_carv1_reader_index(dummy_car):
+    cid, car_path = dummy_car
+    with CARv1Reader(str(car_path)) as reader:
+        blocks = dict(reader)
+    with CARv1Reader(str(car_path), index=True) as reader:
+        assert len(reader.index) == len(blocks)
+        for block_cid, data in blocks.items():
+            assert reader.get(block_cid) == data
+            assert str(block_cid) in reader
+        assert reader.get(bytes(1)) is None
+
+
+def test_carv1_reader_truncated(dummy_car):
+    cid, car_path = dummy_car
+    car_path.write_bytes(car_path.read_bytes()[:-5])
+    with pytest.raises(ValueError, match="end of stream"):
+        CARv1Reader(str(car_path), index=True)
+    with CARv1Reader(str(car_path)) as reader:
+        with pytest.raises(ValueError, match="end of stream"):
+            reader.get(cid)
+        with pytest.raises(ValueError, match="end of stream"):
+            reader.build_index()
+        assert reader.index is None
+
+
+def test_carv2_writer_and_reader(write_file_car, tmp_path):
+    cid = write_file_car("v1.car")
+    assert write_file_car("v2.car", carv2=True) == cid
+    chunks = []
+    assert write_file_car(chunks.append, carv2=True) == cid
+    assert b"".join(chunks) == (tmp_path / "v2.car").read_bytes()
+
+    with CARv1Reader(str(tmp_path / "v1.car")) as reader:
+        blocks = list(reader)
+    with CARv1Reader(str(tmp_path / "v2.car")) as reader:
+        assert reader.version == 2
+        assert reader.roots == [cid]
+        assert list(reader) == blocks
+        for block_cid, data in blocks:
+            assert reader.get(block_cid) == data
+        assert reader.index is None
+        assert len(reader.carv2_index) == len(dict(blocks))
+        assert reader.get(bytes(CID("base32", 1, "raw", blocks[0][0].digest))) is None
+
+
+@pytest.mark.parametrize("carv2", [False, True])
+@pytest.mark.parametrize("from_stream", [False, True])
+def test_carv1_reader_get_while_iterating(write_file_car, tmp_path, carv2, from_stream):
+    cid = write_file_car("dummy.car", carv2=carv2)
+    car_path = tmp_path / "dummy.car"
+    with CARv1Reader(str(car_path)) as reader:
+        blocks = list(reader)
+
+    # Without a file descriptor, lookups seek the stream being iterated.
+    source = BytesIO(car_path.read_bytes()) if from_stream else str(car_path)
+    with CARv1Reader(source) as reader:
+        visited = []
+        for block_cid, data in reader:
+            assert reader.get(block_cid) == data
+            assert cid in reader
+            visited.append((block_cid, data))
+    assert visited == blocks
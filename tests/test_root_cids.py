@@ -0,0 +1,27 @@
+import pytest
+
+# Root CIDs of the dummy file and folder, as written before the DAG layers were
+# built in a single streaming pass. The layout must not change with the builder.
+FILE_ROOTS = {
+    (False, 1, 2): "bafybeif6txbtv5dc2rkhx54qy4fb6xbxhfs6tlpsualxkwt5u2u277k7zy",
+    (False, 7, 3): "bafybeiaif3jy7zvy7eox4rkqvhv5xf4onxmb4qjfwpoyqiict5s2be5sue",
+    (False, 64, 3): "bafybeihzdkkigtjmlfumods4yxftkub25kbh6acrva67j2v2ywevltgo5u",
+    (False, 5000, 1024): "bafybeidh7eutjmzu5khjhvpuayixcv2lrwh25pq2excud6sk4h3mn3mue4",
+    (True, 1, 2): "bafybeibk26pbj43sjkj53fpgwcm6iasb5iob7knybhhrfn3s7x6gpg67qy",
+    (True, 7, 3): "bafybeig2dvez25byr5sszezar6xbw3psarzs64z3sutpe4qznyemfvqqb4",
+    (True, 64, 3): "bafybeicv6l7u4uhdqjkgdhklss3yvqabjveueysrcsa4chjecg3syczhv4",
+    (True, 5000, 1024): "bafybeigppplkgbjoglntuph27g72a5shyelvgfoqyc7pbbmy5djxsvt4ju",
+}
+FOLDER_ROOT = "bafybeieajh3gmjy7gllxitdacss7smi6ncenuxofkb2f2423rt47x2hwyu"
+
+
+@pytest.mark.parametrize("unixfs, chunk_size, max_children", list(FILE_ROOTS))
+def test_file_root_cids(write_file_car, unixfs, chunk_size, max_children):
+    cid = write_file_car(
+        "file.car", chunk_size=chunk_size, unixfs=unixfs, max_children=max_children
+    )
+    assert str(cid) == FILE_ROOTS[(unixfs, chunk_size, max_children)]
+
+
+def test_folder_root_cid(write_folder_car):
+    assert str(write_folder_car("folder.car")) == FOLDER_ROOT
@@ -0,0 +1,110 @@
+from pycar.car import CARv1Reader, SplitCARv1Writer, dag_to_folder, folder_to_dag
+from pycar.car.sections import decode_cid
+from pycar.file_types import BinaryFile
+import pytest
+
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import json
+
+
+def test_split_folder(tmp_path):
+    folder = tmp_path / "folder"
+    folder.mkdir()
+    for i in range(8):
+        (folder / f"{i}.bin").write_bytes(bytes([i]) * 5000)
+
+    shards = []
+    pattern = str(tmp_path / "part-{index:03}.car")
+    manifest = str(tmp_path / "manifest.json")
+    with SplitCARv1Writer(
+        None, pattern, 4096, on_shard=shards.append, manifest_path=manifest
+    ) as c:
+        cid = folder_to_dag(c, str(folder), chunk_size=1024)
+
+    assert shards == c.shards
+    assert len(shards) > 1
+    blocks = {}
+    for index, shard in enumerate(shards):
+        assert shard.path == pattern.format(index=index)
+        assert shard.size <= 4096
+        with CARv1Reader(shard.path) as reader:
+            assert reader.roots == [shard.root]
+            raw = [(decode_cid(cid), bytes(data)) for cid, data in reader.iter_raw()]
+        assert len(raw) == shard.blocks
+        assert raw[-1][0] == shard.root
+        blocks.update(raw)
+    assert shards[-1].root == cid
+
+    with open(manifest) as f:
+        assert json.load(f) == {
+            "roots": [str(cid)],
+            "shards": [
+                {
+                    "path": shard.path,
+                    "root": str(shard.root),
+                    "size": shard.size,
+                    "blocks": shard.blocks,
+                }
+                for shard in shards
+            ],
+        }
+
+    # The union of the shards holds the whole DAG.
+    merged = str(tmp_path / "merged.car")
+    with open(merged, "wb") as out:
+        # The header of the last shard, rooted at the DAG, heads the blocks of all.
+        with CARv1Reader(shards[-1].path) as reader:
+            with open(shards[-1].path, "rb") as f:
+                out.write(f.read(reader.data_offset))
+        for shard in shards:
+            with CARv1Reader(shard.path) as reader:
+                with open(shard.path, "rb") as f:
+                    f.seek(reader.data_offset)
+                    out.write(f.read())
+    with CARv1Reader(merged) as reader:
+        dag_to_folder(reader, str(tmp_path / "out"))
+    for i in range(8):
+        assert (tmp_path / "out" / f"{i}.bin").read_bytes() == bytes([i]) * 5000
+
+
+def test_split_oversized_block(tmp_path):
+    file = BinaryFile(BytesIO(b"x" * 10000), chunkSize=8192, metadata={"name": "x"})
+    pattern = str(tmp_path / "part-{index}.car")
+    with SplitCARv1Writer(file, pattern, 1024, dedup=True) as c:
+        cid = c.get_car()
+    # Each chunk is larger than a shard, so it has a shard of its own.
+    assert [shard.blocks for shard in c.shards] == [1, 1, 1]
+    assert c.shards[0].size > 1024
+    assert c.shards[-1].root == cid
+
+
+def test_split_rejects_invalid_arguments(tmp_path):
+    with pytest.raises(ValueError):
+        SplitCARv1Writer(None, str(tmp_path / "part.car"), 4096)
+    with pytest.raises(ValueError):
+        SplitCARv1Writer(None, str(tmp_path / "{index}.car"), 4096, carv2=True)
+    with pytest.raises(ValueError):
+        SplitCARv1Writer(None, str(tmp_path / "{index}.car"), 16)
+
+
+def test_split_folder_with_executor_matches_sequential(tmp_path):
+    folder = tmp_path / "folder"
+    folder.mkdir()
+    for i in range(16):
+        (folder / f"{i}.bin").write_bytes(bytes([i]) * 5000)
+
+    def write(name, **kwargs):
+        pattern = str(tmp_path / (name + "-{index:03}.car"))
+        with SplitCARv1Writer(None, pattern, 4096, unixfs=True) as c:
+            cid = folder_to_dag(c, str(folder), chunk_size=1024, **kwargs)
+        shards = []
+        for shard in c.shards:
+            with open(shard.path, "rb") as f:
+                shards.append((shard.root, shard.size, shard.blocks, f.read()))
+        return cid, shards
+
+    # Files are built by plain workers, and the shards rolled on this thread only.
+    with ThreadPoolExecutor(4) as executor:
+        parallel = write("parallel", executor=executor, max_in_flight=4)
+    assert parallel == write("sequential")
@@ -0,0 +1,48 @@
+from pycar.car import CARv1Reader, CARv1Writer, folder_to_dag, verify_archive
+import pytest
+
+
+@pytest.fixture
+def car_path(tmp_path):
+    folder = tmp_path / "folder"
+    (folder / "sub").mkdir(parents=True)
+    (folder / "a.txt").write_bytes(b"hello world")
+    (folder / "sub" / "b.bin").write_bytes(bytes(range(256)) * 2000)
+    path = str(tmp_path / "folder.car")
+    with CARv1Writer(None, path, unixfs=True, reserve_header=True) as c:
+        folder_to_dag(c, str(folder), chunk_size=4096)
+    return path
+
+
+@pytest.mark.parametrize("processes", [0, 2])
+def test_verify_archive(car_path, processes):
+    report = verify_archive(car_path, processes=processes)
+    with CARv1Reader(car_path) as reader:
+        blocks = list(reader.iter_offsets())
+    assert report.ok
+    assert report.blocks == len(blocks)
+    assert report.size == sum(length for _, _, length in blocks)
+    assert report.throughput > 0
+
+
+@pytest.mark.parametrize("processes", [0, 2])
+def test_verify_archive_detects_corruption_and_missing_blocks(
+    tmp_path, car_path, processes
+):
+    with CARv1Reader(car_path) as reader:
+        (cid, offset, length), second = list(reader.iter_offsets())[:2]
+    data = bytearray(open(car_path, "rb").read())
+    data[offset] ^= 1
+    broken = tmp_path / "broken.car"
+    broken.write_bytes(data)
+    report = verify_archive(str(broken), processes=processes)
+    assert not report.ok
+    assert report.mismatched == [cid]
+    assert report.missing == []
+
+    # Drop the section of the second block, which a node links to.
+    start = offset + length
+    end = second[1] + second[2]
+    broken.write_bytes(data[:start] + data[end:])
+    report = verify_archive(str(broken), processes=processes)
+    assert report.missing == [second[0]]